@@ -1,5 +1,9 @@
+# Configured before the routers are imported so their import-time messages are structured too
+from logging_config import configure_logging
+configure_logging()
+
 from fastapi import FastAPI, HTTPException
-from routers import players, matches, pins, login, backup, teams
+from routers import players, matches, pins, login, backup, teams, admin, metrics as metrics_router
 import logging
 from cors import add_cors_middleware  
 from slowapi import _rate_limit_exceeded_handler
@@ -10,45 +14,50 @@ from crud import get_user_by_username, add_user
 from routers.login import get_password_hash
 from models import User, UserRole
 from contextlib import asynccontextmanager
-from motor.motor_asyncio import AsyncIOMotorClient 
+from database import ensure_indexes, get_client, close_client
+from migrations import run_migrations
+from import_jobs import fail_stale_jobs, keep_jobs_alive
+from metrics import MetricsMiddleware, sample_threadpool
+from request_context import RequestContextMiddleware
+from loop_monitor import loop_monitor
+import asyncio
 import os
 import secrets
 import string
 
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "wct_stats")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Initializing database...")
-    client = AsyncIOMotorClient(MONGODB_URL)
+    client = get_client()
     
     # Wait for database to exist
     if os.getenv("SKIP_DB_WAIT", "false").lower() == "true":
         logger.info("Skipping database existence check (SKIP_DB_WAIT is set)")
     else:
-        logger.info(f"Waiting for database '{DATABASE_NAME}' to be created...")
+        logger.info("Waiting for database '%s' to be created...", DATABASE_NAME)
         while True:
             try:
                 # List databases and check if ours exists
                 dbs = await client.list_database_names()
                 if DATABASE_NAME in dbs:
-                    logger.info(f"Database '{DATABASE_NAME}' found.")
+                    logger.info("Database '%s' found.", DATABASE_NAME)
                     break
-                logger.info(f"Database '{DATABASE_NAME}' not found yet. Waiting...")
+                logger.info("Database '%s' not found yet. Waiting...", DATABASE_NAME)
             except Exception as e:
-                logger.error(f"Error checking for database: {e}")
+                logger.error("Error checking for database: %s", e)
             
-            import asyncio
             await asyncio.sleep(5)
 
     db = client[DATABASE_NAME]
     try:
+        await ensure_indexes(db)
+        await run_migrations(db)
+        await fail_stale_jobs(db)
         logger.info("Database initialization completed")
         admin = await get_user_by_username(db, "admin")
         if not admin:
@@ -66,9 +75,17 @@ async def lifespan(app: FastAPI):
             )
             await add_user(db, admin_user)
             logger.info("Default admin user created")
-        yield  # Application runs here
+        threadpool_sampler = asyncio.create_task(sample_threadpool())
+        job_heartbeat = asyncio.create_task(keep_jobs_alive(db))
+        loop_monitor.start()
+        try:
+            yield  # Application runs here
+        finally:
+            loop_monitor.stop()
+            job_heartbeat.cancel()
+            threadpool_sampler.cancel()
     finally:
-        client.close()
+        await close_client()
 
 app = FastAPI(lifespan=lifespan)
 add_cors_middleware(app)
@@ -76,6 +93,9 @@ add_cors_middleware(app)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(RequestContextMiddleware)
+# Added last so it is outermost and also times the other middleware
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(login.router, prefix="/login", tags=["Login"]) 
 app.include_router(players.router, prefix="/players", tags=["Players"])
@@ -83,6 +103,8 @@ app.include_router(matches.router, prefix="/matches", tags=["Matches"])
 app.include_router(teams.router, prefix="/teams", tags=["Teams"])
 app.include_router(pins.router)
 app.include_router(backup.router, tags=["Admin"])
+app.include_router(admin.router, tags=["Admin"])
+app.include_router(metrics_router.router)
 
 
 
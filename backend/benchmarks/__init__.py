@@ -0,0 +1 @@
+# Benchmarks for the backend's hot paths; run from backend/ with `python -m benchmarks.<name>`
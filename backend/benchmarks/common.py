@@ -0,0 +1,72 @@
+# Helpers shared by the benchmark scripts
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+BENCH_DB_NAME = os.getenv("BENCH_DATABASE_NAME", "wct_stats_bench")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100). The backend's own statistics module shadows the stdlib one."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def timed(fn: Callable[[], Awaitable[Any]], repeats: int) -> Dict[str, Any]:
+    """Run fn repeatedly; report median/min wall time in ms and the size of the last result."""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = await fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "median_ms": round(percentile(timings, 50), 2),
+        "min_ms": round(min(timings), 2),
+        "returned": len(result) if hasattr(result, "__len__") else None,
+    }
+
+
+def plan_stats(plan: Dict[str, Any]) -> Dict[str, Any]:
+    stats = plan.get("executionStats", {})
+    return {
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def write_report(report: Dict[str, Any], output: Optional[str] = None):
+    """
+    Print the report as JSON and, with output, also write it to that file.
+
+    The commit, Python version and machine are recorded so that files from
+    different commits can be compared with benchmarks.compare.
+    """
+    report = {
+        **report,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {output}", file=sys.stderr)
@@ -0,0 +1,81 @@
+"""
+Compare two benchmark reports written with --output, e.g. from two commits.
+
+Every timing (keys ending in _ms or _us) present in both reports is listed with its
+relative change; timings that grew by more than --threshold percent are flagged and
+make the exit status 1, so this can gate CI.
+
+Usage (from backend/):
+    python -m benchmarks.compare base.json new.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+TIMING_SUFFIXES = ("_ms", "_us")
+# Top-level keys that describe the run rather than the workload
+METADATA = {"commit", "python", "machine", "created_at"}
+
+
+def timings(report: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in report.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from timings(value, path + " > ")
+        elif isinstance(value, (int, float)) and key.endswith(TIMING_SUFFIXES):
+            yield path, float(value)
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    base_timings = dict(timings(base))
+    rows = []
+    for path, value in timings(new):
+        if path not in base_timings:
+            continue
+        before = base_timings[path]
+        change = (value - before) / before * 100 if before else 0.0
+        rows.append({
+            "metric": path,
+            "base": before,
+            "new": value,
+            "change_pct": round(change, 1),
+            "regression": change > threshold,
+        })
+    return {
+        "base_commit": base.get("commit"),
+        "new_commit": new.get("commit"),
+        "threshold_pct": threshold,
+        "regressions": sum(row["regression"] for row in rows),
+        "metrics": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown reported as a regression")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if base.get("benchmark") != new.get("benchmark"):
+        parser.error(f"reports are from different benchmarks: {base.get('benchmark')} and {new.get('benchmark')}")
+    if base.get("machine") != new.get("machine"):
+        print(f"warning: reports come from different machines ({base.get('machine')} / {new.get('machine')})",
+              file=sys.stderr)
+
+    for key in sorted(set(base) & set(new) - METADATA):
+        if not isinstance(base[key], dict) and base[key] != new[key]:
+            print(f"warning: {key} differs ({base[key]} / {new[key]}); totals are not comparable", file=sys.stderr)
+
+    result = compare(base, new, args.threshold)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# Seeded synthetic league data for benchmarks
+import io
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+import bson
+
+from crud import match_to_document, location_coords, pin_match_fields
+from csv_import import EVASION_TIME
+from models import Match, Player, Round, Team
+from routers.matches import apply_round
+
+INSERT_BATCH = 5_000
+ROUND_TIME = 20
+# Chance that a round ends in a tag, and that a played match was filmed
+TAG_RATE = 0.6
+FILMED_RATE = 0.3
+TEAM_SIZE = 3
+
+
+def object_id(rng: random.Random) -> bson.ObjectId:
+    # Derived from the seed so repeated runs generate identical documents
+    return bson.ObjectId(rng.randbytes(12))
+
+
+def make_players(count: int, teams: int, rng: random.Random) -> List[Player]:
+    team_ids = [str(object_id(rng)) for _ in range(teams)]
+    return [
+        Player(id=str(object_id(rng)), name=f"Player {_letters(i)}", team_id=rng.choice(team_ids))
+        for i in range(count)
+    ]
+
+
+def make_teams(players: List[Player]) -> List[Team]:
+    """The teams the players' team_ids refer to."""
+    return [Team(id=team_id, name=f"Team {_letters(i)}") for i, team_id in enumerate(sorted({p.team_id for p in players}))]
+
+
+def _letters(i: int) -> str:
+    # Player names may only contain letters
+    out = ""
+    while True:
+        out = chr(ord("a") + i % 26) + out
+        i //= 26
+        if i == 0:
+            return out.capitalize()
+
+
+def play_match(players: List[Player], teams: List[Team], rng: random.Random, date: datetime) -> Match:
+    """
+    A match played round by round through the add_round rules (apply_round), so evader
+    order, early finishes and sudden deaths come out as they would in production.
+    """
+    rosters: Dict[str, List[Player]] = {}
+    for p in players:
+        rosters.setdefault(p.team_id, []).append(p)
+    full_teams = [t for t in teams if len(rosters.get(t.id, [])) >= TEAM_SIZE]
+
+    if rng.random() < 0.5 or len(full_teams) < 2:
+        p1, p2 = rng.sample(players, 2)
+        match = Match(date=date, match_type="1v1", player1=p1, player2=p2)
+        sides = ([p1], [p2])
+    else:
+        team1, team2 = rng.sample(full_teams, 2)
+        sides = (rng.sample(rosters[team1.id], TEAM_SIZE), rng.sample(rosters[team2.id], TEAM_SIZE))
+        match = Match(
+            date=date,
+            match_type="team",
+            team1_name=team1.name,
+            team2_name=team2.name,
+            team1_players=sides[0],
+            team2_players=sides[1],
+        )
+    if rng.random() < FILMED_RATE:
+        match.video_url = f"https://www.youtube.com/watch?v={rng.randrange(10**9)}"
+
+    first_side = rng.randrange(2)
+    while not match.is_completed:
+        index = len(match.rounds)
+        if match.match_type == "1v1":
+            # Evaders alternate, starting with whoever evaded first (sudden death included)
+            side = first_side if index % 2 == 0 else 1 - first_side
+            evader, chaser = sides[side][0], sides[1 - side][0]
+        elif match.is_sudden_death:
+            # One sudden death round per team, team 1 evading first
+            side = index % 2
+            evader, chaser = rng.choice(sides[side]), rng.choice(sides[1 - side])
+        elif index == 0:
+            evader, chaser = rng.choice(sides[first_side]), rng.choice(sides[1 - first_side])
+        else:
+            last = match.rounds[-1]
+            # A successful evader keeps evading; after a tag the chaser evades next
+            evader = last.chaser if last.tag_made else last.evader
+            side = 0 if any(p.id == evader.id for p in sides[0]) else 1
+            chaser = rng.choice(sides[1 - side])
+        tag_made = rng.random() < TAG_RATE
+        video_url = None
+        if match.video_url:
+            video_url = f"{match.video_url}&t=0h{rng.randrange(60)}m{rng.randrange(60)}s"
+        apply_round(
+            match, chaser, evader, tag_made,
+            round(rng.uniform(1, ROUND_TIME), 2) if tag_made else None, video_url,
+        )
+    return match
+
+
+def make_league(total_rounds: int, players: List[Player], teams: List[Team], rng: random.Random,
+                start: datetime = datetime(2022, 1, 1)) -> Iterator[Match]:
+    """Played matches, six hours apart and each with an id, until about total_rounds rounds exist."""
+    played = 0
+    i = 0
+    while played < total_rounds:
+        match = play_match(players, teams, rng, start + timedelta(hours=6 * i))
+        match.id = str(object_id(rng))
+        played += len(match.rounds)
+        i += 1
+        yield match
+
+
+def import_csv(matches: List[Match]) -> str:
+    """The league as an import file: matchNumber,roundNumber,chaserName,evaderName,tagTime."""
+    out = io.StringIO()
+    for match_no, match in enumerate(matches, 1):
+        for round_no, r in enumerate(match.rounds, 1):
+            tag_time = r.tag_time if r.tag_made else EVASION_TIME
+            out.write(f"{match_no},{round_no},{r.chaser.name},{r.evader.name},{tag_time}\n")
+    return out.getvalue()
+
+
+def make_pins(match_doc: Dict[str, Any], rng: random.Random, per_round: float) -> List[Dict[str, Any]]:
+    pins = []
+    for round_index, round_doc in enumerate(match_doc.get("rounds", [])):
+        if not round_doc["tag_made"] or rng.random() > per_round:
+            continue
+        location = {"x": round(rng.uniform(0, 100), 2), "y": round(rng.uniform(0, 100), 2)}
+        pin = {
+            "location": location,
+            "chaser_id": round_doc["chaser"]["id"],
+            "evader_id": round_doc["evader"]["id"],
+            "match_id": str(match_doc["_id"]),
+            "round_index": round_index,
+            **pin_match_fields(match_doc, round_index),
+        }
+        coords = location_coords(location)
+        if coords:
+            pin["coords"] = coords
+        pins.append(pin)
+    return pins
+
+
+async def seed(db, players: int = 500, teams: int = 20, total_rounds: int = 80_000,
+               pins_per_round: float = 0.5, seed: int = 42) -> Dict[str, Any]:
+    """
+    Replace the players, teams, matches and pins collections of db with a reproducible league.
+
+    Matches are played through the scoring rules (see play_match) until about total_rounds
+    rounds exist. Returns the generated players so benchmarks can pick ids to query.
+    """
+    rng = random.Random(seed)
+    for name in ("players", "teams", "matches", "pins"):
+        await db[name].drop()
+
+    roster = make_players(players, teams, rng)
+    league_teams = make_teams(roster)
+    await db["players"].insert_many([
+        {"_id": bson.ObjectId(p.id), "name": p.name, "team_id": p.team_id, "image_id": None} for p in roster
+    ])
+    await db["teams"].insert_many([{"_id": bson.ObjectId(t.id), "name": t.name} for t in league_teams])
+
+    league = make_league(total_rounds, roster, league_teams, rng)
+
+    match_docs: List[Dict[str, Any]] = []
+    pin_docs: List[Dict[str, Any]] = []
+    match_count = round_count = 0
+    for match in league:
+        doc = match_to_document(match)
+        match_docs.append(doc)
+        match_count += 1
+        round_count += len(match.rounds)
+        pin_docs.extend(make_pins(doc, rng, pins_per_round))
+        if len(match_docs) >= INSERT_BATCH:
+            await db["matches"].insert_many(match_docs, ordered=False)
+            match_docs = []
+        if len(pin_docs) >= INSERT_BATCH:
+            await db["pins"].insert_many(pin_docs, ordered=False)
+            pin_docs = []
+    if match_docs:
+        await db["matches"].insert_many(match_docs, ordered=False)
+    if pin_docs:
+        await db["pins"].insert_many(pin_docs, ordered=False)
+
+    return {
+        "players": roster,
+        "teams": [t.id for t in league_teams],
+        "matches": match_count,
+        "rounds": round_count,
+        "pins": await db["pins"].count_documents({}),
+    }
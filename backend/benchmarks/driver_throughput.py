@@ -0,0 +1,115 @@
+"""
+Compare read throughput of the hot endpoints' data access on PyMongo's native
+asyncio client against Motor.
+
+Seeds a scratch database, then for each driver runs the crud/statistics calls behind
+GET /matches/, GET /players/{id}/stats, GET /pins/enriched and GET /players/ from
+--concurrency coroutines for --duration seconds each, bypassing the response cache.
+Motor is only needed for the "before" numbers; without it only PyMongo is measured.
+
+Usage (from backend/, against a local mongod):
+    python -m benchmarks.driver_throughput --rounds 80000 --concurrency 32
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from pymongo import AsyncMongoClient
+
+from benchmarks.common import BENCH_DB_NAME, MONGODB_URL, percentile, write_report
+from benchmarks.dataset import seed
+from crud import get_matches, get_pins, search_players
+from database import ensure_indexes
+from statistics import calculate_player_stats
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:  # Motor is no longer a dependency of the backend
+    AsyncIOMotorClient = None
+
+
+def scenarios(db, players: List[str], teams: List[str], rng: random.Random) -> Dict[str, Callable[[], Awaitable[Any]]]:
+    def player_pins():
+        player_id = rng.choice(players)
+        return get_pins(db, {"$or": [{"chaser_id": player_id}, {"evader_id": player_id}]})
+
+    return {
+        "list_matches_team": lambda: get_matches(db, {"team_ids": rng.choice(teams)}, [("date", -1), ("_id", -1)]),
+        "player_stats": lambda: calculate_player_stats(db, player_id=rng.choice(players)),
+        "enriched_pins_player": player_pins,
+        "list_players_page": lambda: search_players(db, limit=50, skip=rng.randrange(0, len(players))),
+    }
+
+
+async def drive(call: Callable[[], Awaitable[Any]], concurrency: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "ops_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+    }
+
+
+async def run_driver(name: str, db, players: List[str], teams: List[str], args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    results = {}
+    for scenario, call in scenarios(db, players, teams, rng).items():
+        await call()  # warm the pool and server caches
+        results[scenario] = await drive(call, args.concurrency, args.duration)
+        print(f"{name:8s} {scenario:22s} {results[scenario]}", flush=True)
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=80_000, help="Rounds in the seeded league")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario and driver")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    client = AsyncMongoClient(MONGODB_URL)
+    db = client[BENCH_DB_NAME]
+    dataset = await seed(db, players=args.players, total_rounds=args.rounds, seed=args.seed)
+    await ensure_indexes(db)
+    players = [p.id for p in dataset["players"]]
+
+    report: Dict[str, Any] = {
+        "benchmark": "driver_throughput",
+        "matches": dataset["matches"],
+        "rounds": dataset["rounds"],
+        "concurrency": args.concurrency,
+    }
+    try:
+        report["pymongo_async"] = await run_driver("pymongo", db, players, dataset["teams"], args)
+    finally:
+        await client.close()
+
+    if AsyncIOMotorClient is None:
+        report["motor"] = "not installed (pip install motor to measure the baseline)"
+    else:
+        motor_client = AsyncIOMotorClient(MONGODB_URL)
+        try:
+            report["motor"] = await run_driver("motor", motor_client[BENCH_DB_NAME], players, dataset["teams"], args)
+        finally:
+            motor_client.close()
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+"""
+Endpoint-level benchmarks against a local mongod.
+
+Seeds a scratch database with a league played through the scoring rules (see
+benchmarks.dataset.seed with total_rounds), builds the production indexes, and
+calls the hot endpoints one request at a time through the real ASGI app
+(middleware, auth, caching and serialization included, no network). Read endpoints
+are timed cold (response cache cleared before every request) and warm. add_round
+is timed on freshly created matches. Each case reports latency percentiles,
+Mongo round trips and response size. Results are printed as JSON and written to
+--output if given.
+
+Usage (from backend/, against a local mongod):
+    python -m benchmarks.endpoints --rounds 100000 --output endpoints.json
+"""
+import os
+
+# Quiet the per-request access logging of the app before it is imported
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+
+import request_context
+from app import app
+from benchmarks.common import BENCH_DB_NAME, percentile, write_report
+from benchmarks.dataset import seed
+from cache import response_cache
+from crud import add_match
+from database import close_client, ensure_indexes, get_client, get_db
+from migrations import run_migrations
+from models import Match
+from rate_limit import limiter
+from routers.login import create_access_token
+
+
+async def timed_requests(client: httpx.AsyncClient, paths: List[str], cold: bool, method: str = "GET",
+                         body=None) -> Dict[str, Any]:
+    latencies: List[float] = []
+    round_trips: List[int] = []
+    sizes: List[int] = []
+    errors = 0
+    for path in paths:
+        if cold:
+            response_cache.clear()
+        started = time.perf_counter()
+        response = await client.request(method, path, json=body(path) if body else None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            errors += 1
+        round_trips.append(int(response.headers.get("x-db-round-trips", 0)))
+        sizes.append(len(response.content))
+    return {
+        "requests": len(paths),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "db_round_trips": max(round_trips),
+        "response_bytes": round(sum(sizes) / len(sizes)),
+    }
+
+
+def read_cases(players: List[str], teams: List[str], match_ids: List[str], rng: random.Random,
+               requests: int) -> Dict[str, List[str]]:
+    """Request paths per endpoint; ids vary so that cold requests are not repeats."""
+    def pick(values):
+        return [rng.choice(values) for _ in range(requests)]
+
+    return {
+        "GET /matches/": ["/matches/?sort=-date"] * requests,
+        "GET /matches/?player_id": [f"/matches/?player_id={p}&sort=-date" for p in pick(players)],
+        "GET /matches/{match_id}": [f"/matches/{m}" for m in pick(match_ids)],
+        "GET /players/": ["/players/"] * requests,
+        "GET /players/{player_id}/stats": [f"/players/{p}/stats" for p in pick(players)],
+        "GET /players/{player_id}/versus/{opponent_id}": [
+            f"/players/{a}/versus/{b}" for a, b in zip(pick(players), pick(players))
+        ],
+        "GET /players/versus-matrix?team_id": [f"/players/versus-matrix?team_id={t}" for t in pick(teams)],
+        "GET /pins/enriched?player_id": [f"/pins/enriched?player_id={p}" for p in pick(players)],
+        "GET /pins/heatmap": ["/pins/heatmap?bins=20&sigma=1"] * requests,
+    }
+
+
+async def add_round_case(client: httpx.AsyncClient, db, players, rng: random.Random, requests: int) -> Dict[str, Any]:
+    """POST the first round of freshly created 1v1 matches."""
+    created = {}
+    for _ in range(requests):
+        p1, p2 = rng.sample(players, 2)
+        match = await add_match(db, Match(date=datetime(2024, 6, 1), match_type="1v1", player1=p1, player2=p2))
+        created[f"/matches/{match.id}/rounds"] = (p1, p2)
+
+    def body(path):
+        p1, p2 = created[path]
+        return {"chaser_id": p2.id, "evader_id": p1.id, "tag_made": True, "tag_time": 7.5}
+
+    return await timed_requests(client, list(created), cold=False, method="POST", body=body)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=100_000, help="Rounds in the seeded league")
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint and mode")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    db = get_client()[BENCH_DB_NAME]
+    started = time.perf_counter()
+    dataset = await seed(db, players=args.players, teams=args.teams, total_rounds=args.rounds, seed=args.seed)
+    await ensure_indexes(db)
+    await run_migrations(db)
+    seeded_s = round(time.perf_counter() - started, 1)
+    match_ids = [str(doc["_id"]) async for doc in db["matches"].find({}, {"_id": 1})]
+
+    async def bench_db():
+        yield db
+
+    app.dependency_overrides[get_db] = bench_db
+    limiter.enabled = False
+    request_context.DB_STATS_HEADERS = True
+    token = create_access_token({"sub": "admin", "role": "Admin"})
+
+    rng = random.Random(args.seed)
+    player_ids = [p.id for p in dataset["players"]]
+    report: Dict[str, Any] = {
+        "benchmark": "endpoints",
+        "seed": args.seed,
+        "players": args.players,
+        "matches": dataset["matches"],
+        "rounds": dataset["rounds"],
+        "pins": dataset["pins"],
+        "seed_s": seeded_s,
+    }
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                     headers={"Authorization": f"Bearer {token}"}) as client:
+            for name, paths in read_cases(player_ids, dataset["teams"], match_ids, rng, args.requests).items():
+                await client.get(paths[0])  # warm the pool and the server's caches
+                report[name] = {
+                    "cold": await timed_requests(client, paths, cold=True),
+                    "warm": await timed_requests(client, paths, cold=False),
+                }
+            report["POST /matches/{match_id}/rounds"] = await add_round_case(
+                client, db, dataset["players"], rng, args.requests
+            )
+    finally:
+        await close_client()
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,442 @@
+"""
+Load-test a running backend with a realistic mix of traffic.
+
+Virtual users run one of these scenarios in a loop until --duration is over:
+  scorekeeper  plays a match round by round (create it, POST each round, a pin on
+               most tags, re-read the match after every round)            [admin]
+  spectator    lists matches, then polls one match and its pins every
+               --poll-interval seconds, revalidating with If-None-Match    [team user]
+  coach        PlayerDetail (players, stats, versus, enriched pins) and QuadPins
+               (enriched pins by role and match type) for their team       [team user]
+  login        bursts of --login-burst concurrent logins followed by GET /login/
+  importer     imports a CSV of --import-matches generated matches         [admin]
+Think times model people at a match (a round takes about 20 s); --think-scale 0
+turns every user into a closed loop that sends requests back to back.
+
+Latency percentiles, throughput and error rate are reported per endpoint (route
+template) and per scenario, counted after --warmup. Results are printed as JSON and
+written to --output if given.
+
+Start mongod and the backend locally the way they run in a pod, e.g.:
+    cd backend
+    DATABASE_NAME=wct_stats_bench ADMIN_PASSWORD=... RATE_LIMIT=1000000/minute \\
+        gunicorn app:app -c gunicorn.conf.py --workers 2
+then (from backend/):
+    ADMIN_PASSWORD=... python -m benchmarks.loadtest --seed-rounds 100000 \\
+        --users scorekeeper=4,spectator=60,coach=15,login=2,importer=1 --duration 300 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+from pymongo import AsyncMongoClient
+
+from benchmarks.common import BENCH_DB_NAME, MONGODB_URL, percentile, write_report
+from benchmarks.dataset import import_csv, make_league, play_match, seed
+from cache import bump_data_version
+from database import ensure_indexes
+from models import Player, Team
+
+SCENARIOS = ("scorekeeper", "spectator", "coach", "login", "importer")
+DEFAULT_MIX = "scorekeeper=2,spectator=20,coach=6,login=1,importer=1"
+ACCOUNT_PASSWORD = "Loadtest123!"
+PIN_RATE = 0.7
+PROGRESS_INTERVAL = 10.0
+
+
+class Stats:
+    """Latencies and outcomes per endpoint and per scenario."""
+
+    def __init__(self):
+        self.recording = False
+        self.started = 0.0
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+        self.scenario_requests: Counter = Counter()
+        self.scenario_errors: Counter = Counter()
+
+    def start(self):
+        self.recording = True
+        self.started = time.monotonic()
+
+    def record(self, scenario: str, endpoint: str, seconds: float, outcome, failed: bool):
+        if not self.recording:
+            return
+        self.latencies[endpoint].append(seconds * 1000)
+        self.outcomes[endpoint][str(outcome)] += 1
+        self.scenario_requests[scenario] += 1
+        if failed:
+            self.errors[endpoint] += 1
+            self.scenario_errors[scenario] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        def row(latencies: List[float], errors: int) -> Dict[str, Any]:
+            return {
+                "requests": len(latencies),
+                "errors": errors,
+                "error_rate": round(errors / len(latencies), 4),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "max_ms": round(max(latencies), 1),
+            }
+
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        return {
+            "measured_s": round(elapsed, 1),
+            "total": row(everything, sum(self.errors.values())) if everything else None,
+            "endpoints": {
+                endpoint: {**row(latencies, self.errors[endpoint]), "outcomes": dict(self.outcomes[endpoint])}
+                for endpoint, latencies in sorted(self.latencies.items())
+            },
+            "scenarios": {
+                scenario: {
+                    "requests": count,
+                    "errors": self.scenario_errors[scenario],
+                    "throughput_rps": round(count / elapsed, 2),
+                }
+                for scenario, count in sorted(self.scenario_requests.items())
+            },
+        }
+
+
+class User:
+    """One virtual user: an HTTP client with an identity, recording every request."""
+
+    def __init__(self, scenario: str, client: httpx.AsyncClient, stats: Stats, stop: asyncio.Event,
+                 rng: random.Random, think_scale: float):
+        self.scenario = scenario
+        self.client = client
+        self.stats = stats
+        self.stop = stop
+        self.rng = rng
+        self.think_scale = think_scale
+        self.headers: Dict[str, str] = {}
+        self.etags: Dict[str, str] = {}
+
+    async def request(self, endpoint: str, method: str, path: str, revalidate: bool = False,
+                      **kwargs) -> Optional[httpx.Response]:
+        headers = dict(self.headers)
+        if revalidate and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(self.scenario, endpoint, time.perf_counter() - started, type(e).__name__, True)
+            return None
+        self.stats.record(
+            self.scenario, endpoint, time.perf_counter() - started, response.status_code, response.status_code >= 400
+        )
+        if revalidate and "etag" in response.headers:
+            self.etags[path] = response.headers["etag"]
+        return response
+
+    async def login(self, username: str, password: str) -> bool:
+        response = await self.request(
+            "POST /login/token", "POST", "/login/token", data={"username": username, "password": password}
+        )
+        if response is None or response.status_code != 200:
+            return False
+        self.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        return True
+
+    async def think(self, seconds: float):
+        """Sleep about `seconds` (scaled, jittered); returns early when the test ends."""
+        delay = seconds * self.think_scale * self.rng.uniform(0.5, 1.5)
+        try:
+            await asyncio.wait_for(self.stop.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+
+class League:
+    """What the scenarios pick ids and names from, read once through the API."""
+
+    def __init__(self, players: List[Player], teams: List[Team], accounts: List[Dict[str, str]]):
+        self.players = players
+        self.teams = teams
+        self.accounts = accounts
+        self.by_team: Dict[str, List[Player]] = defaultdict(list)
+        for p in players:
+            self.by_team[p.team_id].append(p)
+
+
+def json_ok(response: Optional[httpx.Response]):
+    return response.json() if response is not None and response.status_code == 200 else None
+
+
+async def scorekeeper(user: User, league: League, args):
+    """Score a whole match the way the match-day screen does."""
+    await user.login(args.admin_user, args.admin_password)
+    while not user.stop.is_set():
+        match = play_match(league.players, league.teams, user.rng, datetime.now(timezone.utc))
+        body: Dict[str, Any] = {"match_type": match.match_type, "date": match.date.isoformat()}
+        if match.match_type == "1v1":
+            body.update(player1_id=match.player1.id, player2_id=match.player2.id)
+        else:
+            body.update(
+                team1_name=match.team1_name, team2_name=match.team2_name,
+                team1_player_ids=[p.id for p in match.team1_players],
+                team2_player_ids=[p.id for p in match.team2_players],
+            )
+        created = json_ok(await user.request("POST /matches/", "POST", "/matches/", json=body))
+        if created is None:
+            await user.think(args.round_think)
+            continue
+        match_id = created.get("id") or created.get("_id")
+        for index, r in enumerate(match.rounds):
+            if user.stop.is_set():
+                return
+            await user.think(args.round_think)
+            played = await user.request(
+                "POST /matches/{match_id}/rounds", "POST", f"/matches/{match_id}/rounds",
+                json={"chaser_id": r.chaser.id, "evader_id": r.evader.id, "tag_made": r.tag_made, "tag_time": r.tag_time},
+            )
+            if played is None or played.status_code != 200:
+                break
+            if r.tag_made and user.rng.random() < PIN_RATE:
+                await user.request("POST /pins/", "POST", "/pins/", json={
+                    "location": {"x": round(user.rng.uniform(0, 100), 2), "y": round(user.rng.uniform(0, 100), 2)},
+                    "chaser_id": r.chaser.id, "evader_id": r.evader.id, "match_id": match_id, "round_index": index,
+                })
+            await user.request("GET /matches/{match_id}", "GET", f"/matches/{match_id}")
+
+
+async def spectator(user: User, league: League, args):
+    """Follow a team's matches: the list, then one match and its pins on a poll interval."""
+    account = user.rng.choice(league.accounts)
+    await user.login(account["username"], ACCOUNT_PASSWORD)
+    while not user.stop.is_set():
+        matches = json_ok(await user.request("GET /matches/", "GET", "/matches/?sort=-date", revalidate=True))
+        if not matches:
+            await user.think(args.poll_interval)
+            continue
+        match_id = user.rng.choice(matches[:10])["id"]
+        for _ in range(user.rng.randint(3, 12)):
+            if user.stop.is_set():
+                return
+            await user.request("GET /matches/{match_id}", "GET", f"/matches/{match_id}", revalidate=True)
+            await user.request("GET /pins/", "GET", f"/pins/?match_id={match_id}", revalidate=True)
+            await user.think(args.poll_interval)
+
+
+async def coach(user: User, league: League, args):
+    """Browse PlayerDetail and QuadPins for players of the coach's team."""
+    account = user.rng.choice(league.accounts)
+    await user.login(account["username"], ACCOUNT_PASSWORD)
+    squad = league.by_team.get(account["team_id"]) or league.players
+    while not user.stop.is_set():
+        player = user.rng.choice(squad)
+        # PlayerDetail
+        await user.request("GET /players/", "GET", "/players/")
+        match_type = user.rng.choice(["", "", "1v1", "team"])
+        query = f"?match_type={match_type}" if match_type else ""
+        await user.request("GET /players/{player_id}/stats", "GET", f"/players/{player.id}/stats{query}")
+        await user.request("GET /pins/enriched", "GET", f"/pins/enriched?player_id={player.id}")
+        await user.think(args.page_think)
+        teammates = [p for p in squad if p.id != player.id]
+        if teammates and user.rng.random() < 0.4:
+            opponent = user.rng.choice(teammates)
+            await user.request(
+                "GET /players/{player_id}/versus/{opponent_id}", "GET", f"/players/{player.id}/versus/{opponent.id}"
+            )
+            await user.think(args.page_think)
+        # QuadPins
+        if user.rng.random() < 0.5:
+            await user.request("GET /players/", "GET", "/players/")
+            role = user.rng.choice(["chaser", "evader"])
+            await user.request("GET /pins/enriched", "GET", f"/pins/enriched?player_id={player.id}&role={role}")
+            await user.think(args.page_think)
+
+
+async def login_burst(user: User, league: League, args):
+    """Many people opening the app at once, e.g. at the start of a session."""
+    while not user.stop.is_set():
+        accounts = [user.rng.choice(league.accounts) for _ in range(args.login_burst)]
+
+        async def one(account):
+            member = User(user.scenario, user.client, user.stats, user.stop, user.rng, user.think_scale)
+            if await member.login(account["username"], ACCOUNT_PASSWORD):
+                await member.request("GET /login/", "GET", "/login/")
+
+        await asyncio.gather(*(one(account) for account in accounts))
+        await user.think(args.login_interval)
+
+
+async def importer(user: User, league: League, args):
+    """An admin importing a CSV of recorded matches."""
+    await user.login(args.admin_user, args.admin_password)
+    while not user.stop.is_set():
+        await user.think(args.import_interval)
+        if user.stop.is_set():
+            return
+        matches = []
+        for match in make_league(args.import_matches * 8, league.players, league.teams, user.rng):
+            matches.append(match)
+            if len(matches) == args.import_matches:
+                break
+        await user.request(
+            "POST /matches/import_csv", "POST", "/matches/import_csv",
+            files={"file": ("matches.csv", import_csv(matches).encode(), "text/csv")},
+            data={"match_numbers": json.dumps(list(range(1, len(matches) + 1))), "dry_run": str(args.import_dry_run).lower()},
+        )
+
+
+RUNNERS = {
+    "scorekeeper": scorekeeper,
+    "spectator": spectator,
+    "coach": coach,
+    "login": login_burst,
+    "importer": importer,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, count = item.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown scenario {name!r}; expected one of {', '.join(SCENARIOS)}")
+        mix[name] = int(count)
+    return mix
+
+
+async def seed_database(args) -> Dict[str, Any]:
+    client = AsyncMongoClient(MONGODB_URL)
+    try:
+        db = client[args.database]
+        dataset = await seed(db, players=args.players, teams=args.teams, total_rounds=args.seed_rounds, seed=args.seed)
+        await ensure_indexes(db)
+        # Workers of the running backend must not keep serving responses cached before the reseed
+        await bump_data_version(db)
+    finally:
+        await client.close()
+    return {"matches": dataset["matches"], "rounds": dataset["rounds"], "pins": dataset["pins"]}
+
+
+async def prepare(client: httpx.AsyncClient, args) -> League:
+    """Read the roster through the API and register the team accounts the users log in with."""
+    admin = User("setup", client, Stats(), asyncio.Event(), random.Random(args.seed), 0)
+    if not await admin.login(args.admin_user, args.admin_password):
+        raise SystemExit(f"Cannot log in to {args.url} as {args.admin_user}; set ADMIN_PASSWORD or --admin-password")
+    players = [Player(**p) for p in (await admin.request("setup", "GET", "/players/")).json()]
+    teams = [Team(**t) for t in (await admin.request("setup", "GET", "/teams/")).json()]
+    if len(players) < 6 or not teams:
+        raise SystemExit("The database has too few players or teams; seed it with --seed-rounds")
+
+    accounts = []
+    for i in range(args.accounts):
+        account = {"username": f"loadtest{i}", "team_id": teams[i % len(teams)].id}
+        response = await admin.request("setup", "POST", "/login/register", json={
+            "username": account["username"], "password": ACCOUNT_PASSWORD, "team_id": account["team_id"],
+        })
+        if response is None or response.status_code not in (200, 400):  # 400: registered by an earlier run
+            raise SystemExit(f"Registering {account['username']} failed: {response and response.text}")
+        accounts.append(account)
+    return League(players, teams, accounts)
+
+
+async def progress(stats: Stats, stop: asyncio.Event):
+    last = 0
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), PROGRESS_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        if stats.recording:
+            done = sum(len(latencies) for latencies in stats.latencies.values())
+            print(f"{time.monotonic() - stats.started:6.0f}s  {(done - last) / PROGRESS_INTERVAL:8.1f} req/s  "
+                  f"{sum(stats.errors.values())} errors", file=sys.stderr, flush=True)
+            last = done
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running backend")
+    parser.add_argument("--users", default=DEFAULT_MIX, help="Virtual users per scenario")
+    parser.add_argument("--duration", type=float, default=120.0, help="Seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=15.0, help="Seconds of load before measuring")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds over which users are started")
+    parser.add_argument("--think-scale", type=float, default=1.0, help="Multiplier for every think time; 0 for none")
+    parser.add_argument("--round-think", type=float, default=20.0, help="Seconds between rounds for scorekeepers")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between spectator polls")
+    parser.add_argument("--page-think", type=float, default=6.0, help="Seconds coaches spend on a page")
+    parser.add_argument("--login-burst", type=int, default=20, help="Concurrent logins per burst")
+    parser.add_argument("--login-interval", type=float, default=30.0, help="Seconds between login bursts")
+    parser.add_argument("--import-matches", type=int, default=40, help="Matches per imported CSV")
+    parser.add_argument("--import-interval", type=float, default=60.0, help="Seconds between CSV imports")
+    parser.add_argument("--import-dry-run", action="store_true", help="Validate the CSV without writing matches")
+    parser.add_argument("--accounts", type=int, default=20, help="Team user accounts shared by spectators and coaches")
+    parser.add_argument("--admin-user", default="admin")
+    parser.add_argument("--admin-password", default=os.getenv("ADMIN_PASSWORD"))
+    parser.add_argument("--seed-rounds", type=int, help="Reseed --database with a league of this many rounds first")
+    parser.add_argument("--database", default=BENCH_DB_NAME, help="The backend's DATABASE_NAME, for --seed-rounds")
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds before a request counts as failed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    try:
+        mix = parse_mix(args.users)
+    except ValueError as e:
+        parser.error(str(e))
+
+    report: Dict[str, Any] = {
+        "benchmark": "loadtest",
+        "url": args.url,
+        "users": mix,
+        "think_scale": args.think_scale,
+        "duration_s": args.duration,
+    }
+    if args.seed_rounds:
+        report["seeded"] = await seed_database(args)
+
+    limits = httpx.Limits(max_connections=sum(mix.values()) + args.login_burst * mix.get("login", 0) + 10)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        league = await prepare(client, args)
+        stats = Stats()
+        stop = asyncio.Event()
+        rng = random.Random(args.seed)
+        users = [(scenario, random.Random(rng.random())) for scenario, count in mix.items() for _ in range(count)]
+        rng.shuffle(users)
+
+        async def run(delay: float, scenario: str, user_rng: random.Random):
+            await asyncio.sleep(delay)
+            await RUNNERS[scenario](User(scenario, client, stats, stop, user_rng, args.think_scale), league, args)
+
+        step = args.ramp_up / max(1, len(users))
+        tasks = [asyncio.create_task(run(i * step, scenario, user_rng)) for i, (scenario, user_rng) in enumerate(users)]
+        reporter = asyncio.create_task(progress(stats, stop))
+        await asyncio.sleep(args.warmup)
+        stats.start()
+        await asyncio.sleep(args.duration)
+        elapsed = time.monotonic() - stats.started
+        stats.recording = False
+        stop.set()
+        # Users finish their current request; anything still waiting after the timeout is cancelled
+        done, pending = await asyncio.wait(tasks, timeout=args.timeout)
+        for task in pending:
+            task.cancel()
+        failures = [task.exception() for task in done if not task.cancelled() and task.exception()]
+        await reporter
+
+    report.update(stats.summary(elapsed))
+    if failures:
+        report["user_failures"] = sorted({f"{type(e).__name__}: {e}" for e in failures})
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Measure what logging costs the request path.
+
+Replays the log calls of one add_round request on a team match played through the
+scoring rules (a dozen scoring-trace lines and a few INFO lines), with the old eager f-string calls and a full match dump going to a
+synchronous stdout-style handler, and again through the queue-based pipeline from
+logging_config at INFO and at DEBUG. The handler writes to a temporary file so
+terminal speed does not skew the numbers. Only the time spent on the calling thread
+(the event loop in production) is reported. Results are printed as JSON and
+written to --output if given.
+
+Usage (from backend/, no database needed):
+    python -m benchmarks.logging_overhead --requests 20000
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import percentile, write_report
+from benchmarks.dataset import make_players, make_teams, play_match
+from logging_config import configure_logging, stop_logging
+
+logger = logging.getLogger("routers.matches")
+
+
+def eager_request(match):
+    # The shape of add_round's logging before the structured pipeline
+    logger.info(f"Adding round to match {match.id}")
+    logger.info(f"Request data: chaser={match.rounds[0].chaser.id}, evader={match.rounds[0].evader.id}, tag_made=True, tag_time=4.2")
+    logger.info(f"Found match: {match.model_dump()}")
+    logger.info(f"Found players: chaser={match.rounds[0].chaser.name}, evader={match.rounds[0].evader.name}")
+    logger.info(f"Team Match - Round: {len(match.rounds) + 1}")
+    logger.info(f"Evader: {match.rounds[0].evader.name} (Team 1)")
+    logger.info(f"Chaser: {match.rounds[0].chaser.name} (Team 2)")
+    logger.info(f"Previous Round - Evader: {match.rounds[-1].evader.name}, Tag Made: {match.rounds[-1].tag_made}")
+    logger.info("Validated: Previous successful chaser is now evading")
+    logger.info(f"Video URL: {match.rounds[-1].video_url}")
+    logger.info(f"Match Updated - Completed: {match.is_completed}, Winner: {match.winner}, Sudden Death: {match.is_sudden_death}")
+
+
+def lazy_request(match):
+    # add_round's logging now: scoring traces at DEBUG, lazily formatted
+    logger.info("Adding round to match %s", match.id)
+    logger.debug("Request data: chaser=%s, evader=%s, tag_made=%s, tag_time=%s",
+                 match.rounds[0].chaser.id, match.rounds[0].evader.id, True, 4.2)
+    logger.debug("Found match %s with %d rounds", match.id, len(match.rounds))
+    logger.debug("Found players: chaser=%s, evader=%s", match.rounds[0].chaser.name, match.rounds[0].evader.name)
+    logger.debug("Team Match - Round: %s", len(match.rounds) + 1)
+    logger.debug("Evader: %s (Team %s)", match.rounds[0].evader.name, 1)
+    logger.debug("Chaser: %s (Team %s)", match.rounds[0].chaser.name, 2)
+    logger.debug("Previous Round - Evader: %s, Tag Made: %s", match.rounds[-1].evader.name, match.rounds[-1].tag_made)
+    logger.debug("Validated: Previous successful chaser is now evading")
+    logger.debug("Video URL: %s", match.rounds[-1].video_url)
+    logger.info("Match Updated - Completed: %s, Winner: %s, Sudden Death: %s",
+                match.is_completed, match.winner, match.is_sudden_death)
+
+
+def configure_sync(stream):
+    # The old setup: basicConfig's handler formatting and writing on the calling thread
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def measure(request: Callable[[Any], None], match, requests: int) -> Dict[str, Any]:
+    timings: List[float] = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        request(match)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return {
+        "mean_us": round(sum(timings) / len(timings), 2),
+        "p50_us": round(percentile(timings, 50), 2),
+        "p99_us": round(percentile(timings, 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    players = make_players(24, 2, rng)
+    teams = make_teams(players)
+    match = play_match(players, teams, rng, datetime(2024, 5, 1))
+    while match.match_type != "team":
+        match = play_match(players, teams, rng, datetime(2024, 5, 1))
+    match.id = "6630f0f0f0f0f0f0f0f0f0f0"
+
+    report: Dict[str, Any] = {"benchmark": "logging_overhead", "requests": args.requests, "rounds": len(match.rounds)}
+    with tempfile.TemporaryFile("w") as sink:
+        configure_sync(sink)
+        report["sync_eager_info"] = measure(eager_request, match, args.requests)
+
+        configure_logging(level="INFO", fmt="json", stream=sink)
+        report["queued_lazy_info"] = measure(lazy_request, match, args.requests)
+
+        configure_logging(level="DEBUG", fmt="json", stream=sink)
+        report["queued_lazy_debug"] = measure(lazy_request, match, args.requests)
+
+        configure_logging(level="DEBUG", fmt="json", sample_rates="routers.matches=0.01", stream=sink)
+        report["queued_lazy_debug_sampled_1pct"] = measure(lazy_request, match, args.requests)
+        stop_logging()
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Microbenchmarks for the CPU-bound code on the hot paths.
+
+Generates a league in memory (matches played through the add_round rules, see
+benchmarks.dataset.play_match) and times, without any database:
+  - document_to_match and match_to_document over every match,
+  - calculate_player_stats for the busiest players, fed from an in-memory
+    matches collection (so the time is conversion plus aggregation),
+  - apply_round, the scoring logic of add_round, replaying every round,
+  - CSV import parsing: parse_rows, plan_matches and build_match over the
+    league exported as an import CSV.
+Each case reports the median and minimum time of a pass over all items and the
+per-item cost. Results are printed as JSON and written to --output if given.
+
+Usage (from backend/, no database needed):
+    python -m benchmarks.micro --rounds 100000 --output micro.json
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import bson
+
+from benchmarks.common import percentile, write_report
+from benchmarks.dataset import import_csv, make_league, make_players, make_teams
+from crud import document_to_match, match_to_document
+from csv_import import build_match, parse_rows, plan_matches
+from models import Match
+from routers.matches import apply_round
+from statistics import calculate_player_stats
+
+
+def measure(run: Callable[..., Any], items: int, repeat: int,
+            setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Time `repeat` passes of run(); with setup, run(setup()) with setup outside the timing."""
+    timings: List[float] = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        started = time.perf_counter()
+        run(*args)
+        timings.append(time.perf_counter() - started)
+    median = percentile(timings, 50)
+    return {
+        "items": items,
+        "median_ms": round(median * 1000, 2),
+        "min_ms": round(min(timings) * 1000, 2),
+        "per_item_us": round(median / items * 1e6, 2),
+        "items_per_s": round(items / median),
+    }
+
+
+class _Cursor:
+    def __init__(self, docs: List[bytes]):
+        self._docs = docs
+
+    def sort(self, _):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for raw in self._docs:
+            yield bson.decode(raw)
+
+
+class MemoryMatches:
+    """
+    Just enough of a matches collection for get_matches: find() by participant_ids only.
+
+    Documents are kept as BSON and decoded as they are iterated, like the driver does.
+    calculate_player_stats' other filters are unused here, so what is timed is the
+    decoding, the document conversion and the aggregation, not query evaluation.
+    """
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.by_player: Dict[str, List[bytes]] = {}
+        for doc in docs:
+            raw = bson.encode(doc)
+            for player_id in doc["participant_ids"]:
+                self.by_player.setdefault(player_id, []).append(raw)
+
+    def __getitem__(self, name):
+        return self
+
+    def find(self, query):
+        return _Cursor(self.by_player.get(query["participant_ids"], []))
+
+
+def blank(match: Match) -> Match:
+    """The match before its first round."""
+    return match.model_copy(update={
+        "rounds": [], "team1_score": 0, "team2_score": 0,
+        "is_sudden_death": False, "is_completed": False, "winner": None,
+    })
+
+
+def replay(blanks: List[Match], played: List[Match]):
+    for match, source in zip(blanks, played):
+        for r in source.rounds:
+            apply_round(match, r.chaser, r.evader, r.tag_made, r.tag_time, r.video_url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20_000, help="Rounds in the generated league")
+    parser.add_argument("--players", type=int, default=300)
+    parser.add_argument("--teams", type=int, default=15)
+    parser.add_argument("--stats-players", type=int, default=10, help="Busiest players to compute stats for")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    # apply_round logs every completed match at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    players = make_players(args.players, args.teams, rng)
+    matches = list(make_league(args.rounds, players, make_teams(players), rng))
+    docs = [match_to_document(m) for m in matches]
+    rounds = sum(len(m.rounds) for m in matches)
+
+    report: Dict[str, Any] = {
+        "benchmark": "micro",
+        "seed": args.seed,
+        "matches": len(matches),
+        "rounds": rounds,
+        "sudden_deaths": sum(m.is_sudden_death for m in matches),
+    }
+
+    # document_to_match converts the round dicts in place, so every pass gets freshly decoded documents
+    raw_docs = [bson.encode(d) for d in docs]
+    report["document_to_match"] = measure(
+        lambda fresh: [document_to_match(d) for d in fresh], len(docs), args.repeat,
+        setup=lambda: [bson.decode(raw) for raw in raw_docs],
+    )
+    report["match_to_document"] = measure(lambda: [match_to_document(m) for m in matches], len(matches), args.repeat)
+
+    db = MemoryMatches(docs)
+    busiest = [pid for pid, _ in Counter(pid for d in docs for pid in d["participant_ids"]).most_common(args.stats_players)]
+    loop = asyncio.new_event_loop()
+
+    def player_stats():
+        for player_id in busiest:
+            loop.run_until_complete(calculate_player_stats(db, player_id))
+
+    report["calculate_player_stats"] = measure(player_stats, len(busiest), args.repeat)
+    report["calculate_player_stats"]["matches_per_player"] = round(
+        sum(len(db.by_player[pid]) for pid in busiest) / max(1, len(busiest)), 1
+    )
+    loop.close()
+
+    report["apply_round"] = measure(
+        lambda blanks: replay(blanks, matches), rounds, args.repeat,
+        setup=lambda: [blank(m) for m in matches],  # copying is not part of the scoring cost
+    )
+
+    text = import_csv(matches)
+    lines = text.splitlines(keepends=True)
+    selected = set(range(1, len(matches) + 1))
+    report["csv_parse_rows"] = measure(lambda: parse_rows(lines, selected), len(lines), args.repeat)
+    by_match = parse_rows(lines, selected)
+    report["csv_plan_matches"] = measure(lambda: plan_matches(by_match), len(by_match), args.repeat)
+    plans = plan_matches(by_match)
+    by_name = {p.name.casefold(): p for p in players}
+    date = datetime(2024, 1, 1)
+    report["csv_build_match"] = measure(
+        lambda: [build_match(plan, by_name, date) for plan in plans if not plan["error"]], len(plans), args.repeat
+    )
+    report["csv_bytes"] = len(text)
+
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
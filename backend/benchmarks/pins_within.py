@@ -0,0 +1,107 @@
+"""
+Benchmark rectangle queries on pins backed by the 2d index on coords.
+
+Fills a scratch database with synthetic pins, builds the production indexes and
+times the /pins/within query shapes against the equivalent unindexed range
+filter on location.x / location.y. Results are printed as JSON and written to
+--output if given.
+
+Usage (from backend/, against a local mongod):
+    python -m benchmarks.pins_within --pins 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import AsyncMongoClient
+
+from benchmarks.common import BENCH_DB_NAME, MONGODB_URL, plan_stats, timed, write_report
+from database import ensure_indexes
+
+INSERT_BATCH = 10_000
+
+
+def synthetic_pins(count: int, players: int, seed: int):
+    rng = random.Random(seed)
+    player_ids = [f"player{i:05d}" for i in range(players)]
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        chaser, evader = rng.sample(player_ids, 2)
+        x = round(rng.uniform(0, 100), 2)
+        y = round(rng.uniform(0, 100), 2)
+        yield {
+            "location": {"x": x, "y": y},
+            "coords": [x, y],
+            "chaser_id": chaser,
+            "evader_id": evader,
+            "match_id": f"match{i // 40:07d}",
+            "round_index": i % 16,
+            "match_date": start + timedelta(days=rng.randrange(1000)),
+            "match_type": rng.choice(["team", "1v1"]),
+        }
+
+
+async def fill(db, count: int, players: int, seed: int):
+    batch = []
+    for doc in synthetic_pins(count, players, seed):
+        batch.append(doc)
+        if len(batch) == INSERT_BATCH:
+            await db["pins"].insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db["pins"].insert_many(batch, ordered=False)
+
+
+async def time_query(db, query, repeats: int):
+    result = await timed(lambda: db["pins"].find(query, {"_id": 1}).to_list(length=None), repeats)
+    result.update(plan_stats(await db["pins"].find(query).explain()))
+    return result
+
+
+def scenarios(player: str):
+    box = {"$geoWithin": {"$box": [[0, 0], [50, 50]]}}
+    rect = {"location.x": {"$gte": 0, "$lte": 50}, "location.y": {"$gte": 0, "$lte": 50}}
+    player_filter = {"chaser_id": player}
+    date_filter = {"match_date": {"$gte": datetime(2023, 1, 1, tzinfo=timezone.utc)}}
+    return {
+        "quadrant_2d": {"coords": box},
+        "quadrant_scan": rect,
+        "quadrant_player_2d": {"$and": [player_filter, {"coords": box}]},
+        "quadrant_player_scan": {"$and": [player_filter, rect]},
+        "quadrant_player_date_2d": {"$and": [player_filter, date_filter, {"coords": box}]},
+        "quadrant_player_date_scan": {"$and": [player_filter, date_filter, rect]},
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pins", type=int, default=1_000_000)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--keep", action="store_true", help="Reuse an existing benchmark database")
+    args = parser.parse_args()
+
+    client = AsyncMongoClient(MONGODB_URL)
+    db = client[BENCH_DB_NAME]
+    try:
+        if not args.keep or await db["pins"].estimated_document_count() != args.pins:
+            await client.drop_database(BENCH_DB_NAME)
+            started = time.perf_counter()
+            await fill(db, args.pins, args.players, args.seed)
+            print(f"Inserted {args.pins} pins in {time.perf_counter() - started:.1f}s", flush=True)
+        await ensure_indexes(db)
+
+        results = {}
+        for name, query in scenarios("player00007").items():
+            results[name] = await time_query(db, query, args.repeats)
+        write_report({"benchmark": "pins_within", "pins": args.pins, "results": results}, args.output)
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+"""
+Benchmark player name lookups against a large roster.
+
+Fills a scratch database with synthetic players, builds the production indexes and
+times the /players list, prefix search and autocomplete queries, plus the CSV import
+name lookup, against the unindexed alternatives (case-insensitive regex, loading
+every player). Results are printed as JSON and written to --output if given.
+
+Usage (from backend/, against a local mongod):
+    python -m benchmarks.players_search --players 50000
+"""
+import argparse
+import asyncio
+import random
+import string
+import time
+
+from pymongo import AsyncMongoClient
+
+from benchmarks.common import BENCH_DB_NAME, MONGODB_URL, plan_stats, timed, write_report
+from crud import name_prefix_query, search_players
+from csv_import import _load_players_by_name
+from database import PLAYER_NAME_COLLATION, ensure_indexes
+
+INSERT_BATCH = 10_000
+
+
+def synthetic_names(count: int, seed: int):
+    rng = random.Random(seed)
+    seen = set()
+    while len(seen) < count:
+        first = rng.choice(string.ascii_uppercase) + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 8)))
+        last = rng.choice(string.ascii_uppercase) + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        name = f"{first} {last}"
+        if name.casefold() not in seen:
+            seen.add(name.casefold())
+            yield name
+
+
+async def fill(db, count: int, teams: int, seed: int):
+    rng = random.Random(seed)
+    batch = []
+    for name in synthetic_names(count, seed):
+        batch.append({"name": name, "team_id": f"team{rng.randrange(teams):03d}", "image_id": None})
+        if len(batch) == INSERT_BATCH:
+            await db["players"].insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await db["players"].insert_many(batch, ordered=False)
+
+
+async def explain(db, query, collation=None):
+    cursor = db["players"].find(query, collation=collation)
+    return plan_stats(await cursor.explain())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", type=int, default=50_000)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--keep", action="store_true", help="Reuse an existing benchmark database")
+    args = parser.parse_args()
+
+    client = AsyncMongoClient(MONGODB_URL)
+    db = client[BENCH_DB_NAME]
+    try:
+        if not args.keep or await db["players"].estimated_document_count() != args.players:
+            await db["players"].drop()
+            started = time.perf_counter()
+            await fill(db, args.players, args.teams, args.seed)
+            print(f"Inserted {args.players} players in {time.perf_counter() - started:.1f}s", flush=True)
+        await ensure_indexes(db)
+
+        sample = await (await db["players"].aggregate([{"$sample": {"size": 40}}])).to_list(length=None)
+        csv_names = [doc["name"].lower() for doc in sample]
+        prefix = sample[0]["name"][:3].lower()
+        regex = {"name": {"$regex": f"^{prefix}", "$options": "i"}}
+
+        async def load_all():
+            return await db["players"].find({}).to_list(length=None)
+
+        results = {
+            "list_all": await timed(lambda: search_players(db), max(1, args.repeats // 10)),
+            "list_page_deep": await timed(lambda: search_players(db, skip=args.players // 2, limit=50), args.repeats),
+            "list_team": await timed(lambda: search_players(db, {"team_id": "team007"}), args.repeats),
+            "prefix_collated": await timed(lambda: search_players(db, prefix=prefix), args.repeats),
+            "prefix_regex_i": await timed(lambda: db["players"].find(regex).to_list(length=None), args.repeats),
+            "autocomplete": await timed(
+                lambda: search_players(db, prefix=prefix, limit=10, projection={"name": 1}), args.repeats
+            ),
+            "csv_lookup_in": await timed(lambda: _load_players_by_name(db, csv_names), args.repeats),
+            "csv_lookup_load_all": await timed(load_all, max(1, args.repeats // 10)),
+        }
+        results["prefix_collated"].update(await explain(db, name_prefix_query(prefix), PLAYER_NAME_COLLATION))
+        results["prefix_regex_i"].update(await explain(db, regex))
+        write_report({"benchmark": "players_search", "players": args.players, "prefix": prefix, "results": results}, args.output)
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,202 @@
+# Data-version keyed response caching and conditional GET for read endpoints
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo import ReturnDocument
+
+from metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+META_COLLECTION = "meta"
+DATA_VERSION_ID = "data_version"
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+# Seconds a worker may reuse the last data version it read before asking Mongo again.
+# 0 means every cached read checks the meta document, so writes made by other
+# workers are visible immediately.
+CACHE_VERSION_TTL = float(os.getenv("CACHE_VERSION_TTL", "0"))
+
+
+class ResponseCache:
+    """An in-memory LRU of JSON-ready responses with hit/miss counters."""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        CACHE_LOOKUPS.labels("hit").inc()
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+
+response_cache = ResponseCache()
+
+# Last data version this worker saw, when it changed and when this worker read it
+_known_version = {"value": None, "modified_at": None, "read_at": 0.0}
+
+
+def _remember_version(doc: Optional[dict]):
+    value = doc["value"] if doc else 0
+    if _known_version["value"] is not None and value != _known_version["value"]:
+        # Entries for older versions can never be hit again
+        response_cache.clear()
+    modified_at = doc.get("updated_at") if doc else None
+    if modified_at is not None and modified_at.tzinfo is None:
+        modified_at = modified_at.replace(tzinfo=timezone.utc)
+    _known_version["value"] = value
+    _known_version["modified_at"] = modified_at
+    _known_version["read_at"] = time.monotonic()
+
+
+async def _refresh_version(db):
+    if (
+        CACHE_VERSION_TTL > 0
+        and _known_version["value"] is not None
+        and time.monotonic() - _known_version["read_at"] < CACHE_VERSION_TTL
+    ):
+        return
+    doc = await db[META_COLLECTION].find_one({"_id": DATA_VERSION_ID})
+    _remember_version(doc)
+
+
+async def get_data_version(db) -> int:
+    """Return the global data version; every write path in crud bumps it."""
+    await _refresh_version(db)
+    return _known_version["value"]
+
+
+async def bump_data_version(db):
+    """Invalidate every cached response computed from the previous data version."""
+    try:
+        doc = await db[META_COLLECTION].find_one_and_update(
+            {"_id": DATA_VERSION_ID},
+            {"$inc": {"value": 1}, "$currentDate": {"updated_at": True}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        _remember_version(doc)
+    except Exception as e:
+        logger.error("Error bumping data version: %s", e)
+
+
+def user_scope(current_user: Optional[dict]) -> Optional[str]:
+    """What part of the data a user may see: everything for admins, otherwise their team."""
+    if current_user is None:
+        return None
+    if current_user["role"] == "Admin":
+        return "admin"
+    return f"team:{current_user['team_id']}"
+
+
+def request_key(request: Request) -> Hashable:
+    """Identify a read by its route and its normalized path and query parameters."""
+    route = request.scope.get("route")
+    path = route.path if route is not None else request.url.path
+    return (
+        request.method,
+        path,
+        tuple(sorted((k, str(v)) for k, v in request.path_params.items())),
+        tuple(sorted(request.query_params.multi_items())),
+    )
+
+
+def make_etag(key: Hashable) -> str:
+    return 'W/"%s"' % hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:32]
+
+
+def _not_modified(request: Request, etag: str, modified_at: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison: W/"x" and "x" name the same representation
+        weak = etag[2:]
+        return "*" in candidates or any(tag == etag or tag == weak or tag[2:] == weak for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return modified_at.replace(microsecond=0) <= since
+    return False
+
+
+async def cached_response(
+    request: Request,
+    db,
+    compute: Callable[[], Awaitable[Any]],
+    scope: Optional[str] = None,
+) -> Response:
+    """
+    Serve the result of compute() with conditional GET support and response caching.
+
+    The cache key and the ETag are both derived from (route, normalized params,
+    user scope, data version), so a matching If-None-Match (or an If-Modified-Since
+    not older than the last write) is answered with 304 before compute() runs.
+    Otherwise the JSON-ready result is reused while the data version is unchanged.
+    Exceptions raised by compute are never cached, but a 304 never reaches compute:
+    existence and access checks belong before the call.
+    """
+    await _refresh_version(db)
+    key = (request_key(request), scope, _known_version["value"])
+    modified_at = _known_version["modified_at"]
+
+    etag = make_etag(key)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if modified_at is not None:
+        headers["Last-Modified"] = format_datetime(modified_at, usegmt=True)
+
+    if _not_modified(request, etag, modified_at):
+        return Response(status_code=304, headers=headers)
+
+    result = response_cache.get(key)
+    if result is None:
+        result = jsonable_encoder(await compute())
+        response_cache.set(key, result)
+    return JSONResponse(content=result, headers=headers)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {**response_cache.stats(), "data_version": _known_version["value"]}
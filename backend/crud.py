@@ -1,10 +1,19 @@
 # CRUD logic for players, matches, pins
-from models import Player, Match, Round, Pin, User, Team
+from models import Player, Match, Round, Pin, PinOperation, User, Team
 from bson import ObjectId
 import bson
+from datetime import datetime, timezone
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
 from typing import List, Optional, Dict, Any
+import logging
 import traceback
 from bson.errors import InvalidId
+from cache import bump_data_version
+from database import PIN_COORD_MIN, PIN_COORD_MAX, PLAYER_NAME_COLLATION
+from tracing import traced
+
+logger = logging.getLogger(__name__)
 
 def document_to_user(doc):
     if not doc:
@@ -32,16 +41,19 @@ def user_to_document(user: User):
         doc["_id"] = bson.ObjectId(doc.pop("id"))
     return doc
 
+@traced()
 async def get_user_by_username(db, username: str):
     doc = await db["users"].find_one({"username": username})
     return document_to_user(doc)
 
+@traced()
 async def add_user(db, user: User):
     doc = user_to_document(user)
     result = await db["users"].insert_one(doc)
     user.id = str(result.inserted_id)
     return user
 
+@traced()
 async def update_user(db, user: User):
     """
     Update an existing user in the database by _id.
@@ -79,7 +91,7 @@ def document_to_player(doc):
                 team_id=doc.get("team_id")
             )
         except Exception as e:
-            print(f"Error converting document to player: {str(e)}, Document: {doc}")
+            logger.error("Error converting document to player: %s, Document: %s", e, doc)
             return None
     return None
 
@@ -93,6 +105,7 @@ def player_to_document(player: Player):
         "team_id": player.team_id
     }
 
+@traced()
 async def get_players(db, query: Optional[Dict[str, Any]] = None):
     players = []
     cursor = db["players"].find(query or {})
@@ -100,50 +113,117 @@ async def get_players(db, query: Optional[Dict[str, Any]] = None):
         players.append(document_to_player(document))
     return players
 
+def name_prefix_query(prefix: str) -> Dict[str, Any]:
+    """
+    Range over players.name selecting names that start with prefix, case-insensitively
+    when run with PLAYER_NAME_COLLATION. Unlike a case-insensitive regex, it can use the index.
+    """
+    # U+FFFF sorts after every character, which closes the range
+    return {"name": {"$gte": prefix, "$lt": prefix + "\uffff"}}
+
+@traced()
+async def search_players(
+    db,
+    query: Optional[Dict[str, Any]] = None,
+    prefix: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 0,
+    projection: Optional[Dict[str, Any]] = None
+) -> List[Player]:
+    """Players ordered by name (case-insensitively), optionally filtered by a name prefix and paginated."""
+    conditions = [query] if query else []
+    if prefix:
+        conditions.append(name_prefix_query(prefix))
+    filter_query = {"$and": conditions} if len(conditions) > 1 else (conditions[0] if conditions else {})
+    cursor = db["players"].find(
+        filter_query,
+        projection,
+        skip=skip,
+        limit=limit,
+        sort=[("name", 1), ("_id", 1)],
+        collation=PLAYER_NAME_COLLATION
+    )
+    players = []
+    async for document in cursor:
+        player = document_to_player(document)
+        if player:
+            players.append(player)
+    return players
+
+@traced()
 async def get_player(db, player_id: str):
     try:
         if not bson.ObjectId.is_valid(player_id):
-            print(f"Invalid player_id: {player_id}")
+            logger.warning("Invalid player_id: %s", player_id)
             return None
         document = await db["players"].find_one({"_id": bson.ObjectId(player_id)})
         return document_to_player(document)
     except Exception as e:
-        print(f"Error retrieving player: {str(e)}")
+        logger.error("Error retrieving player: %s", e)
         return None
 
+@traced()
+async def get_players_by_ids(db, player_ids: List[str]) -> Dict[str, Player]:
+    """Fetch many players with one $in query, keyed by id; invalid or unknown ids are left out."""
+    object_ids = [bson.ObjectId(pid) for pid in set(player_ids) if bson.ObjectId.is_valid(pid)]
+    players: Dict[str, Player] = {}
+    if not object_ids:
+        return players
+    cursor = db["players"].find({"_id": {"$in": object_ids}})
+    async for document in cursor:
+        player = document_to_player(document)
+        if player:
+            players[player.id] = player
+    return players
+
+@traced()
 async def add_player(db, player: Player):
     try:
         player_dict = player.model_dump(exclude_unset=True)
         if player.id:
             if not bson.ObjectId.is_valid(player.id):
-                print(f"Invalid player ID: {player.id}")
+                logger.warning("Invalid player ID: %s", player.id)
                 return None
             player_dict["_id"] = bson.ObjectId(player_dict.pop("id"))
-            await db["players"].update_one(
+            updates = {k: v for k, v in player_dict.items() if k != "_id"}
+            previous = await db["players"].find_one_and_update(
                 {"_id": player_dict["_id"]},
-                {"$set": {k: v for k, v in player_dict.items() if k != "_id"}}
+                {"$set": updates},
+                return_document=ReturnDocument.BEFORE
             )
-            return await get_player(db, str(player_dict["_id"]))
+            if not previous:
+                return None
+            # Pins keep a copy of the name; image and team updates leave them alone
+            if "name" in updates and updates["name"] != previous.get("name"):
+                await sync_player_pins(db, player.id, updates["name"])
+            await bump_data_version(db)
+            return document_to_player({**previous, **updates})
         else:
             player_dict.pop("id", None)  # Ensure no invalid ID is passed
             result = await db["players"].insert_one(player_dict)
-            return await get_player(db, str(result.inserted_id))
+            player_dict["_id"] = result.inserted_id
+            await bump_data_version(db)
+            return document_to_player(player_dict)
     except Exception as e:
-        print(f"Error adding/updating player: {str(e)}")
+        logger.error("Error adding/updating player: %s", e)
         return None
 
+@traced()
 async def delete_player(db, player_id: str):
     try:
         if not bson.ObjectId.is_valid(player_id):
-            print(f"Invalid player_id: {player_id}")
+            logger.warning("Invalid player_id: %s", player_id)
             return False
         result = await db["players"].delete_one({"_id": bson.ObjectId(player_id)})
+        if result.deleted_count > 0:
+            await bump_data_version(db)
         return result.deleted_count > 0
     except Exception as e:
-        print(f"Error deleting player: {str(e)}")
+        logger.error("Error deleting player: %s", e)
         return False
 
 # Match CRUD operations
+@traced()
 def document_to_match(doc):
     if not doc:
         return None
@@ -168,7 +248,7 @@ def document_to_match(doc):
             round_doc["evader"] = document_to_player(round_doc["evader"])
             rounds.append(Round(**round_doc))
         except Exception as e:
-            print(f"Error converting round: {str(e)}")
+            logger.error("Error converting round: %s", e)
             continue
     
     try:
@@ -188,10 +268,12 @@ def document_to_match(doc):
             is_sudden_death=doc.get("is_sudden_death", False),
             is_completed=doc.get("is_completed", False),
             winner=doc.get("winner"),
-            video_url=doc.get("video_url")  # Add this line to include video_url
+            video_url=doc.get("video_url"),  # Add this line to include video_url
+            participant_ids=doc.get("participant_ids", []),
+            team_ids=doc.get("team_ids", [])
         )
     except Exception as e:
-        print(f"Error creating Match object: {str(e)}")
+        logger.error("Error creating Match object: %s", e)
         return None
 
 def match_to_document(match: Match):
@@ -225,28 +307,74 @@ def match_to_document(match: Match):
             round_doc["evader"] = player_to_document(round_data.evader)
             doc["rounds"].append(round_doc)
     
+    doc["participant_ids"], doc["team_ids"] = match_participants(match)
     return doc
 
-async def get_matches(db, query: Optional[Dict[str, Any]] = None):
+def match_participants(match: Match):
+    """
+    Flat lists of the player ids (rosters and rounds) and roster team ids of a match.
+    Stored on every match document so access scoping and stats use one multikey lookup.
+    """
+    roster = (match.team1_players or []) + (match.team2_players or []) + [
+        p for p in (match.player1, match.player2) if p
+    ]
+    players = roster + [p for r in match.rounds for p in (r.chaser, r.evader)]
+    participant_ids = list(dict.fromkeys(str(p.id) for p in players if p.id))
+    team_ids = list(dict.fromkeys(p.team_id for p in roster if p.team_id))
+    return participant_ids, team_ids
+
+@traced()
+async def get_matches(db, query: Optional[Dict[str, Any]] = None, sort: Optional[List] = None):
     matches = []
     cursor = db["matches"].find(query or {})
+    if sort:
+        cursor = cursor.sort(sort)
     async for document in cursor:
         match = document_to_match(document)
         if match:  # Only append if successfully converted
             matches.append(match)
     return matches
 
+@traced()
 async def get_match(db, match_id: str):
     try:
         if not bson.ObjectId.is_valid(match_id):
-            print(f"Invalid match_id: {match_id}")
+            logger.warning("Invalid match_id: %s", match_id)
             return None
         document = await db["matches"].find_one({"_id": bson.ObjectId(match_id)})
         return document_to_match(document) if document else None
     except Exception as e:
-        print(f"Error retrieving match: {str(e)}")
+        logger.error("Error retrieving match: %s", e)
         return None
 
+@traced()
+async def get_match_team_ids(db, match_id: str) -> Optional[List[str]]:
+    """The team_ids of a match without loading the match, or None if it does not exist."""
+    try:
+        if not bson.ObjectId.is_valid(match_id):
+            logger.warning("Invalid match_id: %s", match_id)
+            return None
+        document = await db["matches"].find_one({"_id": bson.ObjectId(match_id)}, {"team_ids": 1})
+        return document.get("team_ids", []) if document else None
+    except Exception as e:
+        logger.error("Error retrieving match: %s", e)
+        return None
+
+@traced()
+async def get_matches_by_ids(db, match_ids: List[str]) -> Dict[str, Match]:
+    """Fetch many matches with one $in query, keyed by id; invalid or unknown ids are left out."""
+    object_ids = [bson.ObjectId(mid) for mid in set(match_ids) if bson.ObjectId.is_valid(mid)]
+    matches: Dict[str, Match] = {}
+    if not object_ids:
+        return matches
+    cursor = db["matches"].find({"_id": {"$in": object_ids}})
+    async for document in cursor:
+        match = document_to_match(document)
+        if match:
+            matches[match.id] = match
+    return matches
+
+@traced()
 async def add_match(db, match: Match):
     try:
         if match.id:
@@ -256,17 +384,20 @@ async def add_match(db, match: Match):
                 {"_id": match_dict["_id"]},
                 {"$set": {k: v for k, v in match_dict.items() if k != "_id"}}
             )
+            await sync_match_pins(db, match.id, match_dict)
         else:
             # Create new match
             match_dict = match_to_document(match)
             result = await db["matches"].insert_one(match_dict)
             match.id = str(result.inserted_id)
         
+        await bump_data_version(db)
         return match
     except Exception as e:
-        print(f"Error saving match: {str(e)}")
+        logger.error("Error saving match: %s", e)
         return None
 
+@traced()
 async def update_match(db, match: Match) -> Optional[Match]:
     """
     Update an existing match in the database.
@@ -279,34 +410,39 @@ async def update_match(db, match: Match) -> Optional[Match]:
     """
     try:
         if not match.id:
-            print("Cannot update match without an ID")
+            logger.warning("Cannot update match without an ID")
             return None
             
         match_dict = match_to_document(match)
-        result = await db["matches"].update_one(
+        document = await db["matches"].find_one_and_update(
             {"_id": match_dict["_id"]},
-            {"$set": {k: v for k, v in match_dict.items() if k != "_id"}}
+            {"$set": {k: v for k, v in match_dict.items() if k != "_id"}},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count == 0:
-            print(f"No match found with ID {match.id} to update")
+        if not document:
+            logger.warning("No match found with ID %s to update", match.id)
             return None
             
-        return await get_match(db, match.id)
+        await sync_match_pins(db, match.id, match_dict)
+        await bump_data_version(db)
+        return document_to_match(document)
     except Exception as e:
-        print(f"Error updating match: {str(e)}")
+        logger.error("Error updating match: %s", e)
         return None
 
+@traced()
 async def delete_match(match_id: str, db):
     try:
         if not bson.ObjectId.is_valid(match_id):
-            print(f"Invalid match_id: {match_id}")
+            logger.warning("Invalid match_id: %s", match_id)
             return False
         await db["pins"].delete_many({"match_id": match_id})
         result = await db["matches"].delete_one({"_id": bson.ObjectId(match_id)})
+        await bump_data_version(db)
         return result.deleted_count > 0
     except Exception as e:
-        print(f"Error deleting match: {str(e)}")
+        logger.error("Error deleting match: %s", e)
         return False
 
 # Pin CRUD Operations
@@ -322,25 +458,132 @@ def document_to_pin(doc: Dict[str, Any]) -> Optional[Pin]:
             evader_id=str(doc["evader_id"]),
             match_id=str(doc["match_id"]),
             round_index=doc["round_index"],
+            match_date=doc.get("match_date"),
+            match_type=doc.get("match_type"),
+            chaser_name=doc.get("chaser_name"),
+            evader_name=doc.get("evader_name"),
             video_url=doc.get("video_url")
         )
     except Exception as e:
-        print(f"Error converting document to Pin: {str(e)}")
+        logger.error("Error converting document to Pin: %s", e)
         return None
 
+def location_coords(location: Dict[str, Any]) -> Optional[List[float]]:
+    """
+    Legacy coordinate pair [x, y] for the 2d index, or None if the location cannot be indexed.
+    """
+    try:
+        x = float(location["x"])
+        y = float(location["y"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (PIN_COORD_MIN <= x < PIN_COORD_MAX and PIN_COORD_MIN <= y < PIN_COORD_MAX):
+        return None
+    return [x, y]
+
+def to_utc(value: datetime) -> datetime:
+    """Normalize a datetime to timezone-aware UTC; naive values are taken to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def pin_match_fields(match_doc: Dict[str, Any], round_index: int) -> Optional[Dict[str, Any]]:
+    """
+    Fields copied from a match document onto its pins so pin reads never need the match.
+    Returns None if the match has no such round.
+    """
+    rounds = match_doc.get("rounds") or []
+    if round_index < 0 or round_index >= len(rounds):
+        return None
+    round_doc = rounds[round_index]
+    return {
+        "match_date": to_utc(match_doc["date"]),
+        "match_type": match_doc.get("match_type"),
+        "chaser_name": (round_doc.get("chaser") or {}).get("name"),
+        "evader_name": (round_doc.get("evader") or {}).get("name"),
+        "video_url": round_doc.get("video_url"),
+    }
+
+@traced()
+async def sync_match_pins(db, match_id: str, match_doc: Dict[str, Any]):
+    """
+    Copy the match date and type and each round's video URL onto the match's pins.
+    Names follow the players instead (see sync_player_pins).
+    """
+    ops = []
+    match_fields = {}
+    if match_doc.get("date"):
+        match_fields["match_date"] = to_utc(match_doc["date"])
+    if match_doc.get("match_type"):
+        match_fields["match_type"] = match_doc["match_type"]
+    if match_fields:
+        ops.append(UpdateMany({"match_id": match_id}, {"$set": match_fields}))
+    for round_index, round_doc in enumerate(match_doc.get("rounds") or []):
+        ops.append(UpdateMany(
+            {"match_id": match_id, "round_index": round_index},
+            {"$set": {"video_url": round_doc.get("video_url")}}
+        ))
+    if ops:
+        await db["pins"].bulk_write(ops, ordered=False)
+
+@traced()
+async def sync_player_pins(db, player_id: str, name: str):
+    """Rename a player on every pin they appear in."""
+    await db["pins"].bulk_write([
+        UpdateMany({"chaser_id": player_id}, {"$set": {"chaser_name": name}}),
+        UpdateMany({"evader_id": player_id}, {"$set": {"evader_name": name}}),
+    ], ordered=False)
+
+def pin_document(pin_data: Pin, match_doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Build the stored document for a new pin, or None if the match has no such round.
+    """
+    match_fields = pin_match_fields(match_doc, pin_data.round_index)
+    if match_fields is None:
+        return None
+    pin_doc = pin_data.model_dump(exclude_unset=True, exclude={"id"})
+    pin_doc.update(match_fields)
+    coords = location_coords(pin_doc["location"])
+    if coords:
+        pin_doc["coords"] = coords
+    return pin_doc
+
+def pin_location_update(location: Dict[str, Any]) -> Dict[str, Any]:
+    """Update that moves a pin, keeping its indexed coords in step with the location."""
+    coords = location_coords(location)
+    update: Dict[str, Any] = {"$set": {"location": location}}
+    if coords:
+        update["$set"]["coords"] = coords
+    else:
+        update["$unset"] = {"coords": ""}
+    return update
+
+@traced()
 async def create_pin(db, pin_data: Pin) -> Optional[Pin]:
     try:
-        pin_doc = pin_data.model_dump(exclude_unset=True, exclude={"id"})
         if not bson.ObjectId.is_valid(pin_data.match_id):
-            print(f"Invalid match_id: {pin_data.match_id}")
+            logger.warning("Invalid match_id: %s", pin_data.match_id)
+            return None
+        match_doc = await db["matches"].find_one(
+            {"_id": bson.ObjectId(pin_data.match_id)},
+            {"date": 1, "match_type": 1, "rounds": 1}
+        )
+        if not match_doc:
+            logger.warning("Match not found for pin: %s", pin_data.match_id)
+            return None
+        pin_doc = pin_document(pin_data, match_doc)
+        if pin_doc is None:
+            logger.warning("Invalid round_index %s for match %s", pin_data.round_index, pin_data.match_id)
             return None
         result = await db["pins"].insert_one(pin_doc)
-        created_pin_doc = await db["pins"].find_one({"_id": result.inserted_id})
-        return document_to_pin(created_pin_doc)
+        pin_doc["_id"] = result.inserted_id
+        await bump_data_version(db)
+        return document_to_pin(pin_doc)
     except Exception as e:
-        print(f"Error creating pin: {str(e)}")
+        logger.error("Error creating pin: %s", e)
         return None
 
+@traced()
 async def get_pins(db, query_filter: Dict[str, Any]) -> List[Pin]:
     """Get pins based on a filter dictionary."""
     pins = []
@@ -351,46 +594,150 @@ async def get_pins(db, query_filter: Dict[str, Any]) -> List[Pin]:
             if pin:
                 pins.append(pin)
     except Exception as e:
-        print(f"Error fetching pins: {str(e)}")
+        logger.error("Error fetching pins: %s", e)
     return pins
 
+@traced()
 async def get_pins_by_match_and_round(db, match_id: str, round_index: Optional[int] = None) -> List[Pin]:
     query: Dict[str, Any] = {"match_id": match_id}
     if round_index is not None:
         query["round_index"] = round_index
     return await get_pins(db, query)
 
+@traced()
 async def update_pin(db, pin_id: str, pin_location_data: Dict[str, Any]) -> Optional[Pin]:
     """Updates only the location of an existing pin."""
     try:
-        if not await db["pins"].find_one({"_id": ObjectId(pin_id)}):
-            return None # Pin not found
-        
-        update_result = await db["pins"].update_one(
+        if not bson.ObjectId.is_valid(pin_id):
+            logger.warning("Invalid pin_id: %s", pin_id)
+            return None
+        updated_pin_doc = await db["pins"].find_one_and_update(
             {"_id": ObjectId(pin_id)},
-            {"$set": {"location": pin_location_data}} # Only update location
+            pin_location_update(pin_location_data),
+            return_document=ReturnDocument.AFTER
         )
-        
-        if update_result.modified_count == 1:
-            updated_pin_doc = await db["pins"].find_one({"_id": ObjectId(pin_id)})
-            return document_to_pin(updated_pin_doc)
-        return None # Should not happen if find_one initially found it and no race condition
+        if not updated_pin_doc:
+            return None # Pin not found
+        await bump_data_version(db)
+        return document_to_pin(updated_pin_doc)
     except Exception as e:
-        print(f"Error updating pin {pin_id}: {str(e)}")
+        logger.error("Error updating pin %s: %s", pin_id, e)
         return None
 
+@traced()
 async def delete_pin(db, pin_id: str) -> bool:
     """Deletes a pin by its ID."""
     try:
         if not bson.ObjectId.is_valid(pin_id):
-            print(f"Invalid pin_id: {pin_id}")
+            logger.warning("Invalid pin_id: %s", pin_id)
             return False
         result = await db["pins"].delete_one({"_id": bson.ObjectId(pin_id)})
+        if result.deleted_count > 0:
+            await bump_data_version(db)
         return result.deleted_count > 0
     except Exception as e:
-        print(f"Error deleting pin: {str(e)}")
+        logger.error("Error deleting pin: %s", e)
         return False
 
+@traced()
+async def apply_pin_operations(db, operations: List[PinOperation]) -> Optional[Dict[str, Any]]:
+    """
+    Apply a batch of pin creates, moves and deletes with a single bulk_write.
+
+    The matches referenced by creates are loaded with one query and the targets of
+    moves and deletes are checked with one more, so every operation gets its own
+    result. Invalid operations are reported and skipped; the rest are still written.
+    """
+    try:
+        results: List[Dict[str, Any]] = [
+            {"index": i, "op": op.op, "status": None, "id": None, "error": None}
+            for i, op in enumerate(operations)
+        ]
+
+        def fail(i: int, error: str):
+            results[i]["status"] = "error"
+            results[i]["error"] = error
+
+        match_ids = {
+            op.pin.match_id for op in operations
+            if op.op == "create" and op.pin and bson.ObjectId.is_valid(op.pin.match_id)
+        }
+        matches: Dict[str, Dict[str, Any]] = {}
+        if match_ids:
+            cursor = db["matches"].find(
+                {"_id": {"$in": [bson.ObjectId(m) for m in match_ids]}},
+                {"date": 1, "match_type": 1, "rounds": 1}
+            )
+            async for doc in cursor:
+                matches[str(doc["_id"])] = doc
+
+        pin_ids = {
+            op.pin_id for op in operations
+            if op.op in ("move", "delete") and op.pin_id and bson.ObjectId.is_valid(op.pin_id)
+        }
+        existing = set()
+        if pin_ids:
+            cursor = db["pins"].find({"_id": {"$in": [bson.ObjectId(p) for p in pin_ids]}}, {"_id": 1})
+            async for doc in cursor:
+                existing.add(str(doc["_id"]))
+
+        requests = []
+        request_index: List[int] = []
+        for i, op in enumerate(operations):
+            if op.op == "create":
+                if op.pin is None:
+                    fail(i, "create requires a pin")
+                    continue
+                match_doc = matches.get(op.pin.match_id)
+                if match_doc is None:
+                    fail(i, f"Match {op.pin.match_id} not found")
+                    continue
+                pin_doc = pin_document(op.pin, match_doc)
+                if pin_doc is None:
+                    fail(i, f"Invalid round_index {op.pin.round_index} for match {op.pin.match_id}")
+                    continue
+                pin_doc["_id"] = bson.ObjectId()
+                results[i]["id"] = str(pin_doc["_id"])
+                requests.append(InsertOne(pin_doc))
+            else:
+                if op.pin_id not in existing:
+                    fail(i, f"Pin {op.pin_id} not found")
+                    continue
+                results[i]["id"] = op.pin_id
+                if op.op == "move":
+                    if op.location is None:
+                        fail(i, "move requires a location")
+                        continue
+                    requests.append(UpdateOne({"_id": bson.ObjectId(op.pin_id)}, pin_location_update(op.location)))
+                else:
+                    requests.append(DeleteOne({"_id": bson.ObjectId(op.pin_id)}))
+            request_index.append(i)
+
+        write_errors: Dict[int, str] = {}
+        if requests:
+            try:
+                await db["pins"].bulk_write(requests, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    write_errors[request_index[error["index"]]] = error.get("errmsg", "Write failed")
+            await bump_data_version(db)
+
+        done = {"create": "created", "move": "moved", "delete": "deleted"}
+        for i in request_index:
+            if i in write_errors:
+                fail(i, write_errors[i])
+            else:
+                results[i]["status"] = done[results[i]["op"]]
+
+        return {
+            "results": results,
+            "created_ids": [r["id"] for r in results if r["status"] == "created"],
+            "failed": sum(1 for r in results if r["status"] == "error"),
+        }
+    except Exception as e:
+        logger.error("Error applying pin operations: %s", e)
+        return None
+
 def document_to_team(doc):
     if not doc:
         return None
@@ -399,6 +746,7 @@ def document_to_team(doc):
         name=doc["name"]
     )
 
+@traced()
 async def get_teams(db):
     teams = []
     cursor = db["teams"].find({})
@@ -406,20 +754,26 @@ async def get_teams(db):
         teams.append(document_to_team(document))
     return teams
 
+@traced()
 async def get_team_by_name(db, name: str):
     doc = await db["teams"].find_one({"name": name})
     return document_to_team(doc)
 
+@traced()
 async def create_team(db, team: Team):
     doc = team.model_dump(exclude_unset=True)
     if "id" in doc:
         doc.pop("id")
     result = await db["teams"].insert_one(doc)
     team.id = str(result.inserted_id)
+    await bump_data_version(db)
     return team
 
+@traced()
 async def delete_team(db, team_id: str):
     if not bson.ObjectId.is_valid(team_id):
         return False
     result = await db["teams"].delete_one({"_id": bson.ObjectId(team_id)})
+    if result.deleted_count > 0:
+        await bump_data_version(db)
     return result.deleted_count > 0
@@ -0,0 +1,329 @@
+# Bulk CSV import engine for matches
+import codecs
+import csv
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, IO, Iterable, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import OperationFailure
+
+from models import Match, Round, Player
+from crud import match_to_document, document_to_player
+from database import PLAYER_NAME_COLLATION
+from cache import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+# A round that lasts the full 20 seconds is a successful evasion
+EVASION_TIME = 20
+
+# Mongo error code returned when transactions are used on a standalone server
+ILLEGAL_OPERATION = 20
+
+# Matches per insert_many; progress is reported after each batch
+WRITE_BATCH_SIZE = 500
+
+
+class CSVImportError(ValueError):
+    """Raised when the uploaded CSV cannot be imported at all."""
+
+
+def iter_csv_lines(stream: IO[bytes]) -> Iterable[str]:
+    """Decode a binary upload stream line by line without reading it into memory."""
+    reader = codecs.getreader("utf-8")(stream)
+    try:
+        for line in reader:
+            yield line
+    except UnicodeDecodeError:
+        raise CSVImportError("Failed to read CSV file as UTF-8")
+
+
+def parse_rows(lines: Iterable[str], selected_ids: Set[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Parse CSV lines into rows grouped by match number.
+
+    CSV format per line: matchNumber,roundNumber,chaserName,evaderName,tagTime
+    Only match numbers listed in selected_ids are kept.
+    """
+    by_match: Dict[int, List[Dict[str, Any]]] = {}
+    for parts in csv.reader(lines):
+        parts = [p.strip() for p in parts]
+        if not any(parts):
+            continue
+        if len(parts) < 5:
+            logger.warning("Skipping malformed CSV line: %s", ",".join(parts))
+            continue
+        try:
+            match_no = int(parts[0])
+            round_no = int(parts[1])
+            tag_time_val = float(parts[4])
+        except ValueError:
+            logger.warning("Skipping unparsable CSV line: %s", ",".join(parts))
+            continue
+        if match_no not in selected_ids:
+            continue
+        by_match.setdefault(match_no, []).append({
+            "match_no": match_no,
+            "round_no": round_no,
+            "chaser_name": parts[2],
+            "evader_name": parts[3],
+            "tag_time": tag_time_val,
+        })
+    return by_match
+
+
+def infer_teams(match_rows: List[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    """
+    Infer the two sides of a match by bipartitioning the chaser/evader graph.
+
+    Names are compared case-insensitively. Raises ValueError if the graph is not bipartite.
+    """
+    adjacency: Dict[str, List[str]] = {}
+    for r in match_rows:
+        a = r["chaser_name"].casefold()
+        b = r["evader_name"].casefold()
+        adjacency.setdefault(a, []).append(b)
+        adjacency.setdefault(b, []).append(a)
+
+    color: Dict[str, int] = {}
+    for name in adjacency:
+        if name in color:
+            continue
+        color[name] = 0
+        q = deque([name])
+        while q:
+            u = q.popleft()
+            for v in adjacency[u]:
+                if v not in color:
+                    color[v] = 1 - color[u]
+                    q.append(v)
+                elif color[v] == color[u]:
+                    raise ValueError(f"Cannot infer teams for match {match_rows[0]['match_no']} (non-bipartite)")
+
+    team1 = [n for n, c in color.items() if c == 0]
+    team2 = [n for n, c in color.items() if c == 1]
+    return team1, team2
+
+
+def plan_matches(by_match: Dict[int, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Work out the type and sides of every match without touching the database.
+
+    Each plan keeps the original spelling of the first occurrence of every player name.
+    """
+    plans = []
+    for match_no, match_rows in by_match.items():
+        match_rows = sorted(match_rows, key=lambda x: x["round_no"])
+        spelling: Dict[str, str] = {}
+        for r in match_rows:
+            spelling.setdefault(r["chaser_name"].casefold(), r["chaser_name"])
+            spelling.setdefault(r["evader_name"].casefold(), r["evader_name"])
+
+        plan: Dict[str, Any] = {"match_no": match_no, "rows": match_rows, "names": spelling, "error": None}
+        if len(spelling) == 2:
+            plan["match_type"] = "1v1"
+            plan["team1"], plan["team2"] = [list(spelling)[0]], [list(spelling)[1]]
+        else:
+            plan["match_type"] = "team"
+            try:
+                plan["team1"], plan["team2"] = infer_teams(match_rows)
+            except ValueError as e:
+                logger.error("Match %s graph is not bipartite; cannot infer teams", match_no)
+                plan["team1"], plan["team2"] = [], []
+                plan["error"] = str(e)
+        plans.append(plan)
+    return plans
+
+
+def describe_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a plan for reports and dry runs."""
+    names = plan["names"]
+    return {
+        "match_number": plan["match_no"],
+        "match_type": plan["match_type"],
+        "rounds": len(plan["rows"]),
+        "team1": [names[n] for n in plan["team1"]],
+        "team2": [names[n] for n in plan["team2"]],
+        "error": plan["error"],
+    }
+
+
+def build_match(plan: Dict[str, Any], players: Dict[str, Player], date: datetime) -> Match:
+    """Build a Match (rounds and scores included) from a plan and resolved players."""
+    team1_players = [players[n] for n in plan["team1"]]
+    team2_players = [players[n] for n in plan["team2"]]
+    team1_ids = {p.id for p in team1_players}
+
+    rounds = []
+    team1_score = 0
+    team2_score = 0
+    for r in plan["rows"]:
+        chaser = players[r["chaser_name"].casefold()]
+        evader = players[r["evader_name"].casefold()]
+        tag_made = r["tag_time"] != EVASION_TIME
+        rounds.append(Round(
+            chaser=chaser,
+            evader=evader,
+            tag_made=tag_made,
+            tag_time=float(r["tag_time"]) if tag_made else None,
+        ))
+        if not tag_made:
+            if evader.id in team1_ids:
+                team1_score += 1
+            else:
+                team2_score += 1
+
+    if plan["match_type"] == "1v1":
+        return Match(
+            date=date,
+            match_type="1v1",
+            player1=team1_players[0],
+            player2=team2_players[0],
+            rounds=rounds,
+            team1_score=team1_score,
+            team2_score=team2_score,
+        )
+    return Match(
+        date=date,
+        match_type="team",
+        team1_name="-".join(p.name for p in team1_players),
+        team2_name="-".join(p.name for p in team2_players),
+        team1_players=team1_players,
+        team2_players=team2_players,
+        rounds=rounds,
+        team1_score=team1_score,
+        team2_score=team2_score,
+    )
+
+
+async def _load_players_by_name(db, names: Iterable[str]) -> Dict[str, Player]:
+    """Look up only the named players, case-insensitively through the players.name collation index."""
+    players: Dict[str, Player] = {}
+    names = list(names)
+    if not names:
+        return players
+    cursor = db["players"].find(
+        {"name": {"$in": names}},
+        sort=[("_id", 1)],
+        collation=PLAYER_NAME_COLLATION
+    )
+    async for doc in cursor:
+        player = document_to_player(doc)
+        if player and player.name:
+            # Exact-case duplicates keep the first stored player, like the old lookup
+            players.setdefault(player.name.casefold(), player)
+    return players
+
+
+async def _write_in_transaction(db, write):
+    """
+    Run write(session) inside a transaction.
+
+    Standalone servers (local development, CI) do not support transactions;
+    there the writes run without a session instead.
+    """
+    try:
+        async with db.client.start_session() as session:
+            async with await session.start_transaction():
+                return await write(session)
+    except OperationFailure as e:
+        if e.code != ILLEGAL_OPERATION:
+            raise
+        logger.info("Transactions not supported by this deployment; importing without one")
+        return await write(None)
+
+
+async def import_matches(
+    db,
+    by_match: Dict[int, List[Dict[str, Any]]],
+    dry_run: bool = False,
+    on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Import matches parsed by parse_rows in bulk.
+
+    Players are resolved case-insensitively against the roster; missing players are
+    created with one insert_many and the matches are written with an insert_many per
+    WRITE_BATCH_SIZE matches, all inside a transaction when the deployment supports it.
+    on_progress, if given, is awaited with the number of matches written after each batch.
+
+    Returns a per-match report. With dry_run the report only describes the inferred
+    matches and nothing is written.
+    """
+    if not by_match:
+        raise CSVImportError("No rows found for selected match numbers")
+
+    plans = plan_matches(by_match)
+    report = {plan["match_no"]: describe_plan(plan) for plan in plans}
+    if dry_run:
+        for entry in report.values():
+            entry["status"] = "error" if entry["error"] else "valid"
+        return {"imported": 0, "dry_run": True, "report": list(report.values())}
+
+    players = await _load_players_by_name(
+        db, {spelled for plan in plans if not plan["error"] for spelled in plan["names"].values()}
+    )
+
+    # Validate every missing name once; a bad name only fails the matches that use it
+    new_players: Dict[str, Player] = {}
+    invalid_names: Dict[str, str] = {}
+    for plan in plans:
+        if plan["error"]:
+            continue
+        for key, spelled in plan["names"].items():
+            if key in players or key in new_players or key in invalid_names:
+                continue
+            try:
+                new_players[key] = Player(name=spelled)
+            except ValidationError:
+                invalid_names[key] = spelled
+
+    date = datetime.utcnow()
+
+    async def write(session):
+        if new_players:
+            result = await db["players"].insert_many(
+                [{"name": p.name} for p in new_players.values()], session=session
+            )
+            for player, inserted_id in zip(new_players.values(), result.inserted_ids):
+                player.id = str(inserted_id)
+            players.update(new_players)
+
+        matches = []
+        for plan in plans:
+            entry = report[plan["match_no"]]
+            if plan["error"]:
+                continue
+            bad = [invalid_names[n] for n in plan["names"] if n in invalid_names]
+            if bad:
+                entry["error"] = f"Invalid player names: {', '.join(bad)}"
+                continue
+            matches.append((entry, build_match(plan, players, date)))
+
+        for start in range(0, len(matches), WRITE_BATCH_SIZE):
+            batch = matches[start:start + WRITE_BATCH_SIZE]
+            result = await db["matches"].insert_many(
+                [match_to_document(m) for _, m in batch], session=session
+            )
+            for (entry, match), inserted_id in zip(batch, result.inserted_ids):
+                match.id = str(inserted_id)
+                entry["match_id"] = match.id
+            if on_progress:
+                await on_progress(start + len(batch))
+        return [m for _, m in matches]
+
+    saved = await _write_in_transaction(db, write)
+    if saved or new_players:
+        await bump_data_version(db)
+    for entry in report.values():
+        entry["status"] = "error" if entry["error"] else "imported"
+
+    logger.info("CSV import wrote %d matches and created %d players", len(saved), len(new_players))
+    return {
+        "imported": len(saved),
+        "players_created": len(new_players),
+        "matches": saved,
+        "report": list(report.values()),
+    }
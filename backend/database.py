@@ -1,29 +1,71 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from gridfs import GridFS
-from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import AsyncMongoClient
+from gridfs import AsyncGridFSBucket
 import os
 import asyncio
 import logging
+from metrics import mongo_listeners
+from slow_queries import SlowQueryListener
+from request_context import RoundTripListener
+from tracing import TracingListener
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 # MongoDB connection URL
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "wct_stats")
 
-# Create Motor client
+# Case-insensitive comparison for player names; the players.name indexes use the same collation
+PLAYER_NAME_COLLATION = {"locale": "en", "strength": 2}
+
+# Bounds of the 2d index on pin coords; locations are percentages of the quad image
+PIN_COORD_MIN = -1.0
+PIN_COORD_MAX = 101.0
+
+# One client (and connection pool) per worker process, shared by every request
+_client: "AsyncMongoClient | None" = None
+
+def get_client() -> AsyncMongoClient:
+    global _client
+    if _client is None:
+        _client = AsyncMongoClient(MONGODB_URL, event_listeners=[
+            *mongo_listeners(), SlowQueryListener(), RoundTripListener(), TracingListener(),
+        ])
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.close()
+
 async def get_db():
-    client = AsyncIOMotorClient(MONGODB_URL)
-    db = client[DATABASE_NAME]
-    try:
-        yield db
-    finally:
-        # Ensure the client is closed properly
-        client.close()
+    yield get_client()[DATABASE_NAME]
 
 
 # Create GridFS bucket
 async def get_gridfs(db):
-    return AsyncIOMotorGridFSBucket(db)
+    return AsyncGridFSBucket(db)
+
+
+# Indexes the read paths rely on; create_index is a no-op when an index already exists
+async def ensure_indexes(db):
+    pins = db["pins"]
+    await pins.create_index([("match_id", 1), ("round_index", 1)])
+    await pins.create_index([("chaser_id", 1), ("match_date", 1)])
+    await pins.create_index([("evader_id", 1), ("match_date", 1)])
+    await pins.create_index([("match_date", 1), ("match_type", 1)])
+    await pins.create_index([("coords", "2d")], min=PIN_COORD_MIN, max=PIN_COORD_MAX)
+
+    players = db["players"]
+    await players.create_index([("name", 1)], collation=PLAYER_NAME_COLLATION, name="name_ci")
+    await players.create_index([("team_id", 1), ("name", 1)], collation=PLAYER_NAME_COLLATION, name="team_id_name_ci")
+
+    matches = db["matches"]
+    await matches.create_index([("participant_ids", 1), ("date", -1)])
+    await matches.create_index([("team_ids", 1), ("date", -1)])
+    await matches.create_index([("match_type", 1), ("date", -1)])
+    await matches.create_index([("date", -1)])
+    await matches.create_index(
+        [("team1_name", "text"), ("team2_name", "text"), ("player1.name", "text"), ("player2.name", "text")],
+        name="match_names_text"
+    )
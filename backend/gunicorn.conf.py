@@ -1,4 +1,23 @@
+import glob
+import os
+
 loglevel = "info"
 accesslog = "-"
 errorlog = "-"
 timeout = 120
+
+
+def on_starting(server):
+    # Samples left by a previous run would be summed into this one
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    # Drop the live gauges of a dead worker; its counters and histograms are kept
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,67 @@
+# Server-side binning of pin locations for the quad heatmap
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+# Pin locations are stored as percentages of the quad image
+LOCATION_RANGE = (0.0, 100.0)
+
+
+def gaussian_kernel_matrix(size: int, sigma: float) -> np.ndarray:
+    """
+    Build a (size x size) matrix that applies a 1-D Gaussian blur along one axis.
+
+    Columns are normalized so that mass is preserved; cells near the border only
+    spread into cells that exist.
+    """
+    offsets = np.arange(size)
+    distance = offsets[:, None] - offsets[None, :]
+    kernel = np.exp(-0.5 * (distance / sigma) ** 2)
+    kernel[np.abs(distance) > int(np.ceil(3 * sigma))] = 0.0
+    return kernel / kernel.sum(axis=0, keepdims=True)
+
+
+def bin_locations(locations: Iterable[Dict[str, float]], bins: int, sigma: float = 0.0) -> Dict:
+    """
+    Aggregate pin locations into a bins x bins grid.
+
+    Args:
+        locations: {'x': float, 'y': float} dicts in percent of the quad image
+        bins: Number of cells per axis
+        sigma: Standard deviation of the optional Gaussian smoothing, in cells
+
+    Returns:
+        Dictionary with the grid as a list of rows (top to bottom, y then x),
+        the total number of pins and the maximum cell value
+    """
+    xs: List[float] = []
+    ys: List[float] = []
+    for loc in locations:
+        if not loc or loc.get("x") is None or loc.get("y") is None:
+            continue
+        xs.append(loc["x"])
+        ys.append(loc["y"])
+
+    grid, _, _ = np.histogram2d(
+        np.asarray(ys, dtype=float),
+        np.asarray(xs, dtype=float),
+        bins=bins,
+        range=[LOCATION_RANGE, LOCATION_RANGE],
+    )
+
+    if sigma > 0:
+        kernel = gaussian_kernel_matrix(bins, sigma)
+        # Separable blur: along y, then along x
+        grid = kernel @ grid @ kernel.T
+        grid = np.round(grid, 4)
+    else:
+        grid = grid.astype(np.int64)
+
+    return {
+        "bins": bins,
+        "range": list(LOCATION_RANGE),
+        "sigma": sigma,
+        "total": len(xs),
+        "max": grid.max().item() if grid.size else 0,
+        "grid": grid.tolist(),
+    }
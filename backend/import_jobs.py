@@ -0,0 +1,177 @@
+# Background CSV import jobs
+import asyncio
+import contextvars
+import logging
+import os
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import bson
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from csv_import import CSVImportError, iter_csv_lines, parse_rows, import_matches
+from database import get_client
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "import_jobs"
+CHUNK_SIZE = 1024 * 1024
+# Number of imports a worker runs at the same time; further jobs wait their turn
+IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
+# Workers refresh heartbeat_at on their unfinished jobs this often (seconds)
+HEARTBEAT_INTERVAL = 30
+# An unfinished job without a heartbeat for this long belongs to a worker that is gone
+STALE_AFTER = timedelta(minutes=5)
+UNFINISHED = ["queued", "running"]
+
+_job_slots = asyncio.Semaphore(IMPORT_JOB_WORKERS)
+# Keep references to running jobs so they are not garbage collected mid-flight,
+# with the (database name, job id) whose heartbeat they keep alive
+_running_jobs: Dict[asyncio.Task, Tuple[str, bson.ObjectId]] = {}
+
+
+def document_to_job(doc) -> Optional[Dict[str, Any]]:
+    if not doc:
+        return None
+    job = {k: v for k, v in doc.items() if k != "_id"}
+    job["id"] = str(doc["_id"])
+    return job
+
+
+async def save_upload(upload: UploadFile) -> str:
+    """Stream an upload to a temporary file chunk by chunk and return its path."""
+    fd, path = tempfile.mkstemp(prefix="wct-import-", suffix=".csv")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                await run_in_threadpool(fh.write, chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def _parse_file(path: str, selected_ids: Set[int]):
+    with open(path, "rb") as fh:
+        return parse_rows(iter_csv_lines(fh), selected_ids)
+
+
+async def create_job(db, path: str, selected_ids: List[int], dry_run: bool, created_by: str) -> Dict[str, Any]:
+    """Record a new import job and schedule it on this worker."""
+    now = datetime.utcnow()
+    doc = {
+        "status": "queued",
+        "dry_run": dry_run,
+        "match_numbers": selected_ids,
+        "created_by": created_by,
+        "created_at": now,
+        "heartbeat_at": now,
+        "finished_at": None,
+        "rows_parsed": 0,
+        "matches_written": 0,
+        "players_created": 0,
+        "errors": [],
+        "report": [],
+    }
+    result = await db[JOBS_COLLECTION].insert_one(doc)
+    doc["_id"] = result.inserted_id
+
+    # The job outlives the request, so it looks the database up on the shared client by name,
+    # and runs in an empty context: the request's span and DBStats must not collect its work
+    task = contextvars.Context().run(
+        asyncio.create_task, _run_job(db.name, result.inserted_id, path, set(selected_ids), dry_run)
+    )
+    _running_jobs[task] = (db.name, result.inserted_id)
+    task.add_done_callback(lambda done: _running_jobs.pop(done, None))
+    return document_to_job(doc)
+
+
+async def get_job(db, job_id: str) -> Optional[Dict[str, Any]]:
+    if not bson.ObjectId.is_valid(job_id):
+        return None
+    doc = await db[JOBS_COLLECTION].find_one({"_id": bson.ObjectId(job_id)})
+    return document_to_job(doc)
+
+
+async def fail_stale_jobs(db) -> int:
+    """Mark unfinished jobs whose worker stopped (restart, deploy) as failed."""
+    now = datetime.utcnow()
+    result = await db[JOBS_COLLECTION].update_many(
+        # $not also matches jobs recorded before heartbeats existed
+        {"status": {"$in": UNFINISHED}, "heartbeat_at": {"$not": {"$gte": now - STALE_AFTER}}},
+        {"$set": {
+            "status": "failed",
+            "finished_at": now,
+            "errors": ["Interrupted: the worker running this job stopped before it finished"],
+        }},
+    )
+    if result.modified_count:
+        logger.warning("Marked %d interrupted import jobs as failed", result.modified_count)
+    return result.modified_count
+
+
+async def keep_jobs_alive(db, interval: float = HEARTBEAT_INTERVAL):
+    """Refresh the heartbeat of this worker's jobs and fail abandoned ones (run as a task for the app's lifetime)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            by_db: Dict[str, List[bson.ObjectId]] = defaultdict(list)
+            for db_name, job_id in list(_running_jobs.values()):
+                by_db[db_name].append(job_id)
+            for db_name, job_ids in by_db.items():
+                await get_client()[db_name][JOBS_COLLECTION].update_many(
+                    {"_id": {"$in": job_ids}, "status": {"$in": UNFINISHED}},
+                    {"$set": {"heartbeat_at": datetime.utcnow()}},
+                )
+            await fail_stale_jobs(db)
+        except Exception:
+            logger.exception("Failed to update import job heartbeats")
+
+
+async def _run_job(db_name: str, job_id, path: str, selected_ids: Set[int], dry_run: bool):
+    async with _job_slots:
+        db = get_client()[db_name]
+        jobs = db[JOBS_COLLECTION]
+        update: Dict[str, Any] = {}
+        try:
+            await jobs.update_one({"_id": job_id}, {"$set": {"status": "running"}})
+
+            by_match = await run_in_threadpool(_parse_file, path, selected_ids)
+            rows_parsed = sum(len(rows) for rows in by_match.values())
+            await jobs.update_one({"_id": job_id}, {"$set": {"rows_parsed": rows_parsed}})
+
+            async def progress(written: int):
+                await jobs.update_one({"_id": job_id}, {"$set": {"matches_written": written}})
+
+            result = await import_matches(db, by_match, dry_run=dry_run, on_progress=progress)
+            update = {
+                "status": "completed",
+                "matches_written": result["imported"],
+                "players_created": result.get("players_created", 0),
+                "report": result["report"],
+                "errors": [
+                    f"Match {entry['match_number']}: {entry['error']}"
+                    for entry in result["report"] if entry["error"]
+                ],
+            }
+        except CSVImportError as e:
+            update = {"status": "failed", "errors": [str(e)]}
+        except Exception as e:
+            logger.exception("Import job %s failed", job_id)
+            update = {"status": "failed", "errors": [f"Unexpected error: {e}"]}
+        finally:
+            update["finished_at"] = datetime.utcnow()
+            try:
+                await jobs.update_one({"_id": job_id}, {"$set": update})
+            except Exception:
+                logger.exception("Failed to record result of import job %s", job_id)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
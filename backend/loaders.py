@@ -0,0 +1,79 @@
+# Request-scoped batching loaders for players and matches
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Set
+
+from fastapi import Depends
+
+from crud import get_players_by_ids, get_matches_by_ids
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """
+    Coalesce loads made in the same event-loop tick into one batch call.
+
+    load() returns a future; every key requested before the loop gets back to its
+    scheduled callbacks is fetched with a single call to batch_fn(keys), which returns
+    a dict of the values it found. Results (including misses, as None) are memoized
+    for the lifetime of the loader, i.e. one request.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]):
+        self._batch_fn = batch_fn
+        self._results: Dict[Hashable, asyncio.Future] = {}
+        self._pending: List[Hashable] = []
+        self._batches: Set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._results[key] = future
+            if not self._pending:
+                loop.call_soon(self._dispatch)
+            self._pending.append(key)
+        return future
+
+    def load_many(self, keys: List[Hashable]) -> "asyncio.Future":
+        return asyncio.gather(*(self.load(key) for key in keys))
+
+    def _dispatch(self):
+        keys, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._run(keys))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _run(self, keys: List[Hashable]):
+        futures = [self._results[key] for key in keys]
+        try:
+            found = await self._batch_fn(keys)
+        except Exception as e:
+            logger.error("Batch load of %d keys failed: %s", len(keys), e)
+            for key, future in zip(keys, futures):
+                # Let a later load in the same request try again
+                if self._results.get(key) is future:
+                    del self._results[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in zip(keys, futures):
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+class Loaders:
+    """The loaders of one request."""
+
+    def __init__(self, db):
+        self.players = BatchLoader(lambda ids: get_players_by_ids(db, ids))
+        self.matches = BatchLoader(lambda ids: get_matches_by_ids(db, ids))
+
+
+async def get_loaders(db = Depends(get_db)) -> Loaders:
+    # FastAPI resolves a dependency once per request, so every Depends(get_loaders)
+    # in a request shares these loaders and the request's database handle
+    return Loaders(db)
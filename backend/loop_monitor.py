@@ -0,0 +1,120 @@
+# Event-loop lag monitor and blocking-call (stall) detector
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from metrics import LOOP_LAG, LOOP_STALLS
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats; lag is how late each heartbeat wakes up
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+# Record the loop thread's stack when the loop is blocked for longer than this; 0 disables it
+LOOP_STALL_MS = float(os.getenv("LOOP_STALL_MS", "0"))
+# Recent lag samples and stalls kept for the admin endpoint
+LAG_SAMPLES = 600
+STALL_HISTORY = 50
+STACK_LIMIT = 40
+
+
+class LoopMonitor:
+    """
+    Measure how late the event loop runs a task that sleeps `interval` seconds.
+
+    With stall_ms > 0 a watchdog thread also checks the heartbeat. If the loop has not
+    come back for stall_ms, the thread captures the loop thread's stack (the code
+    that is blocking it), and the stall's length is filled in once the loop recovers.
+    """
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL, stall_ms: float = LOOP_STALL_MS):
+        self.interval = interval
+        self.stall_seconds = stall_ms / 1000
+        self._lags: Deque[float] = deque(maxlen=LAG_SAMPLES)
+        self._stalls: Deque[Dict[str, Any]] = deque(maxlen=STALL_HISTORY)
+        self._max_lag = 0.0
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._pending_stall: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        # A fresh event, so a watchdog from an earlier start cannot be revived by this one
+        self._stopped = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.stall_seconds > 0:
+            threading.Thread(
+                target=self._watch, args=(self._stopped,), name="loop-watchdog", daemon=True
+            ).start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            LOOP_LAG.observe(lag)
+            with self._lock:
+                self._beat = time.monotonic()
+                self._lags.append(lag)
+                self._max_lag = max(self._max_lag, lag)
+                if self._pending_stall is not None:
+                    self._pending_stall["duration_ms"] = round(lag * 1000, 1)
+                    self._pending_stall = None
+
+    def _watch(self, stopped: threading.Event):
+        frames = sys._current_frames
+        while not stopped.wait(min(self.stall_seconds / 2, 0.05)):
+            with self._lock:
+                blocked = time.monotonic() - self._beat - self.interval
+                if blocked < self.stall_seconds or self._pending_stall is not None:
+                    continue
+                frame = frames().get(self._loop_thread_id)
+                stall = {
+                    "detected_at": time.time(),
+                    "blocked_ms_at_detection": round(blocked * 1000, 1),
+                    "duration_ms": None,
+                    "stack": traceback.format_stack(frame, limit=STACK_LIMIT) if frame else [],
+                }
+                self._pending_stall = stall
+                self._stalls.append(stall)
+            LOOP_STALLS.inc()
+            logger.warning(
+                "Event loop blocked for over %.0f ms in:\n%s", blocked * 1000, "".join(stall["stack"][-8:])
+            )
+
+    def snapshot(self, stalls: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            lags = sorted(self._lags)
+            recent: List[Dict[str, Any]] = [dict(stall) for stall in reversed(self._stalls)][:stalls]
+            max_lag = self._max_lag
+
+        def pct(p: float) -> Optional[float]:
+            if not lags:
+                return None
+            return round(lags[min(len(lags) - 1, int(len(lags) * p))] * 1000, 2)
+
+        return {
+            "interval_ms": self.interval * 1000,
+            "stall_threshold_ms": self.stall_seconds * 1000 or None,
+            "lag_ms": {"p50": pct(0.5), "p99": pct(0.99), "max_recent": pct(1.0), "max": round(max_lag * 1000, 2)},
+            "stalls": recent,
+        }
+
+
+loop_monitor = LoopMonitor()
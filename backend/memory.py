@@ -0,0 +1,142 @@
+# Per-worker memory diagnostics: RSS, GC and tracemalloc snapshots
+import gc
+import itertools
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Snapshots kept per worker; the oldest is dropped first
+MAX_SNAPSHOTS = 8
+GROUPINGS = ("lineno", "filename", "traceback")
+
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+_snapshots: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+_snapshot_ids = itertools.count(1)
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size, from /proc where available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_stats() -> Dict[str, Any]:
+    tracing = tracemalloc.is_tracing()
+    traced = tracemalloc.get_traced_memory() if tracing else (None, None)
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": rss_bytes(),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "gc": {
+            "enabled": gc.isenabled(),
+            "counts": gc.get_count(),
+            "thresholds": gc.get_threshold(),
+            "generations": gc.get_stats(),
+            "uncollectable": len(gc.garbage),
+            "tracked_objects": len(gc.get_objects()),
+        },
+        "tracemalloc": {
+            "tracing": tracing,
+            "frames": tracemalloc.get_traceback_limit() if tracing else None,
+            "traced_bytes": traced[0],
+            "peak_traced_bytes": traced[1],
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory() if tracing else None,
+        },
+        "snapshots": [
+            {"id": snapshot_id, "label": entry["label"], "taken_at": entry["taken_at"]}
+            for snapshot_id, entry in _snapshots.items()
+        ],
+    }
+
+
+def start_tracing(frames: int = 1):
+    """Start tracemalloc; allocations made before this are not attributed."""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    tracemalloc.start(frames)
+
+
+def stop_tracing():
+    """Stop tracemalloc and drop its snapshots (they reference memory tracemalloc no longer tracks)."""
+    tracemalloc.stop()
+    _snapshots.clear()
+
+
+def take_snapshot(label: Optional[str] = None) -> Optional[int]:
+    """Snapshot current allocations; None when tracemalloc is not tracing."""
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    snapshot_id = next(_snapshot_ids)
+    _snapshots[snapshot_id] = {"label": label, "taken_at": time.time(), "snapshot": snapshot}
+    while len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    return snapshot_id
+
+
+def _snapshot(snapshot_id: int) -> Optional[tracemalloc.Snapshot]:
+    entry = _snapshots.get(snapshot_id)
+    return entry["snapshot"] if entry else None
+
+
+def _site(stat, group_by: str) -> Dict[str, Any]:
+    frames = stat.traceback
+    site: Dict[str, Any] = {"file": frames[0].filename, "line": frames[0].lineno if group_by != "filename" else None}
+    if group_by == "traceback":
+        site["traceback"] = [f"{frame.filename}:{frame.lineno}" for frame in frames]
+    return site
+
+
+def top_allocations(snapshot_id: int, group_by: str = "lineno", limit: int = 20) -> Optional[Dict[str, Any]]:
+    """The allocation sites holding the most memory in a snapshot."""
+    snapshot = _snapshot(snapshot_id)
+    if snapshot is None:
+        return None
+    stats = snapshot.statistics(group_by)
+    return {
+        "id": snapshot_id,
+        "total_bytes": sum(stat.size for stat in stats),
+        "top": [{**_site(stat, group_by), "size_bytes": stat.size, "count": stat.count} for stat in stats[:limit]],
+    }
+
+
+def diff_snapshots(base_id: int, snapshot_id: int, group_by: str = "lineno", limit: int = 20) -> Optional[Dict[str, Any]]:
+    """The allocation sites that grew the most from base to snapshot."""
+    base, current = _snapshot(base_id), _snapshot(snapshot_id)
+    if base is None or current is None:
+        return None
+    stats = current.compare_to(base, group_by)
+    return {
+        "base": base_id,
+        "id": snapshot_id,
+        "size_diff_bytes": sum(stat.size_diff for stat in stats),
+        "top": [
+            {
+                **_site(stat, group_by),
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in stats[:limit]
+        ],
+    }
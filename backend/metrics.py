@@ -0,0 +1,261 @@
+# Prometheus metrics: HTTP requests, Mongo commands and pools, cache, bcrypt and the thread pool
+#
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py and the Dockerfile), every
+# gunicorn worker writes its samples to that directory and /metrics aggregates all of
+# them, whichever worker serves the scrape.
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from anyio import to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# Seconds between thread pool samples
+THREADPOOL_SAMPLE_INTERVAL = float(os.getenv("THREADPOOL_SAMPLE_INTERVAL", "1"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# Requests that match no route share one label so scanners cannot blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route and status", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests being served", ["method"], multiprocess_mode="livesum"
+)
+HTTP_RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "HTTP response body size", ["method", "route"], buckets=SIZE_BUCKETS
+)
+
+DB_ROUND_TRIPS = Histogram(
+    "http_request_db_round_trips", "Mongo commands issued per request", ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+DB_DOCUMENTS = Histogram(
+    "http_request_db_documents", "Documents Mongo returned per request", ["method", "route"],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000)
+)
+
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongodb_command_duration_seconds", "Mongo command latency", ["collection", "command"], buckets=MONGO_BUCKETS
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total", "Failed Mongo commands", ["collection", "command"]
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongodb_pool_connections", "Open pooled connections", ["address"], multiprocess_mode="livesum"
+)
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongodb_pool_checked_out", "Pooled connections in use", ["address"], multiprocess_mode="livesum"
+)
+MONGO_POOL_WAIT = Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ["address"],
+    buckets=MONGO_BUCKETS
+)
+
+CACHE_LOOKUPS = Counter("response_cache_lookups_total", "Response cache lookups", ["result"])
+
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify time", ["operation"], buckets=LATENCY_BUCKETS
+)
+PASSWORD_HASH_IN_PROGRESS = Gauge(
+    "password_hash_in_progress", "bcrypt operations running", multiprocess_mode="livesum"
+)
+
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event loop runs a scheduled heartbeat",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+LOOP_STALLS = Counter("event_loop_stalls_total", "Times the event loop was blocked beyond LOOP_STALL_MS")
+
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy_threads", "Worker threads running sync code", multiprocess_mode="livesum"
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_queue_depth", "Tasks waiting for a worker thread", multiprocess_mode="livesum"
+)
+THREADPOOL_SIZE = Gauge(
+    "threadpool_size", "Worker thread limit", multiprocess_mode="livesum"
+)
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposition text for every worker (multiprocess mode) or this process."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def route_template(scope) -> str:
+    """
+    The path template of the route that served this request, e.g. /players/{player_id}.
+
+    Rebuilt from the path parameters the router matched, since route.path does not
+    include the prefix of an included router in every FastAPI version.
+    """
+    if "endpoint" not in scope:
+        return UNMATCHED_ROUTE
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    segments = scope["path"].split("/")
+    return "/".join("{%s}" % names[segment] if segment in names else segment for segment in segments)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, response size and status per route and in-flight requests."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = {"code": 500}
+        size = {"bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                size["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        # The route is only known once the router has matched it, so in-flight
+        # requests are counted per method
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            # The router writes the matched endpoint and path params into this scope
+            route = route_template(scope)
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_RESPONSE_SIZE.labels(method, route).observe(size["bytes"])
+            HTTP_REQUESTS.labels(method, route, str(status["code"])).inc()
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Mongo command latency and failures by collection and command name."""
+
+    def __init__(self):
+        self._collections: Dict[Tuple, str] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return (event.connection_id, event.request_id, event.operation_id)
+
+    def started(self, event):
+        value = event.command.get(event.command_name)
+        self._collections[self._key(event)] = value if isinstance(value, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop(self._key(event), "")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop(self._key(event), "")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Open and checked-out connections and checkout wait time per server."""
+
+    def __init__(self):
+        self._checkout_started: Dict[Tuple, List[float]] = {}
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).inc()
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(self._address(event)).dec()
+
+    def connection_check_out_started(self, event):
+        # Checkouts on one address are served in order, so a per-address FIFO is enough
+        self._checkout_started.setdefault(event.address, []).append(time.perf_counter())
+
+    def _checkout_done(self, event) -> Optional[float]:
+        waiting = self._checkout_started.get(event.address)
+        return time.perf_counter() - waiting.pop(0) if waiting else None
+
+    def connection_check_out_failed(self, event):
+        self._checkout_done(event)
+
+    def connection_checked_out(self, event):
+        waited = self._checkout_done(event)
+        if waited is not None:
+            MONGO_POOL_WAIT.labels(self._address(event)).observe(waited)
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).inc()
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.labels(self._address(event)).dec()
+
+
+def mongo_listeners():
+    """Listeners to register on every Mongo client."""
+    return [CommandMetrics(), PoolMetrics()]
+
+
+class timed_password_hash:
+    """Context manager timing one bcrypt operation."""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+
+    def __enter__(self):
+        PASSWORD_HASH_IN_PROGRESS.inc()
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        PASSWORD_HASH_IN_PROGRESS.dec()
+        PASSWORD_HASH_LATENCY.labels(self.operation).observe(time.perf_counter() - self.started)
+        return False
+
+
+async def sample_threadpool(interval: float = THREADPOOL_SAMPLE_INTERVAL):
+    """Periodically publish this worker's AnyIO thread pool usage (run as a task for the app's lifetime)."""
+    limiter = to_thread.current_default_thread_limiter()
+    while True:
+        stats = limiter.statistics()
+        THREADPOOL_BUSY.set(stats.borrowed_tokens)
+        THREADPOOL_WAITING.set(stats.tasks_waiting)
+        THREADPOOL_SIZE.set(stats.total_tokens)
+        await asyncio.sleep(interval)
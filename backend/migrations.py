@@ -0,0 +1,113 @@
+# Idempotent data migrations, run at startup
+import logging
+
+import bson
+from pymongo import UpdateOne
+
+from crud import pin_match_fields
+from database import PIN_COORD_MIN, PIN_COORD_MAX
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+async def backfill_pin_match_fields(db, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Copy match date, match type, round participant names and round video URL onto
+    pins created before those fields were denormalized.
+
+    Works in batches: one query for the pins, one $in query for their matches and
+    one bulk_write per batch. Returns the number of pins updated.
+    """
+    updated = 0
+    last_id = None
+    while True:
+        query = {"match_date": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        pins = await db["pins"].find(query, {"match_id": 1, "round_index": 1}).sort("_id", 1).to_list(length=batch_size)
+        if not pins:
+            break
+        last_id = pins[-1]["_id"]
+
+        match_ids = {p["match_id"] for p in pins if bson.ObjectId.is_valid(p.get("match_id", ""))}
+        matches = {}
+        cursor = db["matches"].find(
+            {"_id": {"$in": [bson.ObjectId(mid) for mid in match_ids]}},
+            {"date": 1, "match_type": 1, "rounds": 1}
+        )
+        async for match_doc in cursor:
+            matches[str(match_doc["_id"])] = match_doc
+
+        ops = []
+        for pin in pins:
+            match_doc = matches.get(pin.get("match_id"))
+            fields = pin_match_fields(match_doc, pin.get("round_index", -1)) if match_doc else None
+            if fields is None:
+                # Orphaned pins stay as they are and are skipped by later batches
+                continue
+            ops.append(UpdateOne({"_id": pin["_id"]}, {"$set": fields}))
+        if ops:
+            result = await db["pins"].bulk_write(ops, ordered=False)
+            updated += result.modified_count
+
+    if updated:
+        logger.info("Backfilled match fields on %d pins", updated)
+    return updated
+
+
+async def backfill_pin_coords(db) -> int:
+    """
+    Add the indexable [x, y] coords pair to pins stored before it existed.
+
+    Runs as a single server-side pipeline update; pins outside the index bounds are left without coords.
+    """
+    in_bounds = {"$gte": PIN_COORD_MIN, "$lt": PIN_COORD_MAX}
+    result = await db["pins"].update_many(
+        {"coords": {"$exists": False}, "location.x": in_bounds, "location.y": in_bounds},
+        [{"$set": {"coords": [{"$toDouble": "$location.x"}, {"$toDouble": "$location.y"}]}}],
+    )
+    if result.modified_count:
+        logger.info("Backfilled coords on %d pins", result.modified_count)
+    return result.modified_count
+
+
+def _string_ids(*paths):
+    """Pipeline expression: the distinct string values found under the given field paths."""
+    return {"$filter": {
+        "input": {"$setUnion": [{"$ifNull": [path, []]} for path in paths]},
+        "as": "id",
+        "cond": {"$eq": [{"$type": "$$id"}, "string"]},
+    }}
+
+
+async def backfill_match_participants(db) -> int:
+    """
+    Add participant_ids and team_ids to matches stored before they were maintained by crud.
+
+    Runs as a single server-side pipeline update with the same rules as crud.match_participants.
+    """
+    result = await db["matches"].update_many(
+        {"participant_ids": {"$exists": False}},
+        [{"$set": {
+            "participant_ids": _string_ids(
+                "$team1_players.id", "$team2_players.id",
+                ["$player1.id"], ["$player2.id"],
+                "$rounds.chaser.id", "$rounds.evader.id",
+            ),
+            "team_ids": _string_ids(
+                "$team1_players.team_id", "$team2_players.team_id",
+                ["$player1.team_id"], ["$player2.team_id"],
+            ),
+        }}],
+    )
+    if result.modified_count:
+        logger.info("Backfilled participant_ids and team_ids on %d matches", result.modified_count)
+    return result.modified_count
+
+
+async def run_migrations(db):
+    await backfill_pin_match_fields(db)
+    await backfill_pin_coords(db)
+    await backfill_match_participants(db)
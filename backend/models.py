@@ -45,6 +45,10 @@ class Match(BaseModel):
 
     video_url: Optional[str] = None
 
+    # Derived from the rosters and rounds by crud on every write, for multikey lookups
+    participant_ids: List[str] = []
+    team_ids: List[str] = []
+
 class Pin(BaseModel):
     id: Optional[str] = None
     location: dict  # {'x': float, 'y': float}
@@ -53,6 +57,20 @@ class Pin(BaseModel):
     match_id: str
     round_index: int
 
+    # Denormalized from the match and round when the pin is created, kept in sync by crud
+    match_date: Optional[datetime] = None  # UTC
+    match_type: Optional[str] = None
+    chaser_name: Optional[str] = None
+    evader_name: Optional[str] = None
+    video_url: Optional[str] = None
+
+class PinOperation(BaseModel):
+    """One step of a /pins/bulk batch."""
+    op: Literal["create", "move", "delete"]
+    pin: Optional[Pin] = None  # create
+    pin_id: Optional[str] = None  # move, delete
+    location: Optional[Dict[str, float]] = None  # move
+
 class UserRole(str, Enum):
     admin = "Admin"
     user = "User"
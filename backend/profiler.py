@@ -0,0 +1,248 @@
+# On-demand statistical profiler: sample this worker for N seconds or the next K requests to a route
+import asyncio
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_STACK_DEPTH = 128
+# Root frame of samples taken while a profiled request was suspended (awaiting I/O, a lock or another task)
+AWAITING = "(awaiting)"
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    return (code.co_name, code.co_filename, code.co_firstlineno)
+
+
+def thread_stack(frame) -> Tuple[Frame, ...]:
+    """A thread's stack, outermost frame first."""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(_frame_key(frame))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def await_stack(task: asyncio.Task) -> Tuple[Frame, ...]:
+    """The chain of coroutines a suspended task is awaiting, outermost first."""
+    stack = []
+    coro = task.get_coro()
+    while coro is not None and len(stack) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_key(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return tuple(stack)
+
+
+class Profile:
+    """Aggregated stack samples."""
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.samples: "Counter[Tuple[Frame, ...]]" = Counter()
+        self.started_at = time.time()
+        self.duration = 0.0
+
+    def add(self, stack: Tuple[Frame, ...]):
+        if stack:
+            self.samples[stack] += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, as read by flamegraph.pl and speedscope."""
+        lines = [
+            "%s %d" % (";".join(f"{name} ({_short(file)}:{line})" for name, file, line in stack), count)
+            for stack, count in self.samples.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> Dict[str, Any]:
+        """A speedscope 'sampled' profile; weights are in seconds."""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.most_common():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    name, file, line = frame
+                    frames.append({"name": name, "file": file, "line": line})
+                ids.append(index[frame])
+            samples.append(ids)
+            weights.append(count * self.interval)
+        total = sum(weights)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "wct-stats-backend",
+            "name": self.name,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": total,
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+def _short(path: str) -> str:
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and path.startswith(prefix):
+            return path[len(prefix):].lstrip("/")
+    return path
+
+
+class _Sampler(threading.Thread):
+    """Call sample() every interval seconds until stopped."""
+
+    def __init__(self, interval: float, sample):
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval
+        self.sample = sample
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+
+async def profile_worker(seconds: float, interval: float) -> Profile:
+    """Sample every thread of this worker (except the sampler) for `seconds`."""
+    profile = Profile(f"worker {seconds:g}s", interval)
+    names = {}
+
+    def sample():
+        me = threading.get_ident()
+        for thread in threading.enumerate():
+            names.setdefault(thread.ident, thread.name)
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id != me:
+                profile.add(((names.get(thread_id, str(thread_id)), "<thread>", 0),) + thread_stack(frame))
+
+    sampler = _Sampler(interval, sample)
+    started = time.monotonic()
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stopped.set()
+        profile.duration = time.monotonic() - started
+    return profile
+
+
+class RequestProfiler:
+    """
+    Profile the next `count` requests whose path matches a route template.
+
+    While a profiled request is in flight, the loop thread's stack is sampled whenever
+    that request's task is the one running. Otherwise the coroutines it is awaiting are
+    sampled under an "(awaiting)" root, so both the CPU time on the loop and the time
+    spent waiting show up.
+    """
+
+    def __init__(self, method: str, route: str, count: int, interval: float):
+        self.method = method.upper()
+        self.route = route
+        self.count = count
+        self.completed = 0
+        self.profile = Profile(f"{self.method} {route} x{count}", interval)
+        self._pattern = re.compile("^" + re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(route)) + "$")
+        self._active: Dict[asyncio.Task, None] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._sampler: Optional[_Sampler] = None
+
+    @property
+    def done(self) -> bool:
+        return self.completed >= self.count
+
+    def wants(self, scope) -> bool:
+        return (
+            scope["method"] == self.method
+            and self._pattern.match(scope["path"]) is not None
+            and self.completed + len(self._active) < self.count
+        )
+
+    async def run(self, app, scope, receive, send):
+        task = asyncio.current_task()
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+                self._loop_thread_id = threading.get_ident()
+            self._active[task] = None
+            if self._sampler is None:
+                self._sampler = _Sampler(self.profile.interval, self._sample)
+                self._sampler.start()
+        started = time.monotonic()
+        try:
+            await app(scope, receive, send)
+        finally:
+            with self._lock:
+                del self._active[task]
+                self.completed += 1
+                self.profile.duration += time.monotonic() - started
+                if not self._active:
+                    self._sampler.stopped.set()
+                    self._sampler = None
+
+    def _sample(self):
+        with self._lock:
+            active = list(self._active)
+        if not active:
+            return
+        running = asyncio.current_task(self._loop)
+        if running in active:
+            frame = sys._current_frames().get(self._loop_thread_id)
+            self.profile.add(thread_stack(frame))
+        for task in active:
+            if task is not running:
+                self.profile.add(((AWAITING, "", 0),) + await_stack(task))
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "method": self.method,
+            "route": self.route,
+            "count": self.count,
+            "completed": self.completed,
+            "samples": sum(self.profile.samples.values()),
+        }
+
+
+# The armed request profiler of this worker; None keeps the request path free of any profiling work
+request_profiler: Optional[RequestProfiler] = None
+_worker_profile_running = False
+
+
+def arm_request_profiler(method: str, route: str, count: int, interval: float) -> RequestProfiler:
+    global request_profiler
+    request_profiler = RequestProfiler(method, route, count, interval)
+    return request_profiler
+
+
+def disarm_request_profiler():
+    global request_profiler
+    request_profiler = None
+
+
+async def run_worker_profile(seconds: float, interval: float) -> Optional[Profile]:
+    """profile_worker, or None if this worker is already being profiled."""
+    global _worker_profile_running
+    if _worker_profile_running:
+        return None
+    _worker_profile_running = True
+    try:
+        return await profile_worker(seconds, interval)
+    finally:
+        _worker_profile_running = False
@@ -1,4 +1,9 @@
+import os
+
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
\ No newline at end of file
+# Per client address; load tests from one host raise it, e.g. RATE_LIMIT=1000000/minute
+RATE_LIMIT = os.getenv("RATE_LIMIT", "100/minute")
+
+limiter = Limiter(key_func=get_remote_address, default_limits=[RATE_LIMIT])
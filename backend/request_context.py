@@ -0,0 +1,140 @@
+# Per-request context visible to code that does not receive the request (crud, Mongo listeners)
+import os
+import re
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+import profiler
+import tracing
+from metrics import DB_DOCUMENTS, DB_ROUND_TRIPS, route_template
+
+# Report each request's Mongo round trips and documents returned as X-DB-* response headers
+DB_STATS_HEADERS = os.getenv("DB_STATS_HEADERS", "false").lower() == "true"
+
+# Incoming X-Request-ID values are reused only if they look like an id
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_db_stats: ContextVar[Optional["DBStats"]] = ContextVar("request_db_stats", default=None)
+
+
+class DBStats:
+    """Mongo usage of one request."""
+
+    __slots__ = ("round_trips", "documents")
+
+    def __init__(self):
+        self.round_trips = 0
+        self.documents = 0
+
+
+def current_route() -> Optional[str]:
+    """'METHOD /route/{template}' of the request being served, or None outside a request."""
+    scope = _scope.get()
+    if scope is None:
+        return None
+    return f"{scope['method']} {route_template(scope)}"
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def request_id_from(scope) -> str:
+    """The caller's X-Request-ID when it is usable, otherwise a new id."""
+    for name, value in scope.get("headers", []):
+        if name == b"x-request-id":
+            value = value.decode("latin-1")
+            if REQUEST_ID_PATTERN.match(value):
+                return value
+            break
+    return uuid.uuid4().hex
+
+
+def documents_returned(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:  # findAndModify
+        return 1 if reply["value"] else 0
+    return 0
+
+
+class RoundTripListener(monitoring.CommandListener):
+    """Count every command (including getMore) and the documents it returned against the current request."""
+
+    def started(self, event):
+        # Listeners run inside the task that issued the command, so this is its request's context;
+        # tasks spawned by a request (loader batches, gather) share the same DBStats object
+        stats = _db_stats.get()
+        if stats is not None:
+            stats.round_trips += 1
+
+    def succeeded(self, event):
+        stats = _db_stats.get()
+        if stats is not None:
+            stats.documents += documents_returned(event.reply)
+
+    def failed(self, event):
+        pass
+
+
+class RequestContextMiddleware:
+    """Make the current HTTP request's scope, id, Mongo usage and trace span available through contextvars."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = DBStats()
+        request_id = request_id_from(scope)
+        server_span = tracing.start_server_span(scope)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                if server_span is not None:
+                    server_span.attributes["http.response.status_code"] = message["status"]
+                headers = [*message.get("headers", []), (b"x-request-id", request_id.encode())]
+                if DB_STATS_HEADERS:
+                    headers.append((b"x-db-round-trips", str(stats.round_trips).encode()))
+                    headers.append((b"x-db-documents", str(stats.documents).encode()))
+                message["headers"] = headers
+            await send(message)
+
+        scope_token = _scope.set(scope)
+        request_id_token = _request_id.set(request_id)
+        stats_token = _db_stats.set(stats)
+        span_token = tracing.activate(server_span)
+        try:
+            request_profiler = profiler.request_profiler
+            if request_profiler is not None and request_profiler.wants(scope):
+                await request_profiler.run(self.app, scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            if server_span is not None:
+                server_span.error = type(e).__name__
+            raise
+        finally:
+            tracing.deactivate(span_token)
+            _db_stats.reset(stats_token)
+            _request_id.reset(request_id_token)
+            _scope.reset(scope_token)
+            route = route_template(scope)
+            DB_ROUND_TRIPS.labels(scope["method"], route).observe(stats.round_trips)
+            DB_DOCUMENTS.labels(scope["method"], route).observe(stats.documents)
+            if server_span is not None:
+                server_span.name = f"{scope['method']} {route}"
+                server_span.attributes.update({
+                    "http.route": route,
+                    "request.id": request_id,
+                    "db.round_trips": stats.round_trips,
+                    "db.documents": stats.documents,
+                })
+                server_span.end()
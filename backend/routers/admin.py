@@ -0,0 +1,148 @@
+from typing import Literal
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from routers.login import get_current_user
+from cache import cache_stats
+from slow_queries import slow_query_log, SLOW_QUERY_MS
+from loop_monitor import loop_monitor
+import profiler
+import memory
+
+router = APIRouter()
+
+def require_admin(current_user: dict = Depends(get_current_user)):
+    if not current_user or current_user.get("role") != "Admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin privileges required")
+    return current_user
+
+@router.get("/admin/cache")
+def get_cache_stats(current_user: dict = Depends(require_admin)):
+    """Response cache hit/miss counters for the worker that serves this request."""
+    return cache_stats()
+
+@router.get("/admin/slow_queries")
+def get_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    current_user: dict = Depends(require_admin),
+):
+    """The slowest Mongo query shapes this worker has seen, with their explain output when captured."""
+    return {"threshold_ms": SLOW_QUERY_MS, "queries": slow_query_log.top(limit)}
+
+@router.delete("/admin/slow_queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries(current_user: dict = Depends(require_admin)):
+    slow_query_log.clear()
+
+@router.get("/admin/event_loop")
+def get_event_loop_health(
+    stalls: int = Query(10, ge=0, le=50),
+    current_user: dict = Depends(require_admin),
+):
+    """Event-loop lag of this worker and the stacks of its most recent stalls (LOOP_STALL_MS)."""
+    return loop_monitor.snapshot(stalls)
+
+ProfileFormat = Literal["collapsed", "speedscope"]
+
+def profile_response(profile: profiler.Profile, format: str):
+    filename = "profile-%d" % profile.started_at
+    if format == "speedscope":
+        return JSONResponse(
+            profile.speedscope(),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'},
+        )
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="{filename}.collapsed.txt"'},
+    )
+
+@router.post("/admin/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=60, description="How long to sample"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Time between samples"),
+    format: ProfileFormat = Query("collapsed"),
+    current_user: dict = Depends(require_admin),
+):
+    """Sample every thread of the worker serving this request and return the aggregated stacks."""
+    profile = await profiler.run_worker_profile(seconds, interval_ms / 1000)
+    if profile is None:
+        raise HTTPException(status_code=409, detail="This worker is already being profiled")
+    return profile_response(profile, format)
+
+@router.post("/admin/profile/requests", status_code=status.HTTP_202_ACCEPTED)
+def arm_request_profile(
+    route: str = Query(..., description="Route template, e.g. /players/{player_id}/stats"),
+    method: str = Query("GET"),
+    count: int = Query(10, ge=1, le=1000, description="How many requests to profile"),
+    interval_ms: float = Query(1, ge=0.5, le=100, description="Time between samples"),
+    current_user: dict = Depends(require_admin),
+):
+    """Profile the next `count` matching requests served by this worker; fetch the result with GET."""
+    current = profiler.request_profiler
+    if current is not None and not current.done:
+        raise HTTPException(status_code=409, detail="A request profile is already running on this worker")
+    return profiler.arm_request_profiler(method, route, count, interval_ms / 1000).status()
+
+@router.get("/admin/profile/requests")
+def get_request_profile(
+    format: ProfileFormat = Query("collapsed"),
+    current_user: dict = Depends(require_admin),
+):
+    """The request profile once all requests were seen, otherwise its progress (202)."""
+    current = profiler.request_profiler
+    if current is None:
+        raise HTTPException(status_code=404, detail="No request profile on this worker")
+    if not current.done:
+        return JSONResponse(current.status(), status_code=status.HTTP_202_ACCEPTED)
+    return profile_response(current.profile, format)
+
+@router.delete("/admin/profile/requests", status_code=status.HTTP_204_NO_CONTENT)
+def disarm_request_profile(current_user: dict = Depends(require_admin)):
+    profiler.disarm_request_profiler()
+
+GroupBy = Literal["lineno", "filename", "traceback"]
+
+@router.get("/admin/memory")
+def get_memory_stats(current_user: dict = Depends(require_admin)):
+    """RSS, GC and tracemalloc state of the worker serving this request."""
+    return memory.memory_stats()
+
+@router.post("/admin/memory/tracemalloc/start")
+def start_tracemalloc(
+    frames: int = Query(1, ge=1, le=100, description="Frames kept per allocation; more is slower"),
+    current_user: dict = Depends(require_admin),
+):
+    memory.start_tracing(frames)
+    return memory.memory_stats()["tracemalloc"]
+
+@router.post("/admin/memory/tracemalloc/stop")
+def stop_tracemalloc(current_user: dict = Depends(require_admin)):
+    memory.stop_tracing()
+    return memory.memory_stats()["tracemalloc"]
+
+@router.post("/admin/memory/snapshots", status_code=status.HTTP_201_CREATED)
+def take_memory_snapshot(
+    label: str = Query(None, max_length=100),
+    limit: int = Query(20, ge=1, le=200),
+    current_user: dict = Depends(require_admin),
+):
+    """Snapshot this worker's allocations and return its top allocation sites."""
+    snapshot_id = memory.take_snapshot(label)
+    if snapshot_id is None:
+        raise HTTPException(status_code=409, detail="tracemalloc is not running on this worker")
+    return memory.top_allocations(snapshot_id, limit=limit)
+
+@router.get("/admin/memory/snapshots/{snapshot_id}")
+def get_memory_snapshot(
+    snapshot_id: int,
+    group_by: GroupBy = Query("lineno"),
+    limit: int = Query(20, ge=1, le=200),
+    base: int = Query(None, description="Compare with this earlier snapshot"),
+    current_user: dict = Depends(require_admin),
+):
+    """Top allocation sites of a snapshot, or the sites that grew most since `base`."""
+    if base is not None:
+        result = memory.diff_snapshots(base, snapshot_id, group_by, limit)
+    else:
+        result = memory.top_allocations(snapshot_id, group_by, limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found on this worker")
+    return result
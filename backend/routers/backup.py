@@ -3,12 +3,14 @@ import os
 import subprocess
 import logging
 import requests
+import tracing
 from routers.login import get_current_user
 import tempfile
 import tarfile
 import gzip
 from pathlib import Path
-from pymongo import MongoClient
+from database import get_client
+from fastapi.concurrency import run_in_threadpool
 from bson import json_util
 import bson
 
@@ -16,49 +18,63 @@ router = APIRouter()
 logger = logging.getLogger("backup")
 
 UPLOAD_PAR_URL = os.getenv("UPLOAD_PAR_URL")
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+DUMP_BATCH_SIZE = 1000
 
 if not UPLOAD_PAR_URL:
     logger.warning("UPLOAD_PAR_URL not set; backups will fail until configured")
 
-def create_dump(path: str):
+def _write_archive(path: str, source_dir: Path):
+    with tarfile.open(path, "w:gz") as tar:
+        tar.add(source_dir, arcname=".")
+
+def _append(file_path: Path, data: bytes):
+    with open(file_path, "ab") as fh:
+        fh.write(data)
+
+async def create_dump(path: str):
     logger.info("Running python-based mongo BSON dump")
     tmpdir = Path(tempfile.mkdtemp(prefix="wct-mongodump-"))
+    client = get_client()
     try:
-        client = MongoClient(MONGODB_URL)
-        db_names = [d for d in client.list_database_names() if d not in ("admin", "local", "config")]
+        db_names = [d for d in await client.list_database_names() if d not in ("admin", "local", "config")]
 
         for db_name in db_names:
             db_dir = tmpdir / db_name
             db_dir.mkdir(parents=True, exist_ok=True)
             db = client[db_name]
-            for coll_name in db.list_collection_names():
+            for coll_name in await db.list_collection_names():
                 coll = db[coll_name]
                 coll_file = db_dir / f"{coll_name}.bson"
+                coll_file.touch()
                 # stream documents to a bson file (concatenated BSON documents)
-                with open(coll_file, "ab") as fh:
-                    # Filter out admin user from users collection
-                    query = {}
-                    if coll_name == "users":
-                        query = {"username": {"$ne": "admin"}}
-                        
-                    cursor = coll.find(query, no_cursor_timeout=True).batch_size(1000)
-                    try:
-                        for doc in cursor:
-                            fh.write(bson.BSON.encode(doc))
-                    finally:
-                        cursor.close()
+                # Filter out admin user from users collection
+                query = {}
+                if coll_name == "users":
+                    query = {"username": {"$ne": "admin"}}
+
+                cursor = coll.find(query, no_cursor_timeout=True).batch_size(DUMP_BATCH_SIZE)
+                try:
+                    chunk = []
+                    async for doc in cursor:
+                        chunk.append(bson.BSON.encode(doc))
+                        if len(chunk) == DUMP_BATCH_SIZE:
+                            # File writes go to a worker thread so the event loop keeps serving requests
+                            await run_in_threadpool(_append, coll_file, b"".join(chunk))
+                            chunk = []
+                    if chunk:
+                        await run_in_threadpool(_append, coll_file, b"".join(chunk))
+                finally:
+                    await cursor.close()
 
                 # save indexes for the collection (JSON)
                 idx_file = db_dir / f"{coll_name}.indexes.json"
-                indexes = list(coll.list_indexes())
+                indexes = await (await coll.list_indexes()).to_list(length=None)
                 with open(idx_file, "w", encoding="utf-8") as fh:
                     fh.write(json_util.dumps(indexes))
 
         # create compressed tar archive at the requested path
         logger.info("Creating archive %s", path)
-        with tarfile.open(path, "w:gz") as tar:
-            tar.add(tmpdir, arcname=".")
+        await run_in_threadpool(_write_archive, path, tmpdir)
         logger.info("python-based mongo BSON dump finished")
     except Exception:
         logger.exception("create_dump failed")
@@ -81,15 +97,18 @@ def upload_to_par(par_url: str, file_path: str):
         env = os.getenv("ENV", "development")
         object_name = f"{env}/{os.path.basename(file_path)}"
         url = f"{par_url}{object_name}"        
-        resp = requests.put(url, data=fh, headers=headers, timeout=120)
+        with tracing.span("par.upload", tracing.CLIENT, **{"object.name": object_name}) as span:
+            resp = requests.put(url, data=fh, headers=tracing.inject(headers), timeout=120)
+            if span is not None:
+                span.attributes["http.response.status_code"] = resp.status_code
     if resp.status_code not in (200, 201, 204):
         logger.error("Upload failed: %s %s", resp.status_code, resp.text)
         raise RuntimeError(f"Upload failed: {resp.status_code} {resp.text}")
     return resp
 
-def _run_backup(background_path: str):
+async def _run_backup(background_path: str):
     try:
-        create_dump(background_path)
+        await create_dump(background_path)
     except Exception as e:
         logger.exception("dump failed in background task")
         try:
@@ -99,7 +118,7 @@ def _run_backup(background_path: str):
         return
 
     try:
-        upload_to_par(UPLOAD_PAR_URL, background_path)
+        await run_in_threadpool(upload_to_par, UPLOAD_PAR_URL, background_path)
         logger.info("Upload successful")
     except Exception:
         logger.exception("upload failed in background task")
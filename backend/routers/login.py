@@ -9,6 +9,7 @@ import jwt
 import os
 import re
 from database import get_db
+from metrics import timed_password_hash
 import logging
 
 FAKE_HASH = "$2b$12$vRjhbN6UeZ5x9pKeeC21/OiLf.xtQk9Sx9QwDRQh0G2NBc1qjdqWy" 
@@ -25,15 +26,15 @@ router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login/token")
 
-# Add logger setup at the top (if not already present)
 logger = logging.getLogger("jwt")
-logging.basicConfig(level=logging.INFO)
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    with timed_password_hash("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    with timed_password_hash("hash"):
+        return pwd_context.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -45,7 +46,7 @@ async def authenticate_user(username: str, password: str, db):
     user = await get_user_by_username(db, username)
     if not user:
         # Run fake hash verification so timing is constant
-        pwd_context.verify(password, FAKE_HASH)
+        verify_password(password, FAKE_HASH)
         return None
 
     # Check if user is locked and if lock timeout has expired
@@ -53,7 +54,7 @@ async def authenticate_user(username: str, password: str, db):
         locked_until = getattr(user, "locked_until", None)
         now = datetime.now()
         if locked_until and now < locked_until:
-            logger.warning(f"User {username} is locked until {locked_until} due to too many failed login attempts.")
+            logger.warning("User %s is locked until %s due to too many failed login attempts.", username, locked_until)
             return "locked"
         else:
             # Unlock user if timeout expired
@@ -71,7 +72,7 @@ async def authenticate_user(username: str, password: str, db):
         if failed_attempts >= 5:
             user.locked = True
             user.locked_until = datetime.now() + timedelta(minutes=15)
-            logger.warning(f"User {username} has been locked until {user.locked_until} after 5 failed login attempts.")
+            logger.warning("User %s has been locked until %s after 5 failed login attempts.", username, user.locked_until)
         # Save changes to DB (use update_user for existing user)
         await update_user(db, user)
         return None
@@ -141,13 +142,13 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         username: str = payload.get("sub")
         role: str = payload.get("role")
         team_id: str = payload.get("team_id")
-        logger.info(f"JWT loaded successfully")
+        logger.debug("JWT loaded successfully")
         if username is None or role is None:
             logger.warning("JWT token missing username or role")
             raise HTTPException(status_code=401, detail="Invalid token")
         return {"username": username, "role": role, "team_id": team_id}
     except jwt.PyJWTError as e:
-        logger.error(f"JWT validation failed: {str(e)}")
+        logger.error("JWT validation failed: %s", e)
         raise HTTPException(status_code=401, detail="Invalid token")
 
 @router.get("/")
@@ -1,15 +1,20 @@
-from fastapi import APIRouter, HTTPException, Body, Depends, Request, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Body, Depends, Query, Request, UploadFile, File, Form
 from models import Match, Round, Player
-from crud import get_matches, get_match, add_match, delete_match, get_player, get_players, add_player, update_match as update_match_in_db, get_user_by_username
+from crud import get_matches, get_match_team_ids, add_match, delete_match, update_match as update_match_in_db, get_user_by_username
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
+import asyncio
 import logging
 from routers.login import get_current_user
 from database import get_db
+from fastapi.concurrency import run_in_threadpool
+from csv_import import CSVImportError, iter_csv_lines, parse_rows, import_matches
+from import_jobs import save_upload, create_job, get_job
+from cache import cached_response, user_scope
+from loaders import Loaders, get_loaders
 import json
+import os
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -27,7 +32,7 @@ def calculate_sudden_death_winner(match, sd_round1, sd_round2):
     Returns:
         tuple: (winner_name, time1, time2) where times are the evasion times for each team/player
     """
-    logger.info("Calculating sudden death winner based on evasion times")
+    logger.debug("Calculating sudden death winner based on evasion times")
     
     # Calculate evasion times (20 seconds for successful evasion)
     if match.match_type == "team":
@@ -51,7 +56,7 @@ def calculate_sudden_death_winner(match, sd_round1, sd_round2):
         name1 = match.player1.name
         name2 = match.player2.name
     
-    logger.info(f"Sudden Death Times - {name1}: {time1}s, {name2}: {time2}s")
+    logger.debug("Sudden Death Times - %s: %ss, %s: %ss", name1, time1, name2, time2)
     
     if time1 > time2:
         return name1, time1, time2
@@ -60,190 +65,16 @@ def calculate_sudden_death_winner(match, sd_round1, sd_round2):
     else:
         return "Draw", time1, time2
 
-@router.get("/")
-async def list_matches(
-    request: Request,
-    db = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    query = {}
-    if current_user["role"] != "Admin":
-        if current_user["team_id"]:
-            query = {
-                "$or": [
-                    {"team1_players.team_id": current_user["team_id"]},
-                    {"team2_players.team_id": current_user["team_id"]},
-                    {"player1.team_id": current_user["team_id"]},
-                    {"player2.team_id": current_user["team_id"]}
-                ]
-            }
-        else:
-            return []
-            
-    return await get_matches(db, query)
-
-@router.get("/{match_id}")
-async def get_match_by_id(
-    request: Request,
-    match_id: str,
-    db = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    match = await get_match(db, match_id)
-    if not match:
-        raise HTTPException(status_code=404, detail="Match not found")
-        
-    if current_user["role"] != "Admin":
-        if not current_user["team_id"]:
-            raise HTTPException(status_code=403, detail="Access denied")
-            
-        # Check if match involves user's team
-        involved = False
-        if match.match_type == "team":
-            if any(p.team_id == current_user["team_id"] for p in (match.team1_players or [])): involved = True
-            if any(p.team_id == current_user["team_id"] for p in (match.team2_players or [])): involved = True
-        else:
-            if match.player1 and match.player1.team_id == current_user["team_id"]: involved = True
-            if match.player2 and match.player2.team_id == current_user["team_id"]: involved = True
-            
-        if not involved:
-            raise HTTPException(status_code=403, detail="Access denied")
-            
-    return match
-
-@router.post("/")
-async def create_match(
-    request: Request,
-    match_type: str = Body(...),
-    date: datetime = Body(...),
-    team1_name: str = Body(None),
-    team2_name: str = Body(None),
-    team1_player_ids: List[str] = Body(None),
-    team2_player_ids: List[str] = Body(None),
-    player1_id: str = Body(None),
-    player2_id: str = Body(None),
-    video_url: Optional[str] = Body(None),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
-):
-    
-    if current_user["role"] != "Admin":
-        raise HTTPException(status_code=403, detail="Admin privileges required")
-
-    # Validate match type
-    if match_type not in ["team", "1v1"]:
-        raise HTTPException(status_code=400, detail="Invalid match type")
-    
-    # Create match based on type
-    if match_type == "team":
-        if not all([team1_name, team2_name, team1_player_ids, team2_player_ids]):
-            raise HTTPException(status_code=400, detail="Missing team information")
-        
-        # Check for duplicate players between teams
-        duplicate_players = set(team1_player_ids) & set(team2_player_ids)
-        if duplicate_players:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Players cannot be on both teams: {duplicate_players}"
-            )
-        
-        # Get player objects
-        team1_players = []
-        team2_players = []
-        for player_id in team1_player_ids:
-            player = await get_player(db, player_id)
-            if not player:
-                raise HTTPException(status_code=404, detail=f"Player {player_id} not found")
-            team1_players.append(player)
-        for player_id in team2_player_ids:
-            player = await get_player(db, player_id)
-            if not player:
-                raise HTTPException(status_code=404, detail=f"Player {player_id} not found")
-            team2_players.append(player)
-        
-        match = Match(
-            date=date,
-            match_type=match_type,
-            team1_name=team1_name,
-            team2_name=team2_name,
-            team1_players=team1_players,
-            team2_players=team2_players
-        )
-    else:  # 1v1
-        if not all([player1_id, player2_id]):
-            raise HTTPException(status_code=400, detail="Missing player information")
-        
-        # Prevent same player being selected for both sides
-        if player1_id == player2_id:
-            raise HTTPException(status_code=400, detail="Cannot select the same player for both sides in 1v1 match")
-        
-        # Get player objects
-        player1 = await get_player(db, player1_id)
-        player2 = await get_player(db, player2_id)
-        if not player1 or not player2:
-            raise HTTPException(status_code=404, detail="Player not found")
-        
-        match = Match(
-            date=date,
-            match_type=match_type,
-            player1=player1,
-            player2=player2,
-            video_url=video_url
-        )
-    
-    result = await add_match(db, match)
-    if not result:
-        raise HTTPException(status_code=500, detail="Failed to create match")
-    return result
-
-@router.post("/{match_id}/rounds")
-async def add_round(
-    request: Request,
-    match_id: str,
-    chaser_id: str = Body(...),
-    evader_id: str = Body(...),
-    tag_made: bool = Body(...),
-    tag_time: Optional[float] = Body(None),
-    round_hour: Optional[int] = Body(None),
-    round_minute: Optional[int] = Body(None),
-    round_second: Optional[int] = Body(None),
-    current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
-):
-    
-    if current_user["role"] != "Admin":
-        raise HTTPException(status_code=403, detail="Admin privileges required")
-    
-    logger.info(f"Adding round to match {match_id}")
-    logger.info(f"Request data: chaser={chaser_id}, evader={evader_id}, tag_made={tag_made}, tag_time={tag_time}")
-    
-    match = await get_match(db, match_id)
-    if not match:
-        logger.error(f"Match not found: {match_id}")
-        raise HTTPException(status_code=404, detail="Match not found")
-    
-    logger.info(f"Found match: {match.model_dump()}")
-    
-    # Get player objects
-    chaser = await get_player(db, chaser_id)
-    evader = await get_player(db, evader_id)
-    if not chaser or not evader:
-        logger.error(f"Player not found: chaser={chaser_id}, evader={evader_id}")
-        raise HTTPException(status_code=404, detail="Player not found")
-    
-    logger.info(f"Found players: chaser={chaser.name}, evader={evader.name}")
-    
-    def generate_video_url(match_video_url, hour, minute, second):
-        """Generate a video URL based on the provided time."""
-        if hour is None or minute is None or second is None:
-            logger.info(f"Incomplete time data for video URL generation, hour={hour}, minute={minute}, second={second}")
-            return None
-        return f"{match_video_url}&t={hour}h{minute}m{second}s"
-    
+def apply_round(match: Match, chaser: Player, evader: Player, tag_made: bool,
+                tag_time: Optional[float], video_url: Optional[str]) -> Round:
+    """
+    Validate a new round against the match rules, append it and update scores,
+    sudden death and completion in place. Raises HTTPException(400) for invalid rounds.
+    """
     # Validate players based on match type
     if match.match_type == "1v1":
         current_round = len(match.rounds)
-        logger.info(f"1v1 Match - Current Round: {current_round}")
+        logger.debug("1v1 Match - Current Round: %s", current_round)
         
         # For the first round, either player can be the evader
         if current_round == 0:
@@ -277,9 +108,9 @@ async def add_round(
         chaser_in_team1 = any(str(p.id) == str(chaser.id) for p in match.team1_players)
         chaser_in_team2 = any(str(p.id) == str(chaser.id) for p in match.team2_players)
         
-        logger.info(f"Team Match - Round: {len(match.rounds) + 1}")
-        logger.info(f"Evader: {evader.name} (Team {1 if evader_in_team1 else 2})")
-        logger.info(f"Chaser: {chaser.name} (Team {1 if chaser_in_team1 else 2})")
+        logger.debug("Team Match - Round: %s", len(match.rounds) + 1)
+        logger.debug("Evader: %s (Team %s)", evader.name, 1 if evader_in_team1 else 2)
+        logger.debug("Chaser: %s (Team %s)", chaser.name, 1 if chaser_in_team1 else 2)
         
         if not ((evader_in_team1 and chaser_in_team2) or (evader_in_team2 and chaser_in_team1)):
             raise HTTPException(status_code=400, detail="Players must be from opposing teams")
@@ -287,11 +118,11 @@ async def add_round(
         # Check previous round rules
         if len(match.rounds) > 0 and not match.is_sudden_death:  # Skip these rules for sudden death
             last_round = match.rounds[-1]
-            logger.info(f"Previous Round - Evader: {last_round.evader.name}, Tag Made: {last_round.tag_made}")
+            logger.debug("Previous Round - Evader: %s, Tag Made: %s", last_round.evader.name, last_round.tag_made)
             
             if not last_round.tag_made:  # Previous round was a successful evasion
                 if str(last_round.evader.id) != str(evader.id):
-                    logger.info(f"Error: {evader.name} cannot evade, {last_round.evader.name} must continue after successful evasion")
+                    logger.info("Error: %s cannot evade, %s must continue after successful evasion", evader.name, last_round.evader.name)
                     raise HTTPException(
                         status_code=400, 
                         detail=f"Player {last_round.evader.name} must continue as evader after successful evasion"
@@ -299,29 +130,22 @@ async def add_round(
                 # Ensure chaser is from the opposite team
                 last_evader_in_team1 = any(str(p.id) == str(last_round.evader.id) for p in match.team1_players)
                 if (last_evader_in_team1 and not chaser_in_team2) or (not last_evader_in_team1 and not chaser_in_team1):
-                    logger.info(f"Error: Chaser {chaser.name} must be from the opposing team")
+                    logger.info("Error: Chaser %s must be from the opposing team", chaser.name)
                     raise HTTPException(status_code=400, detail="Chaser must be from the opposing team")
-                logger.info("Validated: Previous successful evader continuing")
+                logger.debug("Validated: Previous successful evader continuing")
             else:  # Previous round was a tag
                 if str(last_round.chaser.id) != str(evader.id):
-                    logger.info(f"Error: {evader.name} cannot evade, {last_round.chaser.name} must be evader after successful tag")
+                    logger.info("Error: %s cannot evade, %s must be evader after successful tag", evader.name, last_round.chaser.name)
                     raise HTTPException(
                         status_code=400,
                         detail=f"Player {last_round.chaser.name} must be evader after successful tag"
                     )
-                logger.info("Validated: Previous successful chaser is now evading")
+                logger.debug("Validated: Previous successful chaser is now evading")
     
     # Validate tag_time based on tag_made
     if tag_made and (tag_time is None or tag_time < 0 or tag_time > 20):
         raise HTTPException(status_code=400, detail="Valid tag_time (0-20 seconds) is required when tag_made is true")
     
-    if match.video_url:
-        video_url = generate_video_url(match.video_url, round_hour, round_minute, round_second)
-    else:
-        video_url = None
-    
-    logger.info(f"Video URL: {video_url}")
-
     # Create new round
     new_round = Round(
         chaser=chaser,
@@ -395,31 +219,31 @@ async def add_round(
             match.winner, time1, time2 = calculate_sudden_death_winner(match, sd_round1, sd_round2)
             match.is_completed = True
     else:  # 1v1
-        logger.info(f"1v1 Match State - Rounds: {len(match.rounds)}, Score: {match.team1_score}-{match.team2_score}, Sudden Death: {match.is_sudden_death}")
+        logger.debug("1v1 Match State - Rounds: %s, Score: %s-%s, Sudden Death: %s", len(match.rounds), match.team1_score, match.team2_score, match.is_sudden_death)
         
         if len(match.rounds) == 3:  # After round 3, check if round 4 can make a difference
             score_diff = match.team1_score - match.team2_score  # Positive if player1 is winning
-            logger.info(f"Round 3 Check - Score Difference: {score_diff}")
+            logger.debug("Round 3 Check - Score Difference: %s", score_diff)
             
             # Check if the score difference is too large for the next round to matter
             if abs(score_diff) > 1:
-                logger.info(f"Match ending after round 3 - Score difference of {abs(score_diff)} too large to overcome in one more round")
+                logger.debug("Match ending after round 3 - Score difference of %s too large to overcome in one more round", abs(score_diff))
                 match.is_completed = True
                 match.winner = match.player1.name if score_diff > 0 else match.player2.name
             # In round 4, player2 evades (odd round)
             elif score_diff > 0 and str(match.player1.id) == str(chaser.id):  # Player 1 winning and just chased
-                logger.info("Match ending after round 3 - Player 1 winning and Player 2 would evade next")
+                logger.debug("Match ending after round 3 - Player 1 winning and Player 2 would evade next")
                 match.is_completed = True
                 match.winner = match.player1.name
             # In round 4, player1 evades (even round)
             elif score_diff < 0 and str(match.player2.id) == str(chaser.id):  # Player 2 winning and just chased
-                logger.info("Match ending after round 3 - Player 2 winning and Player 1 would evade next")
+                logger.debug("Match ending after round 3 - Player 2 winning and Player 1 would evade next")
                 match.is_completed = True
                 match.winner = match.player2.name
             else:
                 logger.info("Match continuing to round 4 - Next evader could still win/tie")
         elif len(match.rounds) == 4:  # After round 4
-            logger.info(f"Round 4 Check - Scores Equal: {match.team1_score == match.team2_score}")
+            logger.debug("Round 4 Check - Scores Equal: %s", match.team1_score == match.team2_score)
             if match.team1_score == match.team2_score:
                 logger.info("Entering sudden death after round 4 - Scores tied")
                 match.is_sudden_death = True
@@ -432,13 +256,250 @@ async def add_round(
             sd_round2 = match.rounds[5]    # Second sudden death round
             match.winner, time1, time2 = calculate_sudden_death_winner(match, sd_round1, sd_round2)
             match.is_completed = True
+
+    return new_round
+
+# Sort orders accepted by list_matches
+MATCH_SORTS = {
+    "date": [("date", 1), ("_id", 1)],
+    "-date": [("date", -1), ("_id", -1)],
+}
+
+def match_filter_query(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    match_type: Optional[str] = None,
+    player_id: Optional[str] = None,
+    team_id: Optional[str] = None,
+    completed: Optional[bool] = None,
+    q: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Build a matches query from the list filters.
+    Player and team filters use the indexed participant_ids/team_ids arrays and
+    q runs a text search over team names (and player names for 1v1 matches); it
+    matches whole words, not prefixes.
+    """
+    query: Dict[str, Any] = {}
+    date_range = {}
+    if start_date:
+        date_range["$gte"] = start_date
+    if end_date:
+        date_range["$lte"] = end_date
+    if date_range:
+        query["date"] = date_range
+    if match_type:
+        query["match_type"] = match_type
+    if player_id:
+        query["participant_ids"] = player_id
+    if team_id:
+        query["team_ids"] = team_id
+    if completed is not None:
+        query["is_completed"] = completed
+    if q and q.strip():
+        query["$text"] = {"$search": q.strip()}
+    return query
+
+@router.get("/")
+async def list_matches(
+    request: Request,
+    start_date: Optional[datetime] = Query(None, description="Only matches on or after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only matches on or before this date"),
+    match_type: Optional[Literal["team", "1v1"]] = Query(None, description="Only matches of this type"),
+    player_id: Optional[str] = Query(None, description="Only matches this player took part in"),
+    team_id: Optional[str] = Query(None, description="Only matches involving this team"),
+    completed: Optional[bool] = Query(None, description="Only completed (true) or unfinished (false) matches"),
+    q: Optional[str] = Query(None, max_length=100, description="Whole-word text search over team and player names (not a prefix match)"),
+    sort: Optional[Literal["date", "-date"]] = Query(None, description="Sort by date, '-date' for newest first"),
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    query = match_filter_query(start_date, end_date, match_type, player_id, team_id, completed, q)
+    if current_user["role"] != "Admin":
+        if current_user["team_id"]:
+            scope = {"team_ids": current_user["team_id"]}
+            query = {"$and": [scope, query]} if query else scope
+        else:
+            return []
+            
+    return await cached_response(
+        request,
+        db,
+        lambda: get_matches(db, query, MATCH_SORTS.get(sort)),
+        scope=user_scope(current_user)
+    )
+
+@router.get("/{match_id}")
+async def get_match_by_id(
+    request: Request,
+    match_id: str,
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+    current_user: dict = Depends(get_current_user)
+):
+    # Checked before cached_response so that a conditional request cannot skip the 404/403;
+    # only team_ids are read, the match itself is loaded when the response is not cached
+    team_ids = await get_match_team_ids(db, match_id)
+    if team_ids is None:
+        raise HTTPException(status_code=404, detail="Match not found")
+        
+    if current_user["role"] != "Admin":
+        if not current_user["team_id"]:
+            raise HTTPException(status_code=403, detail="Access denied")
+            
+        # Check if match involves user's team
+        if current_user["team_id"] not in team_ids:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+    async def compute():
+        match = await loaders.matches.load(match_id)
+        if not match:
+            raise HTTPException(status_code=404, detail="Match not found")
+        return match
+
+    return await cached_response(request, db, compute, scope=user_scope(current_user))
+
+@router.post("/")
+async def create_match(
+    request: Request,
+    match_type: str = Body(...),
+    date: datetime = Body(...),
+    team1_name: str = Body(None),
+    team2_name: str = Body(None),
+    team1_player_ids: List[str] = Body(None),
+    team2_player_ids: List[str] = Body(None),
+    player1_id: str = Body(None),
+    player2_id: str = Body(None),
+    video_url: Optional[str] = Body(None),
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
+):
+    
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    # Validate match type
+    if match_type not in ["team", "1v1"]:
+        raise HTTPException(status_code=400, detail="Invalid match type")
+    
+    # Create match based on type
+    if match_type == "team":
+        if not all([team1_name, team2_name, team1_player_ids, team2_player_ids]):
+            raise HTTPException(status_code=400, detail="Missing team information")
+        
+        # Check for duplicate players between teams
+        duplicate_players = set(team1_player_ids) & set(team2_player_ids)
+        if duplicate_players:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Players cannot be on both teams: {duplicate_players}"
+            )
+        
+        # Get player objects (one query for both teams)
+        team1_players, team2_players = await asyncio.gather(
+            loaders.players.load_many(team1_player_ids),
+            loaders.players.load_many(team2_player_ids)
+        )
+        for player_id, player in zip(team1_player_ids + team2_player_ids, team1_players + team2_players):
+            if not player:
+                raise HTTPException(status_code=404, detail=f"Player {player_id} not found")
+        
+        match = Match(
+            date=date,
+            match_type=match_type,
+            team1_name=team1_name,
+            team2_name=team2_name,
+            team1_players=team1_players,
+            team2_players=team2_players
+        )
+    else:  # 1v1
+        if not all([player1_id, player2_id]):
+            raise HTTPException(status_code=400, detail="Missing player information")
+        
+        # Prevent same player being selected for both sides
+        if player1_id == player2_id:
+            raise HTTPException(status_code=400, detail="Cannot select the same player for both sides in 1v1 match")
+        
+        # Get player objects
+        player1, player2 = await loaders.players.load_many([player1_id, player2_id])
+        if not player1 or not player2:
+            raise HTTPException(status_code=404, detail="Player not found")
+        
+        match = Match(
+            date=date,
+            match_type=match_type,
+            player1=player1,
+            player2=player2,
+            video_url=video_url
+        )
+    
+    result = await add_match(db, match)
+    if not result:
+        raise HTTPException(status_code=500, detail="Failed to create match")
+    return result
+
+@router.post("/{match_id}/rounds")
+async def add_round(
+    request: Request,
+    match_id: str,
+    chaser_id: str = Body(...),
+    evader_id: str = Body(...),
+    tag_made: bool = Body(...),
+    tag_time: Optional[float] = Body(None),
+    round_hour: Optional[int] = Body(None),
+    round_minute: Optional[int] = Body(None),
+    round_second: Optional[int] = Body(None),
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
+):
+    
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    
+    logger.info("Adding round to match %s", match_id)
+    logger.debug("Request data: chaser=%s, evader=%s, tag_made=%s, tag_time=%s", chaser_id, evader_id, tag_made, tag_time)
+    
+    # The match and both players are fetched concurrently
+    match, (chaser, evader) = await asyncio.gather(
+        loaders.matches.load(match_id),
+        loaders.players.load_many([chaser_id, evader_id])
+    )
+    if not match:
+        logger.error("Match not found: %s", match_id)
+        raise HTTPException(status_code=404, detail="Match not found")
+    
+    logger.debug("Found match %s with %d rounds", match_id, len(match.rounds))
+    
+    if not chaser or not evader:
+        logger.error("Player not found: chaser=%s, evader=%s", chaser_id, evader_id)
+        raise HTTPException(status_code=404, detail="Player not found")
+    
+    logger.debug("Found players: chaser=%s, evader=%s", chaser.name, evader.name)
     
+    def generate_video_url(match_video_url, hour, minute, second):
+        """Generate a video URL based on the provided time."""
+        if hour is None or minute is None or second is None:
+            logger.debug("Incomplete time data for video URL generation, hour=%s, minute=%s, second=%s", hour, minute, second)
+            return None
+        return f"{match_video_url}&t={hour}h{minute}m{second}s"
+    
+    if match.video_url:
+        video_url = generate_video_url(match.video_url, round_hour, round_minute, round_second)
+    else:
+        video_url = None
+    
+    logger.debug("Video URL: %s", video_url)
+
+    apply_round(match, chaser, evader, tag_made, tag_time, video_url)
+
     # Update match in database
     result = await add_match(db, match)
     if not result:
         raise HTTPException(status_code=500, detail="Failed to update match")
     
-    logger.info(f"Match Updated - Completed: {match.is_completed}, Winner: {match.winner}, Sudden Death: {match.is_sudden_death}")
+    logger.info("Match Updated - Completed: %s, Winner: %s, Sudden Death: %s", match.is_completed, match.winner, match.is_sudden_death)
     return result
 
 @router.delete("/{match_id}")
@@ -447,7 +508,8 @@ async def remove_match(
     match_id: str,
     confirm: bool = Body(..., embed=True, description="Confirmation flag that must be true to delete the match"),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Delete a match. Requires explicit confirmation to prevent accidental deletions.
     
@@ -471,13 +533,13 @@ async def remove_match(
         )
     
     # Get match first to provide more context in the error message
-    match = await get_match(db, match_id)
+    match = await loaders.matches.load(match_id)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
     
     # Additional warning for matches with rounds
     if len(match.rounds) > 0:
-        logger.warning(f"Deleting match {match_id} with {len(match.rounds)} rounds")
+        logger.warning("Deleting match %s with %s rounds", match_id, len(match.rounds))
     
     success = await delete_match(match_id, db)
     if not success:
@@ -494,13 +556,14 @@ async def update_match(
     match_id: str,
     match: Match,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
     # Verify match exists
-    existing_match = await get_match(db, match_id)
+    existing_match = await loaders.matches.load(match_id)
     if not existing_match:
         raise HTTPException(status_code=404, detail="Match not found")
     
@@ -608,13 +671,14 @@ async def delete_last_round(
     request: Request,
     match_id: str,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
     """Delete the last round of a match if it's not completed or in sudden death."""
-    match = await get_match(db, match_id)
+    match = await loaders.matches.load(match_id)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
     
@@ -630,7 +694,7 @@ async def delete_last_round(
     
     # Remove last round
     last_round = match.rounds.pop()
-    logger.info(f"Deleting last round from match {match_id}: {last_round.model_dump()}")
+    logger.info("Deleting last round (%d) from match %s", len(match.rounds), match_id)
     
     # Update score if needed
     if not last_round.tag_made:  # If it was a successful evasion, subtract points
@@ -665,13 +729,14 @@ async def update_round(
     tag_time: Optional[float] = Body(None),
     video_url: Optional[str] = Body(None),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
-    logger.info(f"Updating round {round_index} for match {match_id}")
-    match = await get_match(db, match_id)
+    logger.info("Updating round %s for match %s", round_index, match_id)
+    match = await loaders.matches.load(match_id)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
     
@@ -712,11 +777,12 @@ async def update_match_date(
     match_id: str,
     date: Optional[datetime] = Body(None, embed=True),
     video_url: Optional[str] = Body(None, embed=True),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Update a match's date."""
     # First get the existing match
-    match = await get_match(db, match_id)
+    match = await loaders.matches.load(match_id)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
     
@@ -730,7 +796,7 @@ async def update_match_date(
         # Update all rounds' video URLs to match the new base URL
         update_round_video_urls(match, video_url)  # Update round video URLs
         # Log the update        
-        logger.info(f"Updated video URL for match {match_id}: {video_url}")
+        logger.info("Updated video URL for match %s: %s", match_id, video_url)
     
     # Save the updated match
     updated_match = await update_match_in_db(db, match)
@@ -750,11 +816,21 @@ def update_round_video_urls(match: Match, new_video_url: str):
             # Update the round's video URL with the new base URL and the same time part
             round.video_url = f"{new_video_url}&t={time_part}" if time_part else new_video_url
 
+def parse_match_numbers(match_numbers: str) -> List[int]:
+    try:
+        selected_ids = json.loads(match_numbers)
+        if not isinstance(selected_ids, list) or not all(isinstance(x, int) for x in selected_ids):
+            raise ValueError
+        return selected_ids
+    except Exception:
+        raise HTTPException(status_code=400, detail="match_numbers must be a JSON array of integers")
+
 @router.post("/import_csv")
 async def import_matches_from_csv(
     request: Request,
     file: UploadFile = File(...),
     match_numbers: str = Form(..., description="JSON array of match numbers to import, e.g. [30,31]"),
+    dry_run: bool = Form(False, description="Only validate the file and report the inferred matches"),
     current_user: dict = Depends(get_current_user),
     db = Depends(get_db)
 ):
@@ -765,180 +841,69 @@ async def import_matches_from_csv(
 
     Only match numbers listed in match_numbers are imported.
     Teams for team matches are inferred by bipartitioning the chaser/evader graph. If only two unique players, it's 1v1.
+    The response includes a per-match report; matches that cannot be imported are reported instead of saved.
+    With dry_run the report lists the inferred teams and nothing is written.
     """
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Admin privileges required")
 
-    try:
-        selected_ids = json.loads(match_numbers)
-        if not isinstance(selected_ids, list) or not all(isinstance(x, int) for x in selected_ids):
-            raise ValueError
-        selected_ids_set = set(selected_ids)
-    except Exception:
-        raise HTTPException(status_code=400, detail="match_numbers must be a JSON array of integers")
+    selected_ids = parse_match_numbers(match_numbers)
 
-    content = await file.read()
     try:
-        text = content.decode("utf-8")
-    except Exception:
-        raise HTTPException(status_code=400, detail="Failed to read CSV file as UTF-8")
-
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    if not lines:
-        raise HTTPException(status_code=400, detail="CSV file is empty")
-
-    # Parse CSV into rows
-    rows = []
-    for ln in lines:
-        parts = [p.strip() for p in ln.split(",")]
-        if len(parts) < 5:
-            logger.warning(f"Skipping malformed CSV line: {ln}")
-            continue
-        try:
-            match_no = int(parts[0])
-            round_no = int(parts[1])
-            chaser_name = parts[2]
-            evader_name = parts[3]
-            tag_time_val = float(parts[4])
-        except Exception:
-            logger.warning(f"Skipping unparsable CSV line: {ln}")
-            continue
-        if match_no in selected_ids_set:
-            rows.append({
-                "match_no": match_no,
-                "round_no": round_no,
-                "chaser_name": chaser_name,
-                "evader_name": evader_name,
-                "tag_time": tag_time_val,
-            })
-
-    if not rows:
-        raise HTTPException(status_code=400, detail="No rows found for selected match numbers")
-
-    # Group by match number
-    by_match = {}
-    for r in rows:
-        by_match.setdefault(r["match_no"], []).append(r)
-
-    # Load players for name lookup
-    existing_players = await get_players(db)
-    name_map = {p.name: p for p in existing_players if p and p.name}
-
-    async def get_or_create_player_by_name(name: str):
-        if name in name_map:
-            return name_map[name]
-        for k, v in name_map.items():
-            if k.lower() == name.lower():
-                return v
-        new_p = Player(name=name)
-        created = await add_player(db, new_p)
-        if created:
-            name_map[created.name] = created
-        return created
-
-    results = []
-    for match_no, match_rows in by_match.items():
-        player_names = set()
-        for r in match_rows:
-            player_names.add(r["chaser_name"])  # chaser
-            player_names.add(r["evader_name"])  # evader
-
-        if len(player_names) == 2:
-            names = list(player_names)
-            p1 = await get_or_create_player_by_name(names[0])
-            p2 = await get_or_create_player_by_name(names[1])
-            if not p1 or not p2:
-                logger.error(f"Failed to resolve both players for match {match_no}")
-                continue
-            match = Match(
-                date=datetime.utcnow(),
-                match_type="1v1",
-                player1=p1,
-                player2=p2,
-                rounds=[],
-            )
-            for r in sorted(match_rows, key=lambda x: x["round_no"]):
-                chaser = p1 if r["chaser_name"] == p1.name else p2
-                evader = p1 if r["evader_name"] == p1.name else p2
-                tag_made = r["tag_time"] != 20
-                tag_time_val = None if not tag_made else float(r["tag_time"])
-                match.rounds.append(Round(chaser=chaser, evader=evader, tag_made=tag_made, tag_time=tag_time_val))
-                if not tag_made:
-                    if evader.id == p1.id:
-                        match.team1_score += 1
-                    else:
-                        match.team2_score += 1
-            saved = await add_match(db, match)
-            if saved:
-                results.append(saved)
-            continue
-
-        # TEAM: infer teams via graph bipartition
-        adjacency = {}
-        for r in match_rows:
-            a = r["chaser_name"]
-            b = r["evader_name"]
-            adjacency.setdefault(a, []).append(b)
-            adjacency.setdefault(b, []).append(a)
-
-        color = {}
-        from collections import deque
-        for name in adjacency.keys():
-            if name in color:
-                continue
-            color[name] = 0
-            q = deque([name])
-            while q:
-                u = q.popleft()
-                for v in adjacency.get(u, []):
-                    if v not in color:
-                        color[v] = 1 - color[u]
-                        q.append(v)
-                    elif color[v] == color[u]:
-                        logger.error(f"Match {match_no} graph is not bipartite; cannot infer teams")
-                        raise HTTPException(status_code=400, detail=f"Cannot infer teams for match {match_no} (non-bipartite)")
-
-        team1_names = [n for n, c in color.items() if c == 0]
-        team2_names = [n for n, c in color.items() if c == 1]
-        team1_players = []
-        team2_players = []
-        for nm in team1_names:
-            p = await get_or_create_player_by_name(nm)
-            if p:
-                team1_players.append(p)
-        for nm in team2_names:
-            p = await get_or_create_player_by_name(nm)
-            if p:
-                team2_players.append(p)
-
-        team1_name = "-".join(team1_names)
-        team2_name = "-".join(team2_names)
+        # Parse off the event loop, straight from the spooled upload
+        by_match = await run_in_threadpool(parse_rows, iter_csv_lines(file.file), set(selected_ids))
+        result = await import_matches(db, by_match, dry_run=dry_run)
+    except CSVImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if dry_run:
+        return result
+    return {
+        "imported": result["imported"],
+        "players_created": result["players_created"],
+        "matches": [m.model_dump() for m in result["matches"]],
+        "report": result["report"],
+    }
 
-        match = Match(
-            date=datetime.utcnow(),
-            match_type="team",
-            team1_name=team1_name,
-            team2_name=team2_name,
-            team1_players=team1_players,
-            team2_players=team2_players,
-            rounds=[],
-        )
+@router.post("/import_jobs", status_code=202)
+async def create_import_job(
+    request: Request,
+    file: UploadFile = File(...),
+    match_numbers: str = Form(..., description="JSON array of match numbers to import, e.g. [30,31]"),
+    dry_run: bool = Form(False, description="Only validate the file and report the inferred matches"),
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    """Start a background CSV import.
 
-        name_to_player = {p.name: p for p in team1_players + team2_players}
-        for r in sorted(match_rows, key=lambda x: x["round_no"]):
-            chaser = name_to_player.get(r["chaser_name"]) or await get_or_create_player_by_name(r["chaser_name"])
-            evader = name_to_player.get(r["evader_name"]) or await get_or_create_player_by_name(r["evader_name"])
-            tag_made = r["tag_time"] != 20
-            tag_time_val = None if not tag_made else float(r["tag_time"])
-            match.rounds.append(Round(chaser=chaser, evader=evader, tag_made=tag_made, tag_time=tag_time_val))
-            if not tag_made:
-                if any(str(p.id) == str(evader.id) for p in team1_players):
-                    match.team1_score += 1
-                else:
-                    match.team2_score += 1
+    The upload is streamed to a temporary file and imported by a background worker.
+    Poll GET /matches/import_jobs/{job_id} for rows parsed, matches written and errors.
+    """
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
 
-        saved = await add_match(db, match)
-        if saved:
-            results.append(saved)
+    selected_ids = parse_match_numbers(match_numbers)
+    path = await save_upload(file)
+    try:
+        job = await create_job(db, path, selected_ids, dry_run, current_user["username"])
+    except Exception:
+        # No job owns the upload yet
+        os.remove(path)
+        raise
+    logger.info("Queued import job %s (dry_run=%s)", job["id"], dry_run)
+    return job
+
+@router.get("/import_jobs/{job_id}")
+async def get_import_job(
+    request: Request,
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    db = Depends(get_db)
+):
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
 
-    return {"imported": len(results), "matches": [m.model_dump() for m in results]}
\ No newline at end of file
+    job = await get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+from metrics import render
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus exposition of every worker's metrics."""
+    data, content_type = render()
+    return Response(content=data, media_type=content_type)
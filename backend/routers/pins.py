@@ -1,15 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import List, Optional, Dict
-from pydantic import BaseModel
-from datetime import datetime, timezone
-from zoneinfo import ZoneInfo
+from pydantic import BaseModel, Field
+from datetime import datetime
 import logging
-from crud import create_pin, get_pins_by_match_and_round, update_pin, delete_pin, get_pins, get_match
-from models import Pin
+from crud import create_pin, update_pin, delete_pin, get_pins, apply_pin_operations, to_utc
+from models import Pin, PinOperation
 from database import get_db
+from routers.login import get_current_user
+from cache import cached_response
+from heatmap import bin_locations
+from fastapi.concurrency import run_in_threadpool
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(
@@ -29,10 +30,37 @@ async def create_new_pin(
         raise HTTPException(status_code=400, detail="Error creating pin")
     return created_pin
 
+# Upper bound on operations in one /pins/bulk request
+MAX_BULK_PIN_OPERATIONS = 1000
+
+class PinBulkRequest(BaseModel):
+    operations: List[PinOperation] = Field(..., min_length=1, max_length=MAX_BULK_PIN_OPERATIONS)
+
+@router.post("/bulk")
+async def bulk_pin_operations(
+    bulk: PinBulkRequest,
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Create, move and delete many pins in one request (e.g. a video review session).
+
+    Operations are applied with a single bulk_write. Each one gets a result with its
+    index, status ("created", "moved", "deleted" or "error"), pin id and error message;
+    a failing operation does not stop the others.
+    """
+    if current_user["role"] != "Admin":
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+    outcome = await apply_pin_operations(db, bulk.operations)
+    if outcome is None:
+        raise HTTPException(status_code=400, detail="Error applying pin operations")
+    return outcome
+
 # get pins with match and round details
 @router.get("/enriched", response_model=List[Dict])
 async def get_enriched_pins(
-    request=Request,
+    request: Request,
     start_date: Optional[datetime] = Query(None, description="Filter pins by match date start"),
     end_date: Optional[datetime] = Query(None, description="Filter pins by match date end"),
     player_id: Optional[str] = Query(None, description="Filter pins by player (chaser or evader)"),
@@ -44,70 +72,153 @@ async def get_enriched_pins(
     """
     Fetch pins enriched with match and round details.
     """
-    # Build the filter query for MongoDB
-    filter_query = {}
+    return await cached_response(
+        request,
+        db,
+        lambda: load_enriched_pins(db, start_date, end_date, player_id, opponent_id, role, match_type),
+    )
+
+def pin_filter_query(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    player_id: Optional[str] = None,
+    opponent_id: Optional[str] = None,
+    role: Optional[str] = None,
+    match_type: Optional[str] = None,
+    match_id: Optional[str] = None,
+    round_index: Optional[int] = None
+) -> Dict:
+    """
+    Build a pins query from the read filters.
+    Match date and type are denormalized onto pins, so no match lookups are needed.
+    """
+    conditions = []
+
+    if match_id:
+        conditions.append({"match_id": match_id})
+    if round_index is not None:
+        conditions.append({"round_index": round_index})
 
     # Filter by player (chaser or evader)
     if player_id:
         if role == "chaser":
-            filter_query["chaser_id"] = player_id
+            conditions.append({"chaser_id": player_id})
         elif role == "evader":
-            filter_query["evader_id"] = player_id
+            conditions.append({"evader_id": player_id})
         else:
-            filter_query["$or"] = [{"chaser_id": player_id}, {"evader_id": player_id}]
+            conditions.append({"$or": [{"chaser_id": player_id}, {"evader_id": player_id}]})
+
+    # Filter by opponent (the other participant of the round)
+    if opponent_id:
+        conditions.append({"$or": [{"chaser_id": opponent_id}, {"evader_id": opponent_id}]})
+
+    # Dates are stored in UTC; naive inputs are taken to be UTC
+    date_range = {}
+    if start_date:
+        date_range["$gte"] = to_utc(start_date)
+    if end_date:
+        date_range["$lte"] = to_utc(end_date)
+    if date_range:
+        conditions.append({"match_date": date_range})
+
+    if match_type:
+        conditions.append({"match_type": match_type})
 
-    # Fetch pins from the database
+    if not conditions:
+        return {}
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+async def load_enriched_pins(
+    db,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    player_id: Optional[str],
+    opponent_id: Optional[str],
+    role: Optional[str],
+    match_type: Optional[str]
+) -> List[Dict]:
+    filter_query = pin_filter_query(start_date, end_date, player_id, opponent_id, role, match_type)
     pins = await get_pins(db, filter_query)
-    enriched_pins = []
-
-    # Ensure input dates are timezone-aware
-    if start_date and start_date.tzinfo is None:
-        start_date = start_date.replace(tzinfo=timezone.utc)
-    if end_date and end_date.tzinfo is None:
-        end_date = end_date.replace(tzinfo=timezone.utc)
-
-    for pin in pins:
-        match = await get_match(db, pin.match_id)
-        if not match:
-            continue
-
-        # Ensure match.date is timezone-aware
-        if match.date.tzinfo is None:
-            match.date = match.date.replace(tzinfo=timezone.utc)
-
-        # Apply additional filters based on match properties
-        if start_date and match.date < start_date:
-            continue
-        if end_date and match.date > end_date:
-            continue
-        if match_type and match.match_type != match_type:
-            continue
-
-        # Filter by opponent
-        if opponent_id:
-            round_data = match.rounds[pin.round_index]
-            if round_data.chaser.id != opponent_id and round_data.evader.id != opponent_id:
-                continue
-
-        # Enrich the pin with match and round details
-        round_data = match.rounds[pin.round_index]
-        enriched_pins.append({
+
+    return [
+        {
             "id": pin.id,
             "location": pin.location,
             "round_index": pin.round_index,
             "matchDetails": {
-                "date": match.date.strftime("%Y-%m-%d"),
-                "chaser": round_data.chaser.name if round_data.chaser else "Unknown",
-                "evader": round_data.evader.name if round_data.evader else "Unknown",
-                "video_url": round_data.video_url or None
+                "date": pin.match_date.strftime("%Y-%m-%d") if pin.match_date else None,
+                "chaser": pin.chaser_name or "Unknown",
+                "evader": pin.evader_name or "Unknown",
+                "video_url": pin.video_url or None
             }
-        })
+        }
+        for pin in pins
+    ]
+
+@router.get("/heatmap")
+async def get_pin_heatmap(
+    request: Request,
+    bins: int = Query(20, ge=1, le=200, description="Number of grid cells per axis"),
+    sigma: float = Query(0.0, ge=0.0, le=20.0, description="Gaussian smoothing in cells (0 disables it)"),
+    start_date: Optional[datetime] = Query(None, description="Filter pins by match date start"),
+    end_date: Optional[datetime] = Query(None, description="Filter pins by match date end"),
+    player_id: Optional[str] = Query(None, description="Filter pins by player (chaser or evader)"),
+    opponent_id: Optional[str] = Query(None, description="Filter pins by opponent player"),
+    role: Optional[str] = Query(None, description="Filter pins by role ('chaser' or 'evader')"),
+    match_type: Optional[str] = Query(None, description="Filter pins by match type"),
+    db = Depends(get_db)
+):
+    """
+    Bin pin locations into a grid for the quad heatmap.
+
+    Accepts the same filters as /pins/enriched. The grid is a list of rows
+    (top to bottom) of counts, or of smoothed densities when sigma > 0.
+    """
+    async def compute():
+        pins = await load_enriched_pins(db, start_date, end_date, player_id, opponent_id, role, match_type)
+        return await run_in_threadpool(bin_locations, (pin["location"] for pin in pins), bins, sigma)
+
+    return await cached_response(request, db, compute)
 
-    return enriched_pins
+def parse_box(box: str) -> List[List[float]]:
+    """Parse 'x1,y1,x2,y2' into the [[min_x, min_y], [max_x, max_y]] corners of a $box."""
+    try:
+        x1, y1, x2, y2 = (float(v) for v in box.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="box must be four numbers: x1,y1,x2,y2")
+    return [[min(x1, x2), min(y1, y2)], [max(x1, x2), max(y1, y2)]]
+
+@router.get("/within", response_model=List[Pin])
+async def get_pins_within(
+    request: Request,
+    box: str = Query(..., description="Rectangle in quad percentages: x1,y1,x2,y2"),
+    start_date: Optional[datetime] = Query(None, description="Filter pins by match date start"),
+    end_date: Optional[datetime] = Query(None, description="Filter pins by match date end"),
+    player_id: Optional[str] = Query(None, description="Filter pins by player (chaser or evader)"),
+    opponent_id: Optional[str] = Query(None, description="Filter pins by opponent player"),
+    role: Optional[str] = Query(None, description="Filter pins by role ('chaser' or 'evader')"),
+    match_type: Optional[str] = Query(None, description="Filter pins by match type"),
+    db = Depends(get_db)
+) -> List[Pin]:
+    """
+    Fetch pins whose location lies inside a rectangle (e.g. one quadrant of the quad).
+    Uses the 2d index on pin coords together with the usual pin filters.
+    """
+    corners = parse_box(box)
+
+    async def compute():
+        filter_query = pin_filter_query(start_date, end_date, player_id, opponent_id, role, match_type)
+        within = {"coords": {"$geoWithin": {"$box": corners}}}
+        query = {"$and": [filter_query, within]} if filter_query else within
+        return await get_pins(db, query)
+
+    return await cached_response(request, db, compute)
 
 @router.get("/", response_model=List[Pin])
 async def read_pins(
-    request=Request,
+    request: Request,
     match_id: Optional[str] = Query(None, description="The ID of the match to fetch pins for"),
     round_index: Optional[int] = Query(None, description="The index of the round to fetch pins for (optional)"),
     start_date: Optional[datetime] = Query(None, description="Filter pins by match date start"),
@@ -117,107 +228,32 @@ async def read_pins(
     include_match_data: bool = Query(False, description="Include match data with pins"),
     db = Depends(get_db)
 ) -> List[Pin]:
-    logger.info(f"Fetching pins with filters: match_id={match_id}, round_index={round_index}, player_id={player_id}, match_type={match_type}")
-    
-    # Standard query for a specific match
-    if match_id and not (start_date or end_date or player_id or match_type):
-        pins = await get_pins_by_match_and_round(db, match_id=match_id, round_index=round_index)
-        logger.info(f"Retrieved {len(pins)} pins for match {match_id}")
-        for pin in pins:
-            logger.info(f"Pin data: id={pin.id}, location={pin.location}, match_id={pin.match_id}")
-        return pins
-    
-    # Enhanced query with filters and match data
-    filter_dict = {}
-    
-    # Build MongoDB query for pins
-    if match_id:
-        filter_dict["match_id"] = match_id
-    if round_index is not None:
-        filter_dict["round_index"] = round_index
-    if player_id:
-        filter_dict["$or"] = [{"chaser_id": player_id}, {"evader_id": player_id}]
-    
-    # Get pins based on direct filters
+    return await cached_response(
+        request,
+        db,
+        lambda: load_pins(db, match_id, round_index, start_date, end_date, player_id, match_type, include_match_data),
+    )
+
+async def load_pins(
+    db,
+    match_id: Optional[str],
+    round_index: Optional[int],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    player_id: Optional[str],
+    match_type: Optional[str],
+    include_match_data: bool
+) -> List[Pin]:
+    # Match date, type, names and video URL are always included on pins now,
+    # so include_match_data no longer changes the result.
+    logger.info("Fetching pins with filters: match_id=%s, round_index=%s, player_id=%s, match_type=%s",
+                match_id, round_index, player_id, match_type)
+
+    filter_dict = pin_filter_query(
+        start_date, end_date, player_id, match_type=match_type, match_id=match_id, round_index=round_index
+    )
     pins = await get_pins(db, filter_dict)
-    logger.info(f"Retrieved {len(pins)} pins with filter: {filter_dict}")
-    
-    # Further filtering based on match properties
-    if start_date or end_date or match_type:
-        filtered_pins = []
-        
-        # Make input dates timezone-aware if they aren't already
-        if start_date and start_date.tzinfo is None:
-            start_date = start_date.replace(tzinfo=ZoneInfo("UTC"))
-        if end_date and end_date.tzinfo is None:
-            end_date = end_date.replace(tzinfo=ZoneInfo("UTC"))
-        
-        # For each pin, check if its match meets the filter criteria
-        for pin in pins:
-            match = await get_match(db, pin.match_id)
-            logger.info(f"Processing pin {pin.id} for match {pin.match_id}")
-            
-            # Skip if match not found
-            if not match:
-                logger.warning(f"Match {pin.match_id} not found for pin {pin.id}")
-                continue
-                
-            # Make match date timezone-aware if it isn't already
-            if match.date.tzinfo is None:
-                match.date = match.date.replace(tzinfo=ZoneInfo("UTC"))
-                
-            # Apply date filters
-            if start_date and match.date < start_date:
-                continue
-            if end_date and match.date > end_date:
-                continue
-                
-            # Apply match type filter
-            if match_type and match.match_type != match_type:
-                continue
-            
-            # If include_match_data is True, add match details to pin
-            if include_match_data:
-                # Find the round details
-                round_data = match.rounds[pin.round_index]
-                logger.info(f"Adding match details to pin {pin.id}")
-                # Add match details as a property
-                pin_dict = pin.model_dump()
-                pin_dict["matchDetails"] = {
-                    "date": match.date.strftime("%Y-%m-%d"),
-                    "type": match.match_type,
-                    "chaser": round_data.chaser.name if round_data.chaser else "Unknown",
-                    "evader": round_data.evader.name if round_data.evader else "Unknown"
-                }
-                logger.info(f"Match details for pin {pin.id}: {pin_dict['matchDetails']}")
-                # Convert back to Pin model (with the extra property)
-                pin = Pin(**pin_dict)
-            
-            filtered_pins.append(pin)
-        
-        logger.info(f"Returning {len(filtered_pins)} filtered pins")
-        return filtered_pins
-    
-    # If no filtering needed, add match details to all pins if requested
-    if include_match_data:
-        pins_with_details = []
-        for pin in pins:
-            match = await get_match(db, pin.match_id)
-            if match:
-                round_data = match.rounds[pin.round_index]
-                pin_dict = pin.model_dump()
-                pin_dict["matchDetails"] = {
-                    "date": match.date.strftime("%Y-%m-%d"),
-                    "type": match.match_type,
-                    "chaser": round_data.chaser.name if round_data.chaser else "Unknown",
-                    "evader": round_data.evader.name if round_data.evader else "Unknown"
-                }
-                logger.info(f"Match details for pin {pin.id}: {pin_dict['matchDetails']}")
-                pins_with_details.append(Pin(**pin_dict))
-        logger.info(f"Returning {len(pins_with_details)} pins with match details")
-        return pins_with_details
-    
-    logger.info(f"Returning {len(pins)} pins without match details")
+    logger.info("Returning %d pins", len(pins))
     return pins
 
 class PinUpdateLocation(BaseModel):
@@ -1,48 +1,142 @@
-from fastapi import APIRouter, HTTPException, Form, File, UploadFile, Response, Depends, Request
+from fastapi import APIRouter, HTTPException, Form, File, UploadFile, Response, Depends, Request, Query
 from models import Player
-from crud import get_players, get_player, add_player, delete_player, get_user_by_username
+from crud import get_players, search_players, add_player, delete_player, get_user_by_username
 from pydantic import ValidationError
 from typing import Optional
 from fastapi import Body
 from database import get_gridfs
 import bson
 from datetime import datetime
-from statistics import calculate_player_stats
+from statistics import calculate_player_stats, calculate_versus_matrix
+from cache import cached_response, user_scope
+from loaders import Loaders, get_loaders
 import logging
 from database import get_db
 import os
 from openai import OpenAI
 import requests
+import tracing
 from routers.login import get_current_user
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+MAX_MATRIX_PLAYERS = 100
+MAX_PAGE_SIZE = 500
+MAX_AUTOCOMPLETE_RESULTS = 25
+
+def player_scope_query(current_user: dict) -> Optional[dict]:
+    """Players the user may see, or None if they may see none."""
+    if current_user["role"] == "Admin":
+        return {}
+    if current_user["team_id"]:
+        return {"team_id": current_user["team_id"]}
+    return None
+
 @router.get("/")
 async def list_players(
     request: Request,
+    q: Optional[str] = Query(None, max_length=50, description="Case-insensitive name prefix"),
+    offset: int = Query(0, ge=0, description="Number of players to skip"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size (all players if omitted)"),
     db = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    query = {}
-    if current_user["role"] != "Admin":
-        if current_user["team_id"]:
-            query["team_id"] = current_user["team_id"]
-        else:
-            return []
+    """List players ordered by name, optionally filtered by name prefix and paginated."""
+    query = player_scope_query(current_user)
+    if query is None:
+        return []
             
-    return await get_players(db, query)
+    return await cached_response(
+        request,
+        db,
+        lambda: search_players(db, query, prefix=q, skip=offset, limit=limit or 0),
+        scope=user_scope(current_user)
+    )
+
+@router.get("/autocomplete")
+async def autocomplete_players(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=50, description="Case-insensitive name prefix"),
+    limit: int = Query(10, ge=1, le=MAX_AUTOCOMPLETE_RESULTS),
+    db = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """Id and name of the first players (by name) whose name starts with q."""
+    query = player_scope_query(current_user)
+    if query is None:
+        return []
+
+    async def compute():
+        players = await search_players(db, query, prefix=q, limit=limit, projection={"name": 1})
+        return [{"id": p.id, "name": p.name} for p in players]
+
+    return await cached_response(request, db, compute, scope=user_scope(current_user))
+
+@router.get("/versus-matrix")
+async def get_versus_matrix(
+    request: Request,
+    player_ids: Optional[str] = Query(None, description="Comma-separated player IDs"),
+    team_id: Optional[str] = Query(None, description="Use every player of this team"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    match_type: Optional[str] = None,
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get head-to-head statistics for every pair in a set of players (or a team).
+
+    Matrices are indexed [evader][chaser] in the order of the returned players.
+    """
+    if current_user["role"] != "Admin":
+        if not current_user["team_id"]:
+            raise HTTPException(status_code=403, detail="Access denied")
+        if team_id and team_id != current_user["team_id"]:
+            raise HTTPException(status_code=403, detail="Access denied")
+
+    if team_id:
+        players = await get_players(db, {"team_id": team_id})
+    elif player_ids:
+        ids = list(dict.fromkeys(pid.strip() for pid in player_ids.split(",") if pid.strip()))
+        if not all(bson.ObjectId.is_valid(pid) for pid in ids):
+            raise HTTPException(status_code=400, detail="Invalid player ID")
+        players = await loaders.players.load_many(ids)
+        missing = [pid for pid, p in zip(ids, players) if p is None]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Players not found: {missing}")
+    else:
+        raise HTTPException(status_code=400, detail="Provide player_ids or team_id")
+
+    if len(players) > MAX_MATRIX_PLAYERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MATRIX_PLAYERS} players are supported")
+    if current_user["role"] != "Admin":
+        if any(p.team_id != current_user["team_id"] for p in players):
+            raise HTTPException(status_code=403, detail="Access denied")
+
+    async def compute():
+        matrix = await calculate_versus_matrix(
+            db,
+            player_ids=[p.id for p in players],
+            start_date=start_date,
+            end_date=end_date,
+            match_type=match_type
+        )
+        return {"players": [{"id": p.id, "name": p.name} for p in players], **matrix}
+
+    # Players are resolved above, so equal requests always describe the same matrix
+    return await cached_response(request, db, compute, scope=user_scope(current_user))
 
 @router.get("/{player_id}")
 async def get_player_by_id(
     request: Request,
     player_id: str,
     db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
     current_user: dict = Depends(get_current_user)
 ):
-    player = await get_player(db, player_id)
+    player = await loaders.players.load(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
         
@@ -56,9 +150,10 @@ async def get_player_by_id(
 async def get_player_image(
     request: Request,
     player_id: str,
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
-    player = await get_player(db, player_id)
+    player = await loaders.players.load(player_id)
     if not player or not player.image_id:
         raise HTTPException(status_code=404, detail="Image not found")
     
@@ -92,7 +187,7 @@ async def create_player(
     try:
         new_player = Player(name=name, team_id=team_id)
     except ValidationError as exc:
-        logger.error(f"Validation error creating player: {exc}")
+        logger.error("Validation error creating player: %s", exc)
         raise HTTPException(status_code=422, detail=f"failed to create player with name {name} {str(exc)}")    
     
     player = await add_player(db, new_player)
@@ -121,7 +216,7 @@ async def create_player(
             
         except Exception as e:
             # If image upload fails, still return the player but log the error
-            print(f"Error uploading image: {str(e)}")
+            logger.error("Error uploading image: %s", e)
     
     return player
 
@@ -131,12 +226,13 @@ async def update_player_details(
     name: Optional[str] = Body(None),
     team_id: Optional[str] = Body(None),
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
-    player = await get_player(db, player_id)
+    player = await loaders.players.load(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
         
@@ -153,12 +249,13 @@ async def remove_player(
     request: Request,
     player_id: str,
     current_user: dict = Depends(get_current_user),
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     if current_user["role"] != "Admin":
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
-    player = await get_player(db, player_id)
+    player = await loaders.players.load(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
     
@@ -168,7 +265,7 @@ async def remove_player(
             gfs = await get_gridfs(db)
             await gfs.delete(bson.ObjectId(player.image_id))
         except Exception as e:
-            print(f"Error deleting image: {str(e)}")
+            logger.error("Error deleting image: %s", e)
     
     # Delete player
     success = await delete_player(db, player_id)
@@ -182,11 +279,12 @@ async def get_player_statistics(
     end_date: Optional[datetime] = None,
     match_type: Optional[str] = None,
     db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders),
     current_user: dict = Depends(get_current_user)
 ):
     """Get player statistics with optional filters"""
     # Verify player exists
-    player = await get_player(db, player_id)
+    player = await loaders.players.load(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
         
@@ -195,15 +293,18 @@ async def get_player_statistics(
             raise HTTPException(status_code=403, detail="Access denied")
     
     # Calculate stats
-    stats = await calculate_player_stats(
+    return await cached_response(
+        request,
         db,
-        player_id=player_id,
-        start_date=start_date,
-        end_date=end_date,
-        match_type=match_type
+        lambda: calculate_player_stats(
+            db,
+            player_id=player_id,
+            start_date=start_date,
+            end_date=end_date,
+            match_type=match_type
+        ),
+        scope=user_scope(current_user)
     )
-    
-    return stats
 
 @router.get("/{player_id}/versus/{opponent_id}")
 async def get_versus_statistics(
@@ -212,25 +313,27 @@ async def get_versus_statistics(
     opponent_id: str,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get head-to-head statistics between two players"""
-    # Verify both players exist
-    player = await get_player(db, player_id)
-    opponent = await get_player(db, opponent_id)
+    # Verify both players exist (one query)
+    player, opponent = await loaders.players.load_many([player_id, opponent_id])
     if not player or not opponent:
         raise HTTPException(status_code=404, detail="Player not found")
     
     # Calculate head-to-head stats
-    stats = await calculate_player_stats(
+    return await cached_response(
+        request,
         db,
-        player_id=player_id,
-        start_date=start_date,
-        end_date=end_date,
-        opponent_id=opponent_id
+        lambda: calculate_player_stats(
+            db,
+            player_id=player_id,
+            start_date=start_date,
+            end_date=end_date,
+            opponent_id=opponent_id
+        ),
     )
-    
-    return stats
 
 @router.post("/{player_id}/tips")
 async def generate_player_tips(
@@ -239,14 +342,15 @@ async def generate_player_tips(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     match_type: Optional[str] = None,
-    db = Depends(get_db)
+    db = Depends(get_db),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Generate AI-driven improvement tips for a player based on stats.
 
     Uses OpenRouter (DeepSeek) via the OpenAI client. Returns a structured JSON.
     """
     # Verify player exists
-    player = await get_player(db, player_id)
+    player = await loaders.players.load(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
 
@@ -302,35 +406,38 @@ async def generate_player_tips(
     )
 
     try:
-        resp = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "deepseek/deepseek-chat-v3.1:free",
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                "response_format": {"type": "json_object"},
-                "temperature": 0.2,
-            },
-            timeout=60,
-        )
+        with tracing.span("openrouter.chat_completions", tracing.CLIENT, **{"server.address": "openrouter.ai"}) as span:
+            resp = requests.post(
+                "https://openrouter.ai/api/v1/chat/completions",
+                headers=tracing.inject({
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json",
+                }),
+                json={
+                    "model": "deepseek/deepseek-chat-v3.1:free",
+                    "messages": [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    "response_format": {"type": "json_object"},
+                    "temperature": 0.2,
+                },
+                timeout=60,
+            )
+            if span is not None:
+                span.attributes["http.response.status_code"] = resp.status_code
         # Log upstream response body for debugging (trim to 2000 chars)
         try:
-            logger.info(f"OpenRouter raw response {resp.status_code}: {resp.text}")
+            logger.debug("OpenRouter raw response %s: %s", resp.status_code, resp.text)
         except Exception:
             pass
         if resp.status_code >= 400:
-            logger.error(f"OpenRouter error {resp.status_code}: {resp.text}")
+            logger.error("OpenRouter error %s: %s", resp.status_code, resp.text)
             raise HTTPException(status_code=502, detail=f"OpenRouter HTTP {resp.status_code}")
         try:
             data = resp.json()
         except Exception as je:
-            logger.error(f"Failed to parse OpenRouter JSON: {je}; body: {resp.text}")
+            logger.error("Failed to parse OpenRouter JSON: %s; body: %s", je, resp.text)
             raise HTTPException(status_code=502, detail="OpenRouter JSON parse error")
 
         # Extract model output from multiple possible fields
@@ -348,16 +455,16 @@ async def generate_player_tips(
             # Fallback some providers use 'text' at choice level
             content = (choice0.get("text") or "").strip()
         if not content:
-            logger.error(f"Model returned empty content; raw body: {resp.text[:2000]}")
+            logger.error("Model returned empty content; raw body: %s", resp.text[:2000])
             content = "{}"
     except HTTPException:
         # already logged above
         raise
     except requests.exceptions.RequestException as re:
-        logger.error(f"OpenRouter request failed: {re}")
+        logger.error("OpenRouter request failed: %s", re)
         raise HTTPException(status_code=502, detail="OpenRouter request failed")
     except Exception as e:
-        logger.exception(f"Unexpected error calling OpenRouter: {e}")
+        logger.exception("Unexpected error calling OpenRouter: %s", e)
         raise HTTPException(status_code=502, detail="OpenRouter unexpected error")
 
     # Parse JSON content; try to clean code fences and extract JSON if needed
@@ -382,7 +489,7 @@ async def generate_player_tips(
         try:
             parsed = json.loads(candidate)
         except Exception as je2:
-            logger.error(f"Failed to parse model JSON content: {je2}; content: {cleaned[:500]}")
+            logger.error("Failed to parse model JSON content: %s; content: %s", je2, cleaned[:500])
             parsed = {"summary": content, "strengths": [], "weaknesses": [], "improvements": [], "drills": [], "risks": []}
 
     parsed.setdefault("sources", [
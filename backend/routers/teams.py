@@ -1,15 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import List
 from database import get_db
 from models import Team
 from crud import get_teams, create_team, delete_team, get_team_by_name
 from routers.login import get_current_user
+from cache import cached_response
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Team])
-async def list_teams(db=Depends(get_db)):
-    return await get_teams(db)
+async def list_teams(request: Request, db=Depends(get_db)):
+    return await cached_response(request, db, lambda: get_teams(db))
 
 @router.post("/", response_model=Team)
 async def create_new_team(team: Team, current_user: dict = Depends(get_current_user), db=Depends(get_db)):
@@ -0,0 +1,196 @@
+# Slow Mongo command log with redacted query shapes and optional explain capture
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import monitoring
+
+from request_context import current_route
+
+logger = logging.getLogger(__name__)
+
+# Commands slower than this many milliseconds are logged and recorded
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# Run explain("executionStats") in the background the first time a find/aggregate shape is slow
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+# Distinct shapes kept per worker; when full, a new shape replaces the fastest one only if it is slower
+SLOW_QUERY_MAX_SHAPES = int(os.getenv("SLOW_QUERY_MAX_SHAPES", "200"))
+
+REDACTED = "?"
+EXPLAINABLE = {"find", "aggregate"}
+# Driver/session fields that explain must not be sent again
+_SESSION_FIELDS = {"lsid", "txnNumber", "startTransaction", "autocommit", "readConcern", "writeConcern"}
+
+
+def redact(value: Any) -> Any:
+    """Keep the structure of a filter or pipeline and replace literal values with '?'."""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if any(isinstance(item, (dict, list, tuple)) for item in value):
+            return [redact(item) for item in value]
+        # $in lists and coordinates: the number of values is not part of the shape
+        return [REDACTED]
+    return REDACTED
+
+
+def command_shape(command_name: str, command: dict) -> Optional[dict]:
+    """The redacted part of a command that decides how it executes, or None for commands without one."""
+    if command_name == "find":
+        shape = {"filter": redact(command.get("filter", {}))}
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+        return shape
+    if command_name == "aggregate":
+        return {"pipeline": redact(command.get("pipeline", []))}
+    if command_name in ("count", "distinct", "findAndModify"):
+        return {"filter": redact(command.get("query", {}))}
+    if command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes") or [{}]
+        return {"filter": redact(statements[0].get("q", {}))}
+    return None
+
+
+class SlowQueryLog:
+    """Aggregate slow commands of this worker by (command, collection, shape)."""
+
+    def __init__(self, max_shapes: int = SLOW_QUERY_MAX_SHAPES):
+        self.max_shapes = max_shapes
+        self._shapes: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    def record(self, command_name: str, collection: str, shape: str, duration_ms: float,
+               route: Optional[str]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Add one slow execution; returns its entry (None if not kept) and whether the shape is new."""
+        key = (command_name, collection, shape)
+        entry = self._shapes.get(key)
+        is_new = entry is None
+        if is_new:
+            if len(self._shapes) >= self.max_shapes:
+                fastest = min(self._shapes, key=lambda k: self._shapes[k]["max_ms"])
+                if self._shapes[fastest]["max_ms"] >= duration_ms:
+                    return None, False
+                del self._shapes[fastest]
+            entry = self._shapes[key] = {
+                "command": command_name,
+                "collection": collection,
+                "shape": shape,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "routes": [],
+                "explain": None,
+            }
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + duration_ms, 3)
+        entry["max_ms"] = max(entry["max_ms"], round(duration_ms, 3))
+        entry["last_seen"] = time.time()
+        if route and route not in entry["routes"]:
+            entry["routes"].append(route)
+        return entry, is_new
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The slowest shapes first, by their worst execution."""
+        entries = sorted(self._shapes.values(), key=lambda e: e["max_ms"], reverse=True)[:limit]
+        return [{**e, "avg_ms": round(e["total_ms"] / e["count"], 3)} for e in entries]
+
+    def clear(self):
+        self._shapes.clear()
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _explain_command(command_name: str, command: dict) -> dict:
+    inner = {
+        key: value for key, value in command.items()
+        if not key.startswith("$") and key not in _SESSION_FIELDS
+    }
+    return {"explain": inner, "verbosity": "executionStats"}
+
+
+def _summarize_explain(result: dict) -> Dict[str, Any]:
+    stats = result.get("executionStats") or {}
+    planner = result.get("queryPlanner") or {}
+    if not stats and "stages" in result:
+        # Aggregations report the plan of their leading $cursor stage
+        cursor = (result["stages"][0] or {}).get("$cursor", {})
+        stats = cursor.get("executionStats") or {}
+        planner = cursor.get("queryPlanner") or {}
+    return {
+        "winning_plan": planner.get("winningPlan"),
+        "n_returned": stats.get("nReturned"),
+        "total_keys_examined": stats.get("totalKeysExamined"),
+        "total_docs_examined": stats.get("totalDocsExamined"),
+        "execution_time_ms": stats.get("executionTimeMillis"),
+    }
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Log and record commands slower than threshold_ms, with the route that issued them."""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, explain: bool = SLOW_QUERY_EXPLAIN,
+                 log: SlowQueryLog = slow_query_log):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.log = log
+        self._started: Dict[Tuple, Tuple[str, dict, Optional[str]]] = {}
+        self._explains: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return (event.connection_id, event.request_id, event.operation_id)
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            return
+        # Commands run inside the request's task, so its route is still current here.
+        # The command is only kept by reference; it is shaped once it turns out to be slow.
+        self._started[self._key(event)] = (collection, event.command, current_route())
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        started = self._started.pop(self._key(event), None)
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < self.threshold_ms:
+            return
+        collection, command, route = started
+        shape = command_shape(event.command_name, command)
+        shape_text = json.dumps(shape, default=str) if shape is not None else ""
+        logger.warning(
+            "Slow Mongo %s on %s took %.1f ms (route=%s, shape=%s)",
+            event.command_name, collection, duration_ms, route, shape_text,
+        )
+        entry, is_new = self.log.record(event.command_name, collection, shape_text, duration_ms, route)
+        if self.explain and is_new and event.command_name in EXPLAINABLE:
+            self._schedule_explain(event.database_name, event.command_name, command, entry)
+
+    def _schedule_explain(self, database_name: str, command_name: str, command: dict, entry: Dict[str, Any]):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # Outside the request's context, so the explain is not counted as the request's round trip or span
+        task = contextvars.Context().run(
+            loop.create_task, self._run_explain(database_name, command_name, command, entry)
+        )
+        self._explains.add(task)
+        task.add_done_callback(self._explains.discard)
+
+    async def _run_explain(self, database_name: str, command_name: str, command: dict, entry: Dict[str, Any]):
+        # Imported here: database registers this listener on the client it creates
+        from database import get_client
+        try:
+            result = await get_client()[database_name].command(_explain_command(command_name, command))
+            entry["explain"] = _summarize_explain(result)
+        except Exception as e:
+            logger.error("Explain of slow %s on %s failed: %s", command_name, entry["collection"], e)
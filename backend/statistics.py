@@ -2,6 +2,7 @@ from typing import Dict, List, Optional
 from datetime import datetime
 from models import Match, Round, Player
 from crud import get_matches
+from tracing import traced
 import logging
 
 logger = logging.getLogger(__name__)
@@ -78,6 +79,7 @@ class PlayerStats:
             },
         }
 
+@traced()
 async def calculate_player_stats(
     db,
     player_id: str,
@@ -99,12 +101,11 @@ async def calculate_player_stats(
     Returns:
         Dictionary containing calculated statistics and detailed round data
     """
-    # Create base query filter
+    # Create base query filter: participant_ids is indexed (multikey) and narrows the
+    # matches, the rounds condition keeps only matches the player actually played in
     query = {
-        "$or": [
-            {"rounds.evader.id": player_id},
-            {"rounds.chaser.id": player_id}
-        ]
+        "participant_ids": player_id,
+        "rounds": {"$elemMatch": {"$or": [{"evader.id": player_id}, {"chaser.id": player_id}]}}
     }
 
     processed_match_ids = set()
@@ -131,6 +132,7 @@ async def calculate_player_stats(
         # Use elemMatch to find rounds with both the player and opponent
         # This avoids the recursive reference problem
         query = {
+            "participant_ids": {"$all": [player_id, opponent_id]},
             "$or": [
                 # Match rounds where player is evader and opponent is chaser
                 {"rounds": {"$elemMatch": {
@@ -266,4 +268,64 @@ async def calculate_player_stats(
     stats.evasion_rounds = evasion_rounds
     stats.got_evaded_rounds = got_evaded_rounds
 
-    return stats.to_dict()
\ No newline at end of file
+    return stats.to_dict()
+
+async def calculate_versus_matrix(
+    db,
+    player_ids: List[str],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    match_type: Optional[str] = None
+) -> Dict:
+    """
+    Calculate head-to-head round statistics for every pair of players in one aggregation.
+
+    Args:
+        player_ids: IDs of the players forming both axes of the matrix
+        start_date: Optional start date for filtering
+        end_date: Optional end date for filtering
+        match_type: Optional match type filter ('1v1' or 'team')
+
+    Returns:
+        Dictionary of dense matrices indexed [evader][chaser] in player_ids order:
+        rounds, evasions, tags, evasion_time (total seconds survived) and
+        tag_time (total seconds the chaser needed for successful tags)
+    """
+    pair_filter = {"evader.id": {"$in": player_ids}, "chaser.id": {"$in": player_ids}}
+    query: Dict = {"participant_ids": {"$in": player_ids}, "rounds": {"$elemMatch": pair_filter}}
+
+    if start_date:
+        query["date"] = {"$gte": start_date, "$lte": end_date or datetime.now()}
+    elif end_date:
+        query["date"] = {"$lte": end_date}
+    if match_type:
+        query["match_type"] = match_type
+
+    pipeline = [
+        {"$match": query},
+        {"$unwind": "$rounds"},
+        {"$match": {"rounds." + k: v for k, v in pair_filter.items()}},
+        {"$group": {
+            "_id": {"evader": "$rounds.evader.id", "chaser": "$rounds.chaser.id"},
+            "rounds": {"$sum": 1},
+            "tags": {"$sum": {"$cond": ["$rounds.tag_made", 1, 0]}},
+            "tag_time": {"$sum": {"$cond": ["$rounds.tag_made", {"$ifNull": ["$rounds.tag_time", 0]}, 0]}},
+        }},
+    ]
+
+    size = len(player_ids)
+    index = {pid: i for i, pid in enumerate(player_ids)}
+    matrix = {name: [[0] * size for _ in range(size)] for name in ("rounds", "evasions", "tags", "evasion_time", "tag_time")}
+
+    async for cell in await db["matches"].aggregate(pipeline):
+        i = index[cell["_id"]["evader"]]
+        j = index[cell["_id"]["chaser"]]
+        evasions = cell["rounds"] - cell["tags"]
+        matrix["rounds"][i][j] = cell["rounds"]
+        matrix["tags"][i][j] = cell["tags"]
+        matrix["evasions"][i][j] = evasions
+        matrix["tag_time"][i][j] = round(cell["tag_time"], 2)
+        # A successful evasion lasts the full 20 second round
+        matrix["evasion_time"][i][j] = round(cell["tag_time"] + 20 * evasions, 2)
+
+    return matrix
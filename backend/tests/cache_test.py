@@ -0,0 +1,31 @@
+from cache import ResponseCache, make_etag
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_response_cache_counts_hits_and_misses():
+    cache = ResponseCache(maxsize=4)
+    assert cache.get("missing") is None
+    cache.set("key", {"value": 1})
+    cache.get("key")
+    cache.get("key")
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == round(2 / 3, 4)
+    assert stats["size"] == 1
+
+
+def test_make_etag_depends_on_key():
+    assert make_etag(("GET", "/teams/", 1)) == make_etag(("GET", "/teams/", 1))
+    assert make_etag(("GET", "/teams/", 1)) != make_etag(("GET", "/teams/", 2))
+    assert make_etag(("GET", "/teams/", 1)).startswith('W/"')
@@ -1,24 +1,30 @@
+import os
+
+# Set before app and database are imported: they read it at import time, and the
+# app's startup builds indexes and runs migrations on that database
+TEST_DB_NAME = "wct_stats_test"
+os.environ["DATABASE_NAME"] = TEST_DB_NAME
+
 import pytest
 from fastapi.testclient import TestClient
 from app import app
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from pymongo import AsyncMongoClient
 import asyncio
 from database import get_db
+import request_context
+from request_context import RoundTripListener
 
-os.environ["DATABASE_NAME"] = "wct_stats_test"
-TEST_DB_NAME = "wct_stats_test"
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 
 @pytest.fixture(scope="function", autouse=True)
 def override_get_db():
     async def _override_get_db():
-        client = AsyncIOMotorClient(MONGODB_URL)
+        client = AsyncMongoClient(MONGODB_URL, event_listeners=[RoundTripListener()])
         db = client[TEST_DB_NAME]
         try:
             yield db
         finally:
-            client.close()
+            await client.close()
     app.dependency_overrides[get_db] = _override_get_db
 
 @pytest.fixture
@@ -26,12 +32,37 @@ def client(override_get_db):
     with TestClient(app) as c:
         yield c
 
+@pytest.fixture
+def db_round_trips(monkeypatch):
+    """Check a response against a Mongo round-trip budget, so N+1 regressions fail the suite."""
+    monkeypatch.setattr(request_context, "DB_STATS_HEADERS", True)
+
+    def check(response, budget: int) -> int:
+        used = int(response.headers["X-DB-Round-Trips"])
+        request = response.request
+        assert used <= budget, f"{request.method} {request.url.path} made {used} Mongo round trips (budget {budget})"
+        return used
+    return check
+
+@pytest.fixture
+def run_on_test_db():
+    """Run an async function against the test database, e.g. to set up or inspect documents directly."""
+    def run(fn):
+        async def main():
+            client = AsyncMongoClient(MONGODB_URL)
+            try:
+                return await fn(client[TEST_DB_NAME])
+            finally:
+                await client.close()
+        return asyncio.run(main())
+    return run
+
 @pytest.fixture(scope="session", autouse=True)
 def cleanup_test_db():
     yield  # Run all tests first
     async def drop_db():
-        client = AsyncIOMotorClient(MONGODB_URL)
+        client = AsyncMongoClient(MONGODB_URL)
         await client.drop_database(TEST_DB_NAME)
-        client.close()
+        await client.close()
 
     asyncio.run(drop_db())
\ No newline at end of file
@@ -0,0 +1,167 @@
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from models import Player, Match, Round, Pin
+import crud
+
+# Round trips each crud write is allowed, in order and including the data version bump
+# on "meta", so a new write path cannot hide an extra read anywhere.
+BUMP = ("meta", "find_one_and_update")
+
+class FakeCollection:
+    """Just enough of an async collection to count round trips."""
+
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+        self.docs = {}
+
+    def _record(self, method):
+        self.calls.append((self.name, method))
+
+    async def insert_one(self, doc):
+        self._record("insert_one")
+        doc.setdefault("_id", ObjectId())
+        self.docs[doc["_id"]] = dict(doc)
+        return type("InsertOneResult", (), {"inserted_id": doc["_id"]})()
+
+    async def find_one(self, query, projection=None):
+        self._record("find_one")
+        doc = self.docs.get(query.get("_id"))
+        return dict(doc) if doc else None
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self._record("find_one_and_update")
+        doc = self.docs.get(query["_id"])
+        if doc is None:
+            if not upsert:
+                return None
+            doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+        previous = dict(doc)
+        doc.update(update.get("$set", {}))
+        for key in update.get("$unset", {}):
+            doc.pop(key, None)
+        for key, step in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + step
+        for key in update.get("$currentDate", {}):
+            doc[key] = datetime.utcnow()
+        return previous if return_document == ReturnDocument.BEFORE else dict(doc)
+
+    async def bulk_write(self, requests, ordered=True):
+        self._record("bulk_write")
+
+
+class FakeDB:
+    def __init__(self):
+        self.calls = []
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name, self.calls)
+        return self.collections[name]
+
+
+@pytest.fixture
+def db():
+    return FakeDB()
+
+
+def seed_match(db):
+    player = Player(id=str(ObjectId()), name="Round Trip")
+    match = Match(
+        id=str(ObjectId()),
+        date=datetime(2024, 5, 1),
+        match_type="1v1",
+        player1=player,
+        player2=player,
+        rounds=[Round(chaser=player, evader=player, tag_made=False)],
+    )
+    doc = crud.match_to_document(match)
+    db["matches"].docs[doc["_id"]] = doc
+    return match, player
+
+
+@pytest.mark.asyncio
+async def test_add_player_insert_round_trips(db):
+    player = await crud.add_player(db, Player(name="New Player"))
+    assert player.id and player.name == "New Player"
+    assert db.calls == [("players", "insert_one"), BUMP]
+
+
+@pytest.mark.asyncio
+async def test_add_player_update_round_trips(db):
+    player = await crud.add_player(db, Player(name="Old Name"))
+    db.calls.clear()
+    player.name = "New Name"
+    updated = await crud.add_player(db, player)
+    assert updated.name == "New Name"
+    assert db.calls == [("players", "find_one_and_update"), ("pins", "bulk_write"), BUMP]
+
+
+@pytest.mark.asyncio
+async def test_add_player_update_without_rename_leaves_pins(db):
+    player = await crud.add_player(db, Player(name="Same Name"))
+    db.calls.clear()
+    player.image_id = "image"
+    updated = await crud.add_player(db, player)
+    assert updated.name == "Same Name" and updated.image_id == "image"
+    assert db.calls == [("players", "find_one_and_update"), BUMP]
+
+
+@pytest.mark.asyncio
+async def test_update_match_round_trips(db):
+    match, _ = seed_match(db)
+    match.team1_score = 3
+    updated = await crud.update_match(db, match)
+    assert updated.team1_score == 3
+    assert db.calls == [("matches", "find_one_and_update"), ("pins", "bulk_write"), BUMP]
+
+
+@pytest.mark.asyncio
+async def test_create_pin_round_trips(db):
+    match, player = seed_match(db)
+    pin = await crud.create_pin(db, Pin(
+        location={"x": 10.0, "y": 20.0},
+        chaser_id=player.id,
+        evader_id=player.id,
+        match_id=match.id,
+        round_index=0,
+    ))
+    assert pin.id and pin.match_type == "1v1"
+    assert db.calls == [("matches", "find_one"), ("pins", "insert_one"), BUMP]
+
+
+@pytest.mark.asyncio
+async def test_update_pin_round_trips(db):
+    pin_id = ObjectId()
+    db["pins"].docs[pin_id] = {
+        "_id": pin_id, "location": {"x": 1.0, "y": 1.0}, "chaser_id": "a", "evader_id": "b",
+        "match_id": "m", "round_index": 0,
+    }
+    pin = await crud.update_pin(db, str(pin_id), {"x": 50.0, "y": 60.0})
+    assert pin.location == {"x": 50.0, "y": 60.0}
+    assert db.calls == [("pins", "find_one_and_update"), BUMP]
+
+    db.calls.clear()
+    assert await crud.update_pin(db, str(ObjectId()), {"x": 1.0, "y": 1.0}) is None
+    assert db.calls == [("pins", "find_one_and_update")]
+
+
+def test_match_to_document_derives_participants():
+    a = Player(id="a", name="Alpha", team_id="t1")
+    b = Player(id="b", name="Bravo", team_id="t2")
+    c = Player(id="c", name="Charlie", team_id="t2")
+    match = Match(
+        date=datetime(2024, 5, 1),
+        match_type="team",
+        team1_name="One",
+        team2_name="Two",
+        team1_players=[a],
+        team2_players=[b, c],
+        rounds=[Round(chaser=b, evader=a, tag_made=False)],
+    )
+    doc = crud.match_to_document(match)
+    assert doc["participant_ids"] == ["a", "b", "c"]
+    assert doc["team_ids"] == ["t1", "t2"]
@@ -0,0 +1,36 @@
+from csv_import import parse_rows, plan_matches, describe_plan
+
+
+def test_parse_rows_skips_unselected_and_malformed_lines():
+    lines = [
+        "1,1,Alpha,Bravo,5\n",
+        "\n",
+        "1,2,Bravo\n",
+        "x,2,Bravo,Alpha,20\n",
+        "2,1,Alpha,Bravo,20\n",
+    ]
+    by_match = parse_rows(lines, {1})
+    assert list(by_match) == [1]
+    assert len(by_match[1]) == 1
+
+
+def test_plan_matches_infers_team_bipartition_case_insensitively():
+    lines = [
+        "7,1,Alpha,Charlie,5",
+        "7,2,charlie,Bravo,20",
+        "7,3,Delta,alpha,3",
+    ]
+    plan = describe_plan(plan_matches(parse_rows(lines, {7}))[0])
+    assert plan["match_type"] == "team"
+    assert sorted([sorted(plan["team1"]), sorted(plan["team2"])]) == [["Alpha", "Bravo"], ["Charlie", "Delta"]]
+    assert plan["error"] is None
+
+
+def test_plan_matches_reports_non_bipartite_match():
+    lines = [
+        "3,1,Alpha,Bravo,5",
+        "3,2,Bravo,Charlie,5",
+        "3,3,Charlie,Alpha,5",
+    ]
+    plan = describe_plan(plan_matches(parse_rows(lines, {3}))[0])
+    assert "non-bipartite" in plan["error"]
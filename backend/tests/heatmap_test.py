@@ -0,0 +1,15 @@
+from heatmap import bin_locations
+
+
+def test_bin_locations_counts_pins_per_cell():
+    result = bin_locations([{"x": 1, "y": 1}, {"x": 99, "y": 60}, {"x": 100, "y": 100}, {"x": None, "y": 3}], bins=4)
+    assert result["total"] == 3
+    assert result["grid"] == [[1, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 1], [0, 0, 0, 1]]
+    assert result["max"] == 1
+
+
+def test_bin_locations_smoothing_preserves_mass():
+    result = bin_locations([{"x": 50, "y": 50}], bins=9, sigma=1.5)
+    total = sum(sum(row) for row in result["grid"])
+    assert abs(total - 1.0) < 1e-2
+    assert result["grid"][4][4] == result["max"]
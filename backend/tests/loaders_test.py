@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from loaders import BatchLoader
+
+
+def recording_loader(values):
+    batches = []
+
+    async def batch_fn(keys):
+        batches.append(sorted(keys))
+        return {key: values[key] for key in keys if key in values}
+
+    return BatchLoader(batch_fn), batches
+
+
+@pytest.mark.asyncio
+async def test_loads_in_the_same_tick_share_one_batch():
+    loader, batches = recording_loader({"a": 1, "b": 2})
+    results = await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a"))
+    assert results == [1, 2, 1]
+    assert batches == [["a", "b"]]
+
+
+@pytest.mark.asyncio
+async def test_results_are_memoized_including_misses():
+    loader, batches = recording_loader({"a": 1})
+    assert await loader.load_many(["a", "missing"]) == [1, None]
+    assert await loader.load("a") == 1
+    assert await loader.load("missing") is None
+    assert batches == [["a", "missing"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_not_memoized():
+    calls = []
+
+    async def batch_fn(keys):
+        calls.append(keys)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return {key: key.upper() for key in keys}
+
+    loader = BatchLoader(batch_fn)
+    with pytest.raises(RuntimeError):
+        await loader.load("a")
+    assert await loader.load("a") == "A"
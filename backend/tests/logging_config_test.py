@@ -0,0 +1,57 @@
+import io
+import json
+import logging
+import random
+
+from logging_config import JsonFormatter, SamplingFilter, configure_logging, parse_sample_rates, stop_logging
+
+
+def make_record(name, level, msg, *args, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_request_id_and_extra_fields():
+    record = make_record("crud", logging.ERROR, "Error saving match: %s", "boom",
+                         request_id="abc123", route="POST /matches/", match_id="m1")
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Error saving match: boom"
+    assert entry["level"] == "ERROR"
+    assert entry["request_id"] == "abc123"
+    assert entry["route"] == "POST /matches/"
+    assert entry["match_id"] == "m1"
+
+
+def test_sampling_applies_to_configured_loggers_below_warning():
+    sampling = SamplingFilter(parse_sample_rates("routers=0.5, routers.pins=0"), random.Random(1))
+    assert sampling.rate_for("routers.matches") == 0.5
+    assert sampling.rate_for("routers.pins") == 0.0
+    assert sampling.rate_for("crud") == 1.0
+
+    assert not sampling.filter(make_record("routers.pins", logging.DEBUG, "pin"))
+    assert sampling.filter(make_record("routers.pins", logging.WARNING, "pin"))
+    assert sampling.filter(make_record("crud", logging.DEBUG, "kept"))
+    kept = sum(sampling.filter(make_record("routers.matches", logging.DEBUG, "x")) for _ in range(1000))
+    assert 400 < kept < 600
+
+
+def test_records_are_formatted_by_the_listener():
+    stream = io.StringIO()
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    try:
+        configure_logging(level="INFO", fmt="json", stream=stream)
+        values = ["first"]
+        logging.getLogger("crud").info("Saved %s", values[0])
+        logging.getLogger("crud").debug("not emitted")
+        stop_logging()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+
+    [line] = stream.getvalue().splitlines()
+    assert json.loads(line)["message"] == "Saved first"
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from loop_monitor import LoopMonitor
+
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_stall_records_lag_and_blocking_stack():
+    monitor = LoopMonitor(interval=0.01, stall_ms=50)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop(0.2)
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+
+    snapshot = monitor.snapshot()
+    assert snapshot["lag_ms"]["max"] >= 150
+    [stall] = snapshot["stalls"]
+    assert stall["duration_ms"] >= 150
+    assert any("block_the_loop" in line for line in stall["stack"])
+
+
+@pytest.mark.asyncio
+async def test_monitor_without_stall_detection_only_measures_lag():
+    monitor = LoopMonitor(interval=0.01, stall_ms=0)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+    snapshot = monitor.snapshot()
+    assert snapshot["stall_threshold_ms"] is None
+    assert snapshot["lag_ms"]["p50"] is not None
+    assert snapshot["stalls"] == []
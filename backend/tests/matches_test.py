@@ -2,6 +2,7 @@ import pytest
 from datetime import datetime
 from models import UserRole
 import json
+import time
 
 ADMIN = "admin_matches"
 ADMIN_PASSWORD = "Adminpass123"
@@ -80,6 +81,55 @@ def test_list_matches(client, auth_headers):
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+def test_list_matches_filters(client, auth_headers, created_match):
+    player_id = created_match["player1_id"]
+    response = client.get(f"/matches/?player_id={player_id}&match_type=1v1&completed=false&sort=-date", headers=auth_headers)
+    assert response.status_code == 200
+    ids = [m["id"] for m in response.json()]
+    assert created_match["match_id"] in ids
+    assert all(player_id in m["participant_ids"] for m in response.json())
+
+    response = client.get(f"/matches/?player_id={player_id}&match_type=team", headers=auth_headers)
+    assert created_match["match_id"] not in [m["id"] for m in response.json()]
+
+    assert client.get("/matches/?sort=name", headers=auth_headers).status_code == 422
+
+def test_match_round_trip_budgets(client, auth_headers, mock_players, created_match, db_round_trips):
+    data = {
+        "match_type": "1v1",
+        "date": datetime.now().isoformat(),
+        "player1_id": mock_players[0],
+        "player2_id": mock_players[1],
+    }
+    # Both players in one query, the insert and the data version bump
+    db_round_trips(client.post("/matches/", json=data, headers=auth_headers), 3)
+    # Data version, the team_ids access check and the match itself (skipped when cached)
+    db_round_trips(client.get(f"/matches/{created_match['match_id']}", headers=auth_headers), 3)
+
+def test_list_matches_text_search(client, auth_headers):
+    p1 = client.post("/players/", data={"name": "Kestrel Voss"}, headers=auth_headers).json()["id"]
+    p2 = client.post("/players/", data={"name": "Marlow Quint"}, headers=auth_headers).json()["id"]
+    match = client.post("/matches/", json={
+        "match_type": "1v1",
+        "date": datetime.now().isoformat(),
+        "player1_id": p1,
+        "player2_id": p2,
+    }, headers=auth_headers).json()
+
+    response = client.get("/matches/?q=kestrel", headers=auth_headers)
+    assert response.status_code == 200
+    assert [m["id"] for m in response.json()] == [match["id"]]
+
+    # Whole words only
+    response = client.get("/matches/?q=Kest", headers=auth_headers)
+    assert match["id"] not in [m["id"] for m in response.json()]
+
+def test_match_filter_query():
+    from routers.matches import match_filter_query
+    assert match_filter_query() == {}
+    query = match_filter_query(team_id="t1", completed=True, q=" Hawks ")
+    assert query == {"team_ids": "t1", "is_completed": True, "$text": {"$search": "Hawks"}}
+
 def test_add_round(client, auth_headers, created_match):
     match_id = created_match["match_id"]
     round_data = {
@@ -163,4 +213,152 @@ def test_create_match_non_admin_forbidden(client, mock_players):
     }
     response = client.post("/matches/", json=data, headers=headers)
     assert response.status_code == 403
-    assert "Admin privileges required" in response.json().get("detail", "")
\ No newline at end of file
+    assert "Admin privileges required" in response.json().get("detail", "")
+
+def test_import_csv(client, auth_headers, db_round_trips):
+    csv_content = "\n".join([
+        "901,1,Csv Alpha,Csv Bravo,5",
+        "901,2,Csv Bravo,csv alpha,20",
+        "902,1,Csv Alpha,Csv Charlie,7.5",
+        "902,2,Csv Charlie,Csv Delta,20",
+        "902,3,Csv Charlie,Csv Bravo,3",
+        "903,1,Csv Alpha,Csv Bravo,4",
+    ])
+    response = client.post(
+        "/matches/import_csv",
+        files={"file": ("matches.csv", csv_content.encode("utf-8"), "text/csv")},
+        data={"match_numbers": json.dumps([901, 902])},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    # Players are looked up and created in bulk and matches inserted in one batch,
+    # so the cost does not grow with the number of names or matches
+    db_round_trips(response, 8)
+    body = response.json()
+    assert body["imported"] == 2
+    report = {entry["match_number"]: entry for entry in body["report"]}
+    assert report[901]["match_type"] == "1v1"
+    assert report[902]["match_type"] == "team"
+    assert all(entry["status"] == "imported" for entry in report.values())
+    one_v_one = next(m for m in body["matches"] if m["match_type"] == "1v1")
+    assert one_v_one["team2_score"] == 1
+
+def test_import_job_dry_run(client, auth_headers):
+    csv_content = "\n".join([
+        "911,1,Job Alpha,Job Charlie,5",
+        "911,2,Job Charlie,Job Bravo,20",
+        "911,3,Job Delta,Job Alpha,3",
+    ])
+    response = client.post(
+        "/matches/import_jobs",
+        files={"file": ("matches.csv", csv_content.encode("utf-8"), "text/csv")},
+        data={"match_numbers": json.dumps([911]), "dry_run": "true"},
+        headers=auth_headers
+    )
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    for _ in range(50):
+        job = client.get(f"/matches/import_jobs/{job_id}", headers=auth_headers).json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.1)
+    assert job["status"] == "completed"
+    assert job["rows_parsed"] == 3
+    assert job["matches_written"] == 0
+    teams = sorted(sorted(side) for side in (job["report"][0]["team1"], job["report"][0]["team2"]))
+    assert teams == [["Job Alpha", "Job Bravo"], ["Job Charlie", "Job Delta"]]
+
+def test_import_reports_progress_per_batch(run_on_test_db, monkeypatch):
+    import csv_import
+
+    monkeypatch.setattr(csv_import, "WRITE_BATCH_SIZE", 2)
+    lines = [f"{n},1,Batch Alpha,Batch Bravo,5" for n in (921, 922, 923)]
+    by_match = csv_import.parse_rows(lines, {921, 922, 923})
+    written = []
+
+    async def progress(count):
+        written.append(count)
+
+    result = run_on_test_db(lambda db: csv_import.import_matches(db, by_match, on_progress=progress))
+    assert result["imported"] == 3
+    assert written == [2, 3]
+
+def test_stale_import_jobs_are_failed(run_on_test_db):
+    from datetime import timedelta
+    from import_jobs import JOBS_COLLECTION, STALE_AFTER, fail_stale_jobs
+
+    now = datetime.utcnow()
+    jobs = [
+        {"status": "running", "heartbeat_at": now - STALE_AFTER - timedelta(minutes=1)},
+        {"status": "queued"},  # recorded before heartbeats existed
+        {"status": "running", "heartbeat_at": now},
+        {"status": "completed", "heartbeat_at": now - STALE_AFTER * 2},
+    ]
+
+    async def run(db):
+        ids = (await db[JOBS_COLLECTION].insert_many(jobs)).inserted_ids
+        await fail_stale_jobs(db)
+        return [(await db[JOBS_COLLECTION].find_one({"_id": i}))["status"] for i in ids]
+
+    assert run_on_test_db(run) == ["failed", "failed", "running", "completed"]
+
+def test_import_job_upload_is_removed_when_the_job_cannot_start(client, auth_headers, monkeypatch):
+    import os
+    import routers.matches
+
+    saved = []
+
+    async def save_upload(file):
+        saved.append(await original_save_upload(file))
+        return saved[-1]
+
+    async def create_job(*args):
+        raise RuntimeError("database unavailable")
+
+    original_save_upload = routers.matches.save_upload
+    monkeypatch.setattr(routers.matches, "save_upload", save_upload)
+    monkeypatch.setattr(routers.matches, "create_job", create_job)
+    with pytest.raises(RuntimeError):
+        client.post(
+            "/matches/import_jobs",
+            files={"file": ("matches.csv", b"931,1,A,B,5", "text/csv")},
+            data={"match_numbers": json.dumps([931])},
+            headers=auth_headers
+        )
+    assert saved and not os.path.exists(saved[0])
+
+
+def test_apply_round_scores_a_1v1_through_sudden_death():
+    from fastapi import HTTPException
+    from models import Match, Player
+    from routers.matches import apply_round
+
+    p1, p2 = Player(id="a" * 24, name="Ann"), Player(id="b" * 24, name="Bob")
+    match = Match(date=datetime(2024, 1, 1), match_type="1v1", player1=p1, player2=p2)
+    # Ann evades first; evaders alternate and one successful evasion each ties it 1-1
+    apply_round(match, p2, p1, False, None, None)
+    with pytest.raises(HTTPException) as e:
+        apply_round(match, p2, p1, True, 5.0, None)  # Ann cannot evade twice in a row
+    assert e.value.status_code == 400
+    apply_round(match, p1, p2, False, None, None)
+    apply_round(match, p2, p1, True, 5.0, None)
+    apply_round(match, p1, p2, True, 6.0, None)
+    assert match.is_sudden_death and not match.is_completed
+    apply_round(match, p2, p1, True, 8.0, None)
+    apply_round(match, p1, p2, True, 3.5, None)
+    assert match.is_completed and match.winner == "Ann"
+    assert (match.team1_score, match.team2_score) == (1, 1)
+
+
+def test_generated_matches_follow_the_scoring_rules():
+    import random
+    from benchmarks.dataset import make_league, make_players, make_teams
+
+    rng = random.Random(7)
+    players = make_players(60, 6, rng)
+    matches = list(make_league(2_000, players, make_teams(players), rng))
+    assert sum(len(m.rounds) for m in matches) >= 2_000
+    assert all(m.is_completed and m.winner for m in matches)
+    assert {m.match_type for m in matches} == {"1v1", "team"}
+    assert any(m.is_sudden_death for m in matches)
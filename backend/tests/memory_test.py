@@ -0,0 +1,29 @@
+import memory
+
+
+def test_snapshot_diff_reports_growing_allocation_site():
+    memory.start_tracing(1)
+    try:
+        base = memory.take_snapshot("before")
+        retained = [bytearray(1024) for _ in range(2000)]
+        current = memory.take_snapshot("after")
+
+        diff = memory.diff_snapshots(base, current, "lineno", limit=5)
+        top = diff["top"][0]
+        assert top["file"].endswith("memory_test.py")
+        assert top["size_diff_bytes"] >= 2000 * 1024
+        assert memory.top_allocations(current, "filename", 5)["top"][0]["line"] is None
+        assert [s["label"] for s in memory.memory_stats()["snapshots"]][-2:] == ["before", "after"]
+        del retained
+    finally:
+        memory.stop_tracing()
+
+    assert memory.take_snapshot() is None
+    assert memory.memory_stats()["snapshots"] == []
+
+
+def test_memory_stats_reports_rss_and_gc():
+    stats = memory.memory_stats()
+    assert stats["peak_rss_bytes"] > 0
+    assert len(stats["gc"]["generations"]) == 3
+    assert stats["tracemalloc"]["tracing"] is False
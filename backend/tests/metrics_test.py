@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+import pytest
+
+from metrics import CommandMetrics, MONGO_COMMAND_LATENCY, UNMATCHED_ROUTE, route_template
+
+
+def test_route_template_replaces_path_params():
+    player_id = "507f1f77bcf86cd799439011"
+    scope = {"path": f"/players/{player_id}/image", "endpoint": object(), "path_params": {"player_id": player_id}}
+    assert route_template(scope) == "/players/{player_id}/image"
+    assert route_template({"path": "/players/autocomplete", "endpoint": object(), "path_params": {}}) == "/players/autocomplete"
+    assert route_template({"path": "/no/such/route"}) == UNMATCHED_ROUTE
+
+
+def test_command_listener_records_collection_and_command():
+    listener = CommandMetrics()
+    before = MONGO_COMMAND_LATENCY.labels("players", "find")._sum.get()
+    event = SimpleNamespace(connection_id=("db", 27017), request_id=1, operation_id=1,
+                            command_name="find", command={"find": "players", "filter": {}})
+    listener.started(event)
+    listener.succeeded(SimpleNamespace(**vars(event), duration_micros=2500))
+    assert MONGO_COMMAND_LATENCY.labels("players", "find")._sum.get() - before == pytest.approx(0.0025)
+
+
+def test_metrics_endpoint(client):
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in response.text
@@ -0,0 +1,147 @@
+import pytest
+from datetime import datetime
+from models import UserRole
+
+ADMIN = "admin_pins"
+ADMIN_PASSWORD = "Adminpass123"
+USER = "user_pins"
+USER_PASSWORD = "Userpass123"
+
+@pytest.fixture
+def auth_headers(client):
+    client.post(
+        "/login/register",
+        json={"username": ADMIN, "password": ADMIN_PASSWORD, "role": UserRole.admin}
+    )
+    response = client.post(
+        "/login/token",
+        data={"username": ADMIN, "password": ADMIN_PASSWORD},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def user_headers(client):
+    client.post(
+        "/login/register",
+        json={"username": USER, "password": USER_PASSWORD, "role": UserRole.user}
+    )
+    response = client.post(
+        "/login/token",
+        data={"username": USER, "password": USER_PASSWORD},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def match_with_round(client, auth_headers):
+    chaser = client.post("/players/", data={"name": "Pin Chaser"}, headers=auth_headers).json()
+    evader = client.post("/players/", data={"name": "Pin Evader"}, headers=auth_headers).json()
+    match = client.post("/matches/", json={
+        "match_type": "1v1",
+        "date": "2024-05-01T10:00:00",
+        "player1_id": chaser["id"],
+        "player2_id": evader["id"],
+        "video_url": "http://example.com/video?v=1"
+    }, headers=auth_headers).json()
+    client.post(f"/matches/{match['id']}/rounds", json={
+        "chaser_id": chaser["id"],
+        "evader_id": evader["id"],
+        "tag_made": True,
+        "tag_time": 4.0,
+        "round_hour": 0,
+        "round_minute": 0,
+        "round_second": 30
+    }, headers=auth_headers)
+    return {"match_id": match["id"], "chaser": chaser, "evader": evader}
+
+@pytest.fixture
+def created_pin(client, match_with_round):
+    response = client.post("/pins/", json={
+        "location": {"x": 25.0, "y": 75.0},
+        "chaser_id": match_with_round["chaser"]["id"],
+        "evader_id": match_with_round["evader"]["id"],
+        "match_id": match_with_round["match_id"],
+        "round_index": 0
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def test_create_pin_copies_match_fields(created_pin):
+    assert created_pin["match_type"] == "1v1"
+    assert created_pin["match_date"].startswith("2024-05-01")
+    assert created_pin["chaser_name"] == "Pin Chaser"
+    assert created_pin["video_url"].endswith("&t=0h0m30s")
+
+def test_create_pin_rejects_unknown_round(client, match_with_round):
+    response = client.post("/pins/", json={
+        "location": {"x": 1.0, "y": 1.0},
+        "chaser_id": match_with_round["chaser"]["id"],
+        "evader_id": match_with_round["evader"]["id"],
+        "match_id": match_with_round["match_id"],
+        "round_index": 5
+    })
+    assert response.status_code == 400
+
+def test_enriched_pins_follow_match_date(client, auth_headers, match_with_round, created_pin):
+    player_id = match_with_round["chaser"]["id"]
+    response = client.get(f"/pins/enriched?player_id={player_id}&start_date=2024-04-01")
+    assert response.status_code == 200
+    pins = response.json()
+    assert [p["id"] for p in pins] == [created_pin["id"]]
+    assert pins[0]["matchDetails"]["date"] == "2024-05-01"
+
+    client.patch(f"/matches/{match_with_round['match_id']}", json={"date": "2023-01-01T10:00:00"}, headers=auth_headers)
+    response = client.get(f"/pins/enriched?player_id={player_id}&start_date=2024-04-01")
+    assert response.json() == []
+
+def test_enriched_pins_round_trip_budget(client, match_with_round, created_pin, db_round_trips):
+    player_id = match_with_round["chaser"]["id"]
+    # One data-version lookup and one pins query, however many pins and matches there are
+    db_round_trips(client.get(f"/pins/enriched?player_id={player_id}"), 2)
+
+def test_pins_within_box(client, match_with_round, created_pin):
+    player_id = match_with_round["chaser"]["id"]
+    response = client.get(f"/pins/within?box=0,50,50,100&player_id={player_id}")
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [created_pin["id"]]
+
+    response = client.get(f"/pins/within?box=50,0,100,50&player_id={player_id}")
+    assert response.json() == []
+
+    assert client.get("/pins/within?box=0,0,50").status_code == 400
+
+def test_bulk_pin_operations(client, auth_headers, match_with_round, created_pin):
+    pin = {
+        "location": {"x": 60.0, "y": 40.0},
+        "chaser_id": match_with_round["chaser"]["id"],
+        "evader_id": match_with_round["evader"]["id"],
+        "match_id": match_with_round["match_id"],
+        "round_index": 0
+    }
+    response = client.post("/pins/bulk", json={"operations": [
+        {"op": "create", "pin": pin},
+        {"op": "create", "pin": {**pin, "round_index": 3}},
+        {"op": "move", "pin_id": created_pin["id"], "location": {"x": 10.0, "y": 10.0}},
+        {"op": "delete", "pin_id": "0123456789abcdef01234567"},
+    ]}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert [r["status"] for r in body["results"]] == ["created", "error", "moved", "error"]
+    assert body["failed"] == 2
+    new_id = body["created_ids"][0]
+
+    pins = client.get(f"/pins/?match_id={match_with_round['match_id']}").json()
+    by_id = {p["id"]: p for p in pins}
+    assert by_id[new_id]["chaser_name"] == "Pin Chaser"
+    assert by_id[created_pin["id"]]["location"] == {"x": 10.0, "y": 10.0}
+
+    response = client.post("/pins/bulk", json={"operations": [{"op": "delete", "pin_id": new_id}]}, headers=auth_headers)
+    assert response.json()["results"][0]["status"] == "deleted"
+
+def test_bulk_pin_operations_requires_admin(client, user_headers, created_pin):
+    operations = {"operations": [{"op": "delete", "pin_id": created_pin["id"]}]}
+    assert client.post("/pins/bulk", json=operations).status_code == 401
+    response = client.post("/pins/bulk", json=operations, headers=user_headers)
+    assert response.status_code == 403
+    assert "Admin privileges required" in response.json().get("detail", "")
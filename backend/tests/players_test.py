@@ -77,6 +77,25 @@ def test_list_players(client, admin_headers):
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+def test_list_players_prefix_and_pagination(client, admin_headers):
+    for name in ["Zeta Alpha", "zeta Bravo", "Zeta Charlie", "Omega"]:
+        client.post("/players/", data={"name": name}, headers=admin_headers)
+
+    response = client.get("/players/?q=ZETA", headers=admin_headers)
+    assert response.status_code == 200
+    names = [p["name"] for p in response.json()]
+    assert names == ["Zeta Alpha", "zeta Bravo", "Zeta Charlie"]
+
+    page = client.get("/players/?q=zeta&offset=1&limit=1", headers=admin_headers).json()
+    assert [p["name"] for p in page] == ["zeta Bravo"]
+
+def test_autocomplete_players(client, admin_headers):
+    client.post("/players/", data={"name": "Auto Complete"}, headers=admin_headers)
+    response = client.get("/players/autocomplete?q=auto", headers=admin_headers)
+    assert response.status_code == 200
+    assert {"name": "Auto Complete"}.items() <= response.json()[0].items()
+    assert set(response.json()[0]) == {"id", "name"}
+
 def test_get_player_by_id(client, admin_headers, created_player):
     player_id = created_player
     response = client.get(f"/players/{player_id}", headers=admin_headers)
@@ -84,6 +103,14 @@ def test_get_player_by_id(client, admin_headers, created_player):
     player = response.json()
     assert player["id"] == player_id
 
+def test_conditional_stats_still_check_access(client, admin_headers, user_headers, created_player):
+    # A later If-Modified-Since would be answered with 304 if the checks were skipped
+    since = {"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+    response = client.get("/players/507f1f77bcf86cd799439011/stats", headers={**admin_headers, **since})
+    assert response.status_code == 404
+    response = client.get(f"/players/{created_player}/stats", headers={**user_headers, **since})
+    assert response.status_code == 403
+
 def test_player_image_upload_and_get(client, admin_headers):
     # Upload player with image
     image_bytes = b"testimagecontent"
@@ -115,4 +142,17 @@ def test_delete_player_admin(client, admin_headers, created_player):
     player_id = created_player
     response = client.delete(f"/players/{player_id}", headers=admin_headers)
     assert response.status_code == 200
-    assert response.json()["status"] == "deleted"
\ No newline at end of file
+    assert response.json()["status"] == "deleted"
+
+def test_versus_matrix(client, admin_headers):
+    ids = []
+    for name in ("Matrix One", "Matrix Two"):
+        response = client.post("/players/", data={"name": name}, headers=admin_headers)
+        ids.append(response.json()["id"])
+
+    response = client.get(f"/players/versus-matrix?player_ids={','.join(ids)}", headers=admin_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["id"] for p in data["players"]] == ids
+    assert data["rounds"] == [[0, 0], [0, 0]]
+    assert len(data["evasion_time"]) == 2
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiler
+from request_context import RequestContextMiddleware
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_worker_profile_samples_busy_thread():
+    loop = asyncio.get_running_loop()
+    worker = loop.run_in_executor(None, busy, 0.3)
+    profile = await profiler.profile_worker(0.2, 0.005)
+    await worker
+
+    assert "busy (" in profile.collapsed()
+    speedscope = profile.speedscope()
+    [sampled] = speedscope["profiles"]
+    assert len(sampled["samples"]) == len(sampled["weights"])
+    assert {"name": "busy"}.items() <= next(f for f in speedscope["shared"]["frames"] if f["name"] == "busy").items()
+
+
+def test_request_profiler_only_profiles_matching_requests():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/players/{player_id}/stats")
+    async def stats(player_id: str):
+        busy(0.05)
+        await asyncio.sleep(0.02)
+        return {}
+
+    request_profiler = profiler.arm_request_profiler("GET", "/players/{player_id}/stats", 2, 0.001)
+    try:
+        with TestClient(app) as client:
+            for player_id in ("a", "b", "c"):
+                client.get(f"/players/{player_id}/stats")
+            client.get("/players/a")
+    finally:
+        profiler.disarm_request_profiler()
+
+    assert request_profiler.done
+    assert request_profiler.completed == 2
+    collapsed = request_profiler.profile.collapsed()
+    assert "busy (" in collapsed
+    assert profiler.AWAITING in collapsed
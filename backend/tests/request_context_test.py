@@ -0,0 +1,53 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import request_context
+from request_context import RequestContextMiddleware, RoundTripListener, documents_returned
+
+
+def test_documents_returned_by_reply_type():
+    assert documents_returned({"cursor": {"firstBatch": [{}, {}], "id": 0}}) == 2
+    assert documents_returned({"cursor": {"nextBatch": [{}], "id": 0}}) == 1
+    assert documents_returned({"value": {"_id": 1}, "ok": 1}) == 1
+    assert documents_returned({"value": None, "ok": 1}) == 0
+    assert documents_returned({"n": 3, "ok": 1}) == 0
+
+
+def test_round_trips_from_concurrent_tasks_count_against_the_request(monkeypatch):
+    monkeypatch.setattr(request_context, "DB_STATS_HEADERS", True)
+    listener = RoundTripListener()
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: str):
+        async def command():
+            listener.started(SimpleNamespace())
+            listener.succeeded(SimpleNamespace(reply={"cursor": {"firstBatch": [{}, {}, {}]}}))
+        await asyncio.gather(command(), command())
+        return {}
+
+    response = TestClient(app).get("/items/1")
+    assert response.headers["X-DB-Round-Trips"] == "2"
+    assert response.headers["X-DB-Documents"] == "6"
+
+
+def test_request_id_is_propagated_or_generated():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/ping")
+    async def ping():
+        return {"request_id": request_context.current_request_id()}
+
+    client = TestClient(app)
+    response = client.get("/ping", headers={"X-Request-ID": "frontend-42"})
+    assert response.headers["X-Request-ID"] == "frontend-42"
+    assert response.json()["request_id"] == "frontend-42"
+
+    response = client.get("/ping", headers={"X-Request-ID": "not a valid id\n"})
+    assert response.headers["X-Request-ID"] != "not a valid id\n"
+    assert response.json()["request_id"] == response.headers["X-Request-ID"]
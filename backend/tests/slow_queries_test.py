@@ -0,0 +1,59 @@
+import json
+from types import SimpleNamespace
+
+from slow_queries import SlowQueryListener, SlowQueryLog, command_shape, redact
+
+
+def test_redact_keeps_structure_and_hides_values():
+    query = {"participant_ids": "p1", "rounds": {"$elemMatch": {"$or": [{"chaser.id": "p1"}, {"evader.id": "p1"}]}},
+             "team_ids": {"$in": ["t1", "t2", "t3"]}}
+    assert redact(query) == {
+        "participant_ids": "?",
+        "rounds": {"$elemMatch": {"$or": [{"chaser.id": "?"}, {"evader.id": "?"}]}},
+        "team_ids": {"$in": ["?"]},
+    }
+
+
+def test_command_shape_of_find_keeps_sort():
+    command = {"find": "matches", "filter": {"match_type": "1v1"}, "sort": {"date": -1}, "lsid": {"id": 1}}
+    assert command_shape("find", command) == {"filter": {"match_type": "?"}, "sort": {"date": -1}}
+    assert command_shape("update", {"update": "pins", "updates": [{"q": {"match_id": "m1"}, "u": {}}]}) == {
+        "filter": {"match_id": "?"}
+    }
+    assert command_shape("insert", {"insert": "pins", "documents": []}) is None
+
+
+def test_slow_query_log_groups_by_shape_and_keeps_slowest():
+    log = SlowQueryLog(max_shapes=2)
+    log.record("find", "players", '{"filter": {"name": "?"}}', 150.0, "GET /players/")
+    log.record("find", "players", '{"filter": {"name": "?"}}', 250.0, "GET /players/autocomplete")
+    log.record("aggregate", "matches", '{"pipeline": []}', 500.0, None)
+    log.record("find", "pins", '{"filter": {}}', 120.0, None)  # faster than every kept shape
+
+    top = log.top()
+    assert [entry["collection"] for entry in top] == ["matches", "players"]
+    players = top[1]
+    assert players["count"] == 2
+    assert players["max_ms"] == 250.0
+    assert players["avg_ms"] == 200.0
+    assert players["routes"] == ["GET /players/", "GET /players/autocomplete"]
+
+
+def test_listener_records_only_commands_over_threshold():
+    log = SlowQueryLog()
+    listener = SlowQueryListener(threshold_ms=100, explain=False, log=log)
+
+    def run(request_id, filter, duration_micros):
+        event = SimpleNamespace(connection_id=("db", 27017), request_id=request_id, operation_id=request_id,
+                                command_name="find", database_name="wct_stats",
+                                command={"find": "matches", "filter": filter})
+        listener.started(event)
+        listener.succeeded(SimpleNamespace(**vars(event), duration_micros=duration_micros))
+
+    run(1, {"team_ids": "t1"}, 5_000)
+    run(2, {"team_ids": "t2"}, 180_000)
+
+    [entry] = log.top()
+    assert json.loads(entry["shape"]) == {"filter": {"team_ids": "?"}}
+    assert entry["max_ms"] == 180.0
+    assert entry["routes"] == []
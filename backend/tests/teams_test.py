@@ -55,3 +55,18 @@ def test_delete_team_user_forbidden(client, user_token, admin_token):
     
     del_resp = client.delete(f"/teams/{team_id}", headers={"Authorization": f"Bearer {user_token}"})
     assert del_resp.status_code == 403
+
+def test_list_teams_conditional_get(client, admin_token):
+    client.post("/teams/", json={"name": "Team F"}, headers={"Authorization": f"Bearer {admin_token}"})
+
+    resp = client.get("/teams/")
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+
+    cached = client.get("/teams/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    client.post("/teams/", json={"name": "Team G"}, headers={"Authorization": f"Bearer {admin_token}"})
+    changed = client.get("/teams/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert any(t["name"] == "Team G" for t in changed.json())
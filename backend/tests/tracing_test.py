@@ -0,0 +1,195 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import tracing
+from request_context import RequestContextMiddleware
+from tracing import TracingListener, parse_traceparent, span, traced
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure("file", path=str(path))
+    yield path
+    tracing.configure("none")
+
+
+def exported(path):
+    tracing._exporter.shutdown()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+    assert parse_traceparent(f"00-{TRACE_ID.upper()}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+    assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}") is None
+    assert parse_traceparent("garbage") is None
+
+
+def test_incoming_sampled_flag_decides(trace_file):
+    def scope(flags):
+        return {"method": "GET", "path": "/", "headers": [(b"traceparent", f"00-{TRACE_ID}-{PARENT_ID}-{flags}".encode())]}
+
+    root = tracing.start_server_span(scope("01"), sample_rate=0)
+    assert root.trace_id == TRACE_ID and root.parent_id == PARENT_ID
+    assert tracing.start_server_span(scope("00"), sample_rate=1) is None
+    assert tracing.start_server_span({"method": "GET", "path": "/", "headers": []}, sample_rate=0) is None
+
+
+def test_nothing_is_traced_without_an_exporter():
+    scope = {"method": "GET", "path": "/", "headers": [(b"traceparent", f"00-{TRACE_ID}-{PARENT_ID}-01".encode())]}
+    assert tracing.start_server_span(scope) is None
+
+
+def test_traced_functions_nest_under_the_current_span(trace_file):
+    @traced("inner")
+    def inner():
+        return 1
+
+    @traced("outer")
+    async def outer():
+        with span("block", step="a"):
+            return inner() + 1
+
+    assert asyncio.run(outer()) == 2  # no active trace: plain call
+
+    root = tracing.start_server_span({"method": "GET", "path": "/x", "headers": []}, sample_rate=1)
+    token = tracing.activate(root)
+    try:
+        assert asyncio.run(outer()) == 2
+    finally:
+        tracing.deactivate(token)
+        root.end()
+
+    spans = {s["name"]: s for s in exported(trace_file)}
+    assert spans["outer"]["parent_id"] == spans["GET /x"]["span_id"]
+    assert spans["block"]["parent_id"] == spans["outer"]["span_id"]
+    assert spans["inner"]["parent_id"] == spans["block"]["span_id"]
+    assert spans["block"]["attributes"] == {"step": "a"}
+    assert len({s["trace_id"] for s in spans.values()}) == 1
+
+
+def test_exceptions_mark_the_span(trace_file):
+    root = tracing.start_server_span({"method": "GET", "path": "/", "headers": []}, sample_rate=1)
+    token = tracing.activate(root)
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+    tracing.deactivate(token)
+    root.end()
+    assert {s["name"]: s["error"] for s in exported(trace_file)}["failing"] == "ValueError"
+
+
+def test_spans_per_trace_are_capped(trace_file, monkeypatch):
+    monkeypatch.setattr(tracing, "MAX_SPANS_PER_TRACE", 3)
+    root = tracing.start_server_span({"method": "GET", "path": "/", "headers": []}, sample_rate=1)
+    token = tracing.activate(root)
+    for _ in range(5):
+        with span("child"):
+            pass
+    tracing.deactivate(token)
+    root.end()
+    spans = exported(trace_file)
+    assert len(spans) == 3
+    assert spans[-1]["attributes"]["trace.dropped_spans"] == 3
+
+
+def test_mongo_commands_become_client_spans(trace_file):
+    listener = TracingListener()
+    root = tracing.start_server_span({"method": "GET", "path": "/", "headers": []}, sample_rate=1)
+    token = tracing.activate(root)
+    event = SimpleNamespace(
+        command_name="find", database_name="wct_stats", command={"find": "matches", "filter": {}},
+        connection_id=("localhost", 27017), request_id=7,
+    )
+    listener.started(event)
+    listener.succeeded(SimpleNamespace(connection_id=("localhost", 27017), request_id=7, duration_micros=1500))
+    tracing.deactivate(token)
+    root.end()
+
+    mongo = next(s for s in exported(trace_file) if s["name"] == "mongo.find")
+    assert mongo["kind"] == tracing.CLIENT
+    assert mongo["duration_ms"] == 1.5
+    assert mongo["attributes"]["db.mongodb.collection"] == "matches"
+
+
+def test_inject_adds_the_current_span():
+    headers = tracing.inject({"Accept": "application/json"})
+    assert "traceparent" not in headers
+    root = tracing.Span(tracing._Trace(TRACE_ID), "root", None, tracing.SERVER)
+    token = tracing.activate(root)
+    try:
+        assert tracing.inject({})["traceparent"] == f"00-{TRACE_ID}-{root.span_id}-01"
+    finally:
+        tracing.deactivate(token)
+
+
+def test_otlp_payload_shape():
+    root = tracing.Span(tracing._Trace(TRACE_ID), "GET /players", PARENT_ID, tracing.SERVER, {"http.response.status_code": 200})
+    root.end_ns = root.start_ns + 1000
+    payload = tracing.otlp_payload([root])
+    otlp_span = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_span["traceId"] == TRACE_ID and otlp_span["parentSpanId"] == PARENT_ID
+    assert otlp_span["kind"] == 2
+    assert otlp_span["attributes"] == [{"key": "http.response.status_code", "value": {"intValue": "200"}}]
+
+
+def test_middleware_continues_the_callers_trace(trace_file):
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: str):
+        with span("work"):
+            return {}
+
+    traceparent = f"00-{TRACE_ID}-{PARENT_ID}-01"
+    assert TestClient(app).get("/items/42", headers={"traceparent": traceparent}).status_code == 200
+
+    spans = {s["name"]: s for s in exported(trace_file)}
+    root = spans["GET /items/{item_id}"]
+    assert root["trace_id"] == TRACE_ID and root["parent_id"] == PARENT_ID
+    assert root["attributes"]["http.response.status_code"] == 200
+    assert spans["work"]["parent_id"] == root["span_id"]
+
+
+def test_import_jobs_do_not_inherit_the_request_trace(monkeypatch):
+    import import_jobs
+
+    class FakeJobs:
+        async def insert_one(self, doc):
+            return SimpleNamespace(inserted_id="job")
+
+    class FakeDB:
+        name = "wct_stats_test"
+
+        def __getitem__(self, name):
+            return FakeJobs()
+
+    seen = []
+
+    async def run_job(*args):
+        seen.append(tracing.current_span())
+
+    monkeypatch.setattr(import_jobs, "_run_job", run_job)
+
+    async def request():
+        root = tracing.Span(tracing._Trace(TRACE_ID), "POST /matches/import_jobs", None, tracing.SERVER)
+        token = tracing.activate(root)
+        try:
+            await import_jobs.create_job(FakeDB(), "upload.csv", [1], True, "admin")
+        finally:
+            tracing.deactivate(token)
+        await asyncio.gather(*import_jobs._running_jobs)
+
+    asyncio.run(request())
+    assert seen == [None]
@@ -0,0 +1,372 @@
+# Lightweight request tracing: W3C trace context, spans in contextvars, batched export to a file or OTLP/HTTP
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import requests
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# "none", "file" (JSON lines in TRACE_FILE) or "otlp" (OTLP/HTTP JSON to OTEL_EXPORTER_OTLP_ENDPOINT)
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318").rstrip("/")
+# Fraction of requests traced when the caller did not decide; a caller's sampled flag is always honoured
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# Spans kept per trace; a CSV import can issue thousands of Mongo commands
+MAX_SPANS_PER_TRACE = int(os.getenv("TRACE_MAX_SPANS", "1000"))
+# Finished spans buffered for the exporter thread; when full, new spans are dropped
+TRACE_QUEUE_SIZE = 10000
+EXPORT_BATCH_SIZE = 512
+EXPORT_INTERVAL = 2.0
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "wct-stats-backend")
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# OTLP SpanKind values
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class _Trace:
+    """Per-trace bookkeeping shared by all spans of one request."""
+
+    __slots__ = ("trace_id", "spans", "dropped")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans = 0
+        self.dropped = 0
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: _Trace, name: str, parent_id: Optional[str], kind: int = INTERNAL,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.trace = trace
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def child(self, name: str, kind: int = INTERNAL, attributes: Optional[Dict[str, Any]] = None,
+              start_ns: Optional[int] = None) -> Optional["Span"]:
+        """A new span under this one, or None once the trace has reached MAX_SPANS_PER_TRACE."""
+        if self.trace.spans >= MAX_SPANS_PER_TRACE:
+            self.trace.dropped += 1
+            return None
+        self.trace.spans += 1
+        return Span(self.trace, name, self.span_id, kind, attributes, start_ns)
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is None:
+            self.end_ns = end_ns or time.time_ns()
+            if self.kind == SERVER and self.trace.dropped:
+                self.attributes["trace.dropped_spans"] = self.trace.dropped
+            _exporter.submit(self)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def parse_traceparent(value: str):
+    """(trace_id, parent span id, sampled) from a W3C traceparent header, or None if malformed."""
+    match = TRACEPARENT_PATTERN.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def start_server_span(scope, sample_rate: Optional[float] = None) -> Optional[Span]:
+    """
+    The root span of an HTTP request, or None when the request is not traced.
+
+    A valid incoming traceparent decides sampling and makes this span its child;
+    without one the request is traced with probability TRACE_SAMPLE_RATE.
+    """
+    if not enabled():
+        return None
+    incoming = None
+    for name, value in scope.get("headers", []):
+        if name == b"traceparent":
+            incoming = parse_traceparent(value.decode("latin-1"))
+            break
+    if incoming is not None:
+        trace_id, parent_id, sampled = incoming
+    else:
+        rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        trace_id, parent_id, sampled = "%032x" % random.getrandbits(128), None, random.random() < rate
+    if not sampled:
+        return None
+    trace = _Trace(trace_id)
+    trace.spans = 1
+    return Span(trace, f"{scope['method']} {scope['path']}", parent_id, SERVER, {
+        "http.request.method": scope["method"],
+        "url.path": scope["path"],
+    })
+
+
+def activate(span: Optional[Span]):
+    """Make span the current span; returns a token for deactivate()."""
+    return _current.set(span)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """A child of the current span for the duration of the block; a no-op outside a traced request."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.child(name, kind, attributes)
+    if child is None:
+        yield None
+        return
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+def traced(name: Optional[str] = None):
+    """Decorate a sync or async function so each call is a span when a trace is active."""
+
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return await func(*args, **kwargs)
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add the current span's traceparent to outbound request headers."""
+    current = _current.get()
+    if current is not None:
+        headers["traceparent"] = current.traceparent()
+    return headers
+
+
+class TracingListener(monitoring.CommandListener):
+    """A client span per Mongo command issued while a traced request is current."""
+
+    def __init__(self):
+        self._spans: Dict[Any, Span] = {}
+
+    def started(self, event):
+        parent = _current.get()
+        if parent is None:
+            return
+        target = event.command.get(event.command_name)
+        child = parent.child(f"mongo.{event.command_name}", CLIENT, {
+            "db.system": "mongodb",
+            "db.name": event.database_name,
+            "db.operation": event.command_name,
+            "db.mongodb.collection": target if isinstance(target, str) else event.command.get("collection"),
+            "server.address": "%s:%s" % event.connection_id,
+        })
+        if child is not None:
+            self._spans[(event.connection_id, event.request_id)] = child
+
+    def _finish(self, event, error: Optional[str] = None):
+        child = self._spans.pop((event.connection_id, event.request_id), None)
+        if child is not None:
+            child.error = error
+            # The driver's own duration is more precise than our clock at callback time
+            child.end(child.start_ns + event.duration_micros * 1000)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, str(event.failure.get("codeName") or event.failure.get("errmsg") or "error"))
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """An OTLP/HTTP JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{
+                "scope": {"name": "tracing"},
+                "spans": [{
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                    "name": s.name,
+                    "kind": s.kind,
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": _attributes(s.attributes),
+                    "status": {"code": 2, "message": s.error} if s.error else {},
+                } for s in spans],
+            }],
+        }],
+    }
+
+
+def span_record(s: Span) -> Dict[str, Any]:
+    """A flat JSON line for the file exporter."""
+    return {
+        "trace_id": s.trace_id,
+        "span_id": s.span_id,
+        "parent_id": s.parent_id,
+        "name": s.name,
+        "kind": s.kind,
+        "start_ns": s.start_ns,
+        "duration_ms": round((s.end_ns - s.start_ns) / 1e6, 3),
+        "attributes": s.attributes,
+        "error": s.error,
+    }
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    out = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        out.append({"key": key, "value": typed})
+    return out
+
+
+class SpanExporter:
+    """Batch finished spans on a background thread and write them to a file or an OTLP collector."""
+
+    def __init__(self, kind: str = TRACE_EXPORTER, path: str = TRACE_FILE, endpoint: str = OTLP_ENDPOINT):
+        self.kind = kind
+        self.path = path
+        self.endpoint = endpoint
+        self.queue: "queue.Queue[Optional[Span]]" = queue.Queue(TRACE_QUEUE_SIZE)
+        self.dropped = 0
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, finished: Span):
+        if self.kind == "none":
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self.export(batch)
+                except Exception:
+                    logger.warning("Exporting %d spans failed", len(batch), exc_info=True)
+
+    def export(self, batch: List[Span]):
+        if self.kind == "file":
+            with open(self.path, "a") as f:
+                f.write("".join(json.dumps(span_record(s), default=str) + "\n" for s in batch))
+        elif self.kind == "otlp":
+            resp = requests.post(f"{self.endpoint}/v1/traces", json=otlp_payload(batch), timeout=10)
+            if resp.status_code >= 400:
+                logger.warning("OTLP collector returned %s: %s", resp.status_code, resp.text[:200])
+
+    def shutdown(self):
+        """Export what is queued and stop the thread."""
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+
+_exporter = SpanExporter()
+
+
+def enabled() -> bool:
+    return _exporter.kind != "none"
+
+
+def configure(kind: str, path: str = TRACE_FILE, endpoint: str = OTLP_ENDPOINT) -> SpanExporter:
+    """Replace the exporter (flushing the previous one); used by tests and benchmarks."""
+    global _exporter
+    _exporter.shutdown()
+    _exporter = SpanExporter(kind, path, endpoint)
+    return _exporter
+
+
+atexit.register(lambda: _exporter.shutdown())
@@ -2,6 +2,9 @@ import React from 'react';
 import ReactDOM from 'react-dom/client';
 import './index.css';
 import App from './App';
+import { installTracePropagation } from './utils/tracing';
+
+installTracePropagation();
 
 
 const root = ReactDOM.createRoot(document.getElementById('root'));
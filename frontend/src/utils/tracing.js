@@ -0,0 +1,33 @@
+// W3C trace context for backend calls: every fetch to BACKEND_URL starts a trace the
+// backend continues, so its spans can be joined with what the browser saw.
+import { BACKEND_URL } from '../config';
+
+// Fraction of backend calls marked as sampled; the backend traces exactly those
+const SAMPLE_RATE = parseFloat(import.meta.env.VITE_TRACE_SAMPLE_RATE ?? '0.1');
+
+function randomHex(bytes) {
+  const values = crypto.getRandomValues(new Uint8Array(bytes));
+  return Array.from(values, (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+export function makeTraceparent(sampled = Math.random() < SAMPLE_RATE) {
+  return `00-${randomHex(16)}-${randomHex(8)}-${sampled ? '01' : '00'}`;
+}
+
+function targetsBackend(input) {
+  const url = typeof input === 'string' || input instanceof URL ? String(input) : input.url;
+  return url.startsWith(BACKEND_URL);
+}
+
+export function installTracePropagation() {
+  if (window.fetch.tracePropagation) return;
+  const originalFetch = window.fetch.bind(window);
+  const tracedFetch = (input, init = {}) => {
+    if (!targetsBackend(input)) return originalFetch(input, init);
+    const headers = new Headers(init.headers || (input instanceof Request ? input.headers : undefined));
+    if (!headers.has('traceparent')) headers.set('traceparent', makeTraceparent());
+    return originalFetch(input, { ...init, headers });
+  };
+  tracedFetch.tracePropagation = true;
+  window.fetch = tracedFetch;
+}